@@ -1,12 +1,18 @@
 import streamlit as st
 from PIL import Image
 
+from breeze import warmup
+
 st.set_page_config(
     page_title="Home - Breeze Company",
     page_icon="📊",
     layout='centered',
 )
 
+# Aquece em segundo plano os caches das páginas para o estado padrão dos
+# filtros (uma única vez por processo)
+warmup.start()
+
 image = Image.open( 'brze.png' )
 st.sidebar.image(image,  width=150)
 
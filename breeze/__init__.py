@@ -0,0 +1 @@
+""" Módulos compartilhados pelas páginas do dashboard da Breeze Company. """
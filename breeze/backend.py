@@ -0,0 +1,164 @@
+# Bibliotecas necessárias
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------
+
+# Motor das agregações dos cubos: 'pandas' (padrão) ou 'duckdb'
+# (vetorizado e com várias threads). Os dois dão o mesmo resultado.
+BACKEND = os.environ.get( 'BREEZE_BACKEND', 'pandas' )
+
+BACKENDS = ( 'pandas', 'duckdb' )
+
+# Operações aceitas em cada coluna das células
+OPERATIONS = ( 'sum', 'min', 'max', 'nunique' )
+
+# Dimensões derivadas na hora da consulta: nome -> ( coluna de data,
+# formato do strftime ), com o mesmo resultado no pandas e no DuckDB
+DERIVED = {
+    'week_of_year': ( 'Order_Date', '%U' ),
+}
+
+# Uma conexão do DuckDB por thread: cada sessão do Streamlit roda em uma
+# thread e uma conexão não pode ser usada por duas consultas ao mesmo tempo
+_local = threading.local()
+
+# -----------------------------------------------------------------
+
+# Funções
+def aggregate( cells, keys, operations, backend=None ):
+    """ Esta função agrupa as células de um cubo e reduz cada coluna
+        pedida, com o mesmo resultado de
+        cells.groupby( keys, observed=True ).agg( operations ).
+
+            Input: Dataframe de células, colunas de agrupamento,
+                   dicionário coluna -> operação ( sum, min, max ou
+                   nunique ), motor (None para BACKEND)
+            Output: Dataframe indexado pelas colunas de agrupamento, com
+                    uma coluna por coluna reduzida
+    """
+    backend = BACKEND if backend is None else backend
+
+    for col, operation in operations.items():
+        if operation not in OPERATIONS:
+            raise ValueError( f'Operação {operation} não suportada para {col}' )
+
+    # Sem células não há o que agrupar em várias threads
+    if backend == 'pandas' or cells.empty:
+        return derive( cells, keys ).groupby( keys, observed=True ).agg( operations )
+    if backend == 'duckdb':
+        return aggregate_duckdb( cells, keys, operations )
+
+    raise ValueError( f'Motor {backend} desconhecido: use um de {BACKENDS}' )
+
+
+def derive( cells, keys ):
+    """ Esta função acrescenta às células as dimensões derivadas (ver
+        DERIVED) usadas em keys.
+
+            Input: Dataframe de células, colunas de agrupamento
+            Output: Dataframe de células
+    """
+    derived = { key: format_dates( cells[DERIVED[key][0]], DERIVED[key][1] )
+                for key in keys if key in DERIVED and key not in cells }
+
+    return cells.assign( **derived ) if derived else cells
+
+
+def format_dates( dates, fmt ):
+    """ Esta função formata datas com strftime, com o mesmo resultado de
+        dates.dt.strftime( fmt ), formatando só as datas distintas.
+
+            Input: Series de datas, formato do strftime
+            Output: Series de textos (nulos onde a data é nula)
+    """
+    codes, uniques = pd.factorize( dates )
+    labels = np.append( uniques.strftime( fmt ).to_numpy( dtype=object ), np.nan )
+
+    return pd.Series( labels[codes], index=dates.index )
+
+
+def quote( name ):
+    """ Esta função escreve o nome de uma coluna como identificador SQL. """
+    return '"' + name.replace( '"', '""' ) + '"'
+
+
+def reduction_sql( cells, col, operation ):
+    """ Esta função escreve a redução de uma coluna em SQL. Somas de
+        inteiros voltam como BIGINT e somas de números reais usam a soma
+        compensada (fsum), como a soma do groupby do pandas.
+
+            Input: Dataframe de células, coluna, operação
+            Output: Expressão SQL
+    """
+    column = quote( col )
+
+    if operation == 'nunique':
+        return f'count( DISTINCT {column} )'
+    if operation == 'sum' and pd.api.types.is_integer_dtype( cells[col].dtype ):
+        return f'CAST( sum( {column} ) AS BIGINT )'
+    if operation == 'sum':
+        return f'fsum( {column} )'
+
+    return f'{operation}( {column} )'
+
+
+def connection():
+    """ Esta função devolve a conexão do DuckDB da thread atual. O DuckDB
+        só é importado aqui: o motor pandas não depende dele. """
+    if not hasattr( _local, 'connection' ):
+        import duckdb
+        _local.connection = duckdb.connect()
+
+    return _local.connection
+
+
+def aggregate_duckdb( cells, keys, operations ):
+    """ Esta função faz a agregação (ver aggregate) no DuckDB, que
+        agrupa em várias threads. Apenas as colunas usadas na consulta são
+        entregues a ele e as dimensões derivadas são calculadas na própria
+        consulta. Os tipos das colunas e a ordem dos grupos são os mesmos
+        do groupby do pandas.
+
+            Input: Dataframe de células, colunas de agrupamento,
+                   dicionário coluna -> operação
+            Output: Dataframe indexado pelas colunas de agrupamento
+    """
+    derived = [ key for key in keys if key in DERIVED and key not in cells ]
+
+    expressions = {}
+    for key in keys:
+        if key in derived:
+            source, fmt = DERIVED[key]
+            expressions[key] = f"strftime( {quote( source )}, '{fmt}' )"
+        else:
+            expressions[key] = quote( key )
+
+    columns = [ f'{expression} AS {quote( key )}' for key, expression in expressions.items() ]
+    columns += [ f'{reduction_sql( cells, col, operation )} AS {quote( col )}'
+                 for col, operation in operations.items() ]
+
+    # Grupos com dimensão nula ficam de fora, como no groupby
+    where = ' AND '.join( f'{expression} IS NOT NULL' for expression in expressions.values() )
+    query = f'SELECT {", ".join( columns )} FROM cells WHERE {where} GROUP BY ALL'
+
+    used = [ DERIVED[key][0] if key in derived else key for key in keys ] + list( operations )
+
+    con = connection()
+    con.register( 'cells', cells[list( dict.fromkeys( used ) )] )
+    try:
+        result = con.execute( query ).df()
+    finally:
+        con.unregister( 'cells' )
+
+    for col in keys:
+        result[col] = result[col].astype( object if col in derived else cells[col].dtype )
+    for col, operation in operations.items():
+        if operation in ( 'min', 'max' ):
+            result[col] = result[col].astype( cells[col].dtype )
+
+    # Categorias ficam na ordem das categorias, como no groupby
+    return result.sort_values( keys, kind='stable' ).set_index( keys )
@@ -0,0 +1,338 @@
+# Bibliotecas necessárias
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from breeze import backend, ingest, parallel, synthetic
+from breeze.cleaning import clean_code
+from breeze.cube import CUBES, Cube, spec_columns
+from breeze.loader import page_cubes
+from breeze.spatial import SpatialIndex
+from breeze.warmup import DEFAULT_FILTERS
+
+# -----------------------------------------------------------------
+
+# Diretório dos dados sintéticos, dos resultados e da referência
+BENCH_DIR = 'benchmarks'
+BASELINE_PATH = os.path.join( BENCH_DIR, 'baseline.json' )
+
+# Execuções de cada etapa de consulta e de carga em memória (vale a mais
+# rápida). A ingestão em pedaços roda uma única vez.
+REPEAT = 5
+LOAD_REPEAT = 3
+
+# Uma etapa é uma regressão quando fica mais de TOLERANCE mais lenta que
+# a referência e a diferença passa de MIN_SECONDS (ruído do relógio)
+TOLERANCE = 0.25
+MIN_SECONDS = 0.005
+
+# Itens do ambiente que mudam os tempos: com valores diferentes dos da
+# referência a comparação não vale (ver environment_changes)
+COMPARABLE = ( 'cpus', 'workers', 'backend' )
+
+# Acima deste volume o dataset não é carregado em memória: apenas a
+# ingestão em pedaços e as consultas nos cubos gravados são medidas
+IN_MEMORY_ROWS = 5_000_000
+
+# Filtros restritos: poucas células e pedidos selecionados
+NARROW_FILTERS = (
+    pd.Timestamp( 2022, 3, 1 ),
+    [ 'Urban' ],
+    [ 'conditions Sunny', 'conditions Fog' ],
+    [ 'Jam' ],
+)
+
+# Agregações de cada gráfico e tabela das páginas:
+#   etapa -> ( cubo, agrupamento, coluna, estatísticas )
+PAGE_AGGREGATIONS = {
+    # pages/1_Visão_Empresa.py
+    'empresa.pedidos_por_dia': ( 'orders', 'Order_Date', 'ID', 'count' ),
+    'empresa.pedidos_por_trafego': ( 'orders', 'Road_traffic_density', 'ID', 'count' ),
+    'empresa.pedidos_por_cidade_e_trafego': ( 'orders', ['City', 'Road_traffic_density'], 'ID', 'count' ),
+    'empresa.pedidos_por_semana': ( 'orders', 'week_of_year', 'ID', 'count' ),
+    'empresa.entregadores_por_semana': ( 'deliverers', 'week_of_year', 'Delivery_person_ID', 'nunique' ),
+    'empresa.entregadores_por_semana_aproximado': ( 'uniques', 'week_of_year', 'Delivery_person_ID', 'approx_nunique' ),
+    'empresa.mapa_entregas': ( 'delivery_grid', ['Delivery_location_latitude', 'Delivery_location_longitude'], 'ID', 'count' ),
+    'empresa.mapa_restaurantes': ( 'restaurant_grid', ['Restaurant_latitude', 'Restaurant_longitude'], 'ID', 'count' ),
+    'empresa.mapa_medianas': ( 'delivery_grid', ['City', 'Road_traffic_density'], 'Delivery_location_latitude', 'median' ),
+
+    # pages/2_Visão_Entregadores.py
+    'entregadores.idade': ( 'deliverers', [], 'Delivery_person_Age', ['min', 'max'] ),
+    'entregadores.condicao_veiculo': ( 'deliverers', [], 'Vehicle_condition', ['min', 'max'] ),
+    'entregadores.avaliacao_por_entregador': ( 'deliverers', 'Delivery_person_ID', 'Delivery_person_Ratings', 'mean' ),
+    'entregadores.avaliacao_por_trafego': ( 'ratings', 'Road_traffic_density', 'Delivery_person_Ratings', ['mean', 'std'] ),
+    'entregadores.avaliacao_por_clima': ( 'ratings', 'Weatherconditions', 'Delivery_person_Ratings', ['mean', 'std'] ),
+    'entregadores.mais_rapidos': ( 'deliverers', ['City', 'Delivery_person_ID'], 'Time_taken(min)', 'min' ),
+    'entregadores.mais_lentos': ( 'deliverers', ['City', 'Delivery_person_ID'], 'Time_taken(min)', 'max' ),
+
+    # pages/3_Visão_Restaurante.py
+    'restaurante.entregadores_unicos': ( 'deliverers', [], 'Delivery_person_ID', 'nunique' ),
+    'restaurante.entregadores_unicos_aproximado': ( 'uniques', [], 'Delivery_person_ID', 'approx_nunique' ),
+    'restaurante.tempo_por_festival': ( 'orders', 'Festival', 'Time_taken(min)', ['mean', 'std'] ),
+    'restaurante.distancia_media': ( 'orders', [], 'distance', 'mean' ),
+    'restaurante.tempo_por_cidade': ( 'orders', 'City', 'Time_taken(min)', ['mean', 'std'] ),
+    'restaurante.tempo_por_cidade_e_pedido': ( 'orders', ['City', 'Type_of_order'], 'Time_taken(min)', ['mean', 'std'] ),
+    'restaurante.distancia_por_cidade': ( 'orders', 'City', 'distance', 'mean' ),
+    'restaurante.percentis_por_cidade_e_trafego': ( 'times', ['City', 'Road_traffic_density'], 'Time_taken(min)', ['p50', 'p90', 'p99'] ),
+    'restaurante.percentis_por_festival_e_pedido': ( 'times', ['Festival', 'Type_of_order'], 'Time_taken(min)', ['p50', 'p90', 'p99'] ),
+    'restaurante.tempo_por_distancia': ( 'distances', 'distance', 'Time_taken(min)', ['count', 'mean', 'std'] ),
+    'restaurante.tempo_por_cidade_e_trafego': ( 'orders', ['City', 'Road_traffic_density'], 'Time_taken(min)', ['mean', 'std'] ),
+}
+
+# -----------------------------------------------------------------
+
+# Funções
+def measure( fn, repeat=1 ):
+    """ Esta função mede o tempo de fn, executada repeat vezes.
+
+            Input: Função sem argumentos, repetições
+            Output: Tupla ( menor tempo em segundos, resultado )
+    """
+    best = np.inf
+    for _ in range( repeat ):
+        start = time.perf_counter()
+        result = fn()
+        best = min( best, time.perf_counter() - start )
+
+    return best, result
+
+
+def dataset_path( scale ):
+    """ Esta função devolve o CSV sintético de uma escala, gerando o
+        arquivo na primeira vez (ver breeze.synthetic).
+
+            Input: Escala
+            Output: Caminho do CSV
+    """
+    csv_path = os.path.join( BENCH_DIR, 'data', f'x{scale:g}', 'train.csv' )
+    if not os.path.exists( csv_path ):
+        synthetic.generate( csv_path, scale )
+
+    return csv_path
+
+
+def run( scale, repeat=REPEAT ):
+    """ Esta função executa os benchmarks de uma escala: carga (leitura,
+        limpeza, cubos e ingestão em pedaços), índice espacial, recorte
+        dos cubos pelos filtros da barra lateral e cada agregação das
+        páginas.
+
+            Input: Escala, repetições das etapas de consulta
+            Output: Dicionário com a escala, as linhas, o ambiente e os
+                    segundos de cada etapa
+    """
+    csv_path = dataset_path( scale )
+    rows = int( synthetic.BASE_ROWS * scale )
+    stages = {}
+
+    # ----- Carga em memória -----
+    cubes = None
+    if rows <= IN_MEMORY_ROWS:
+        stages['carga.read_csv'], df_raw = measure( lambda: pd.read_csv( csv_path ), LOAD_REPEAT )
+        stages['carga.clean_code'], df1 = measure( lambda: clean_code( df_raw ), LOAD_REPEAT )
+        del df_raw
+
+        # ----- Leitura e limpeza só com as colunas dos cubos de cada página -----
+        for page, names in page_cubes().items():
+            columns = list( dict.fromkeys( col for name in names for col in spec_columns( CUBES[name] ) ) )
+            stages[f'carga.colunas.{page}'], _ = measure( lambda: parallel.clean_csv( csv_path, columns=columns ),
+                                                          LOAD_REPEAT )
+
+        stages['carga.cubos'], cubes = measure(
+            lambda: { name: Cube( parallel.build_cells_partitioned( df1, spec ), spec, indexed=True )
+                      for name, spec in CUBES.items() }, LOAD_REPEAT )
+
+        # ----- Índice espacial -----
+        stages['espacial.indice'], spatial = measure( lambda: SpatialIndex( df1 ), LOAD_REPEAT )
+        lat, lon = spatial.center
+        stages['espacial.raio'], _ = measure( lambda: spatial.within( lat, lon, 10, 'delivery', DEFAULT_FILTERS ), repeat )
+        stages['espacial.restaurantes_proximos'], _ = measure( lambda: spatial.nearest_restaurants( lat, lon, 5 ), repeat )
+        del df1, spatial
+
+    # ----- Ingestão em pedaços (armazenamento temporário) -----
+    # Os cubos gravados são lidos sob demanda: o armazenamento só é
+    # apagado depois de todas as consultas
+    store_dir = tempfile.mkdtemp( prefix='breeze-bench-' )
+    try:
+        store = os.path.join( store_dir, 'store' )
+        stages['carga.ingest'], _ = measure( lambda: ingest.ingest( csv_path, store ) )
+
+        # Abre os cubos e faz o primeiro recorte, que lê as semanas do disco
+        stages['carga.read_cubes'], _ = measure(
+            lambda: { name: cube.select( *DEFAULT_FILTERS ) for name, cube in ingest.read_cubes( store ).items() },
+            LOAD_REPEAT )
+
+        if cubes is None:
+            cubes = ingest.read_cubes( store )
+
+        # ----- Recorte dos cubos pelos filtros -----
+        stages['cubos.recorte'], selected = measure(
+            lambda: { name: cube.select( *DEFAULT_FILTERS ) for name, cube in cubes.items() }, repeat )
+        stages['cubos.recorte_restrito'], _ = measure(
+            lambda: { name: cube.select( *NARROW_FILTERS ) for name, cube in cubes.items() }, repeat )
+
+        # ----- Agregações das páginas -----
+        for stage, ( name, by, column, stats ) in PAGE_AGGREGATIONS.items():
+            stages[stage], _ = measure( lambda: selected[name].rollup( by, column, stats ), repeat )
+    finally:
+        shutil.rmtree( store_dir, ignore_errors=True )
+
+    return {
+        'scale': scale,
+        'rows': rows,
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'cpus': os.cpu_count(),
+            'workers': parallel.WORKERS,
+            'backend': backend.BACKEND,
+        },
+        'stages': { stage: round( seconds, 6 ) for stage, seconds in stages.items() },
+    }
+
+
+def compare( result, baseline, tolerance=TOLERANCE ):
+    """ Esta função compara os tempos de uma execução com a referência
+        da mesma escala.
+
+            Input: Resultado de run, resultado de referência, tolerância
+            Output: Lista de tuplas ( etapa, referência, atual, razão )
+                    das regressões
+    """
+    regressions = []
+    for stage, seconds in result['stages'].items():
+        reference = baseline['stages'].get( stage )
+        if reference is None:
+            continue
+        if seconds > reference * ( 1 + tolerance ) and seconds - reference > MIN_SECONDS:
+            regressions.append( ( stage, reference, seconds, seconds / reference ) )
+
+    return regressions
+
+
+def missing_stages( result, baseline ):
+    """ Esta função lista as etapas que não podem ser comparadas: as
+        medidas sem referência (etapas novas) e as da referência que não
+        foram medidas (etapas removidas ou renomeadas). As duas indicam
+        que a referência precisa ser gravada de novo.
+
+            Input: Resultado de run, resultado de referência
+            Output: Lista de tuplas ( etapa, motivo )
+    """
+    missing = [ ( stage, 'sem referência' ) for stage in result['stages'] if stage not in baseline['stages'] ]
+    missing += [ ( stage, 'não medida' ) for stage in baseline['stages'] if stage not in result['stages'] ]
+
+    return missing
+
+
+def environment_changes( result, baseline ):
+    """ Esta função compara o ambiente da execução com o da referência,
+        nos itens de COMPARABLE.
+
+            Input: Resultado de run, resultado de referência
+            Output: Lista de tuplas ( item, referência, atual ) dos itens
+                    diferentes
+    """
+    recorded = baseline.get( 'environment', {} )
+    current = result['environment']
+
+    return [ ( key, recorded.get( key ), current.get( key ) )
+             for key in COMPARABLE if recorded.get( key ) != current.get( key ) ]
+
+
+def read_baseline( path=BASELINE_PATH ):
+    """ Esta função lê a referência gravada ( escala -> resultado ). """
+    if not os.path.exists( path ):
+        return {}
+
+    with open( path ) as file:
+        return json.load( file )
+
+
+def write_json( data, path ):
+    """ Esta função grava um dicionário em JSON, com as chaves em ordem. """
+    os.makedirs( os.path.dirname( path ) or '.', exist_ok=True )
+    with open( path, 'w' ) as file:
+        json.dump( data, file, indent=2, sort_keys=True )
+        file.write( '\n' )
+
+
+def report( result, baseline ):
+    """ Esta função imprime os tempos de uma escala, lado a lado com a
+        referência quando ela existe. """
+    print( f'\nEscala x{result["scale"]:g} ({result["rows"]} pedidos)' )
+    for stage, seconds in result['stages'].items():
+        reference = baseline['stages'].get( stage ) if baseline else None
+        line = f'  {stage:<52} {seconds * 1000:10.2f} ms'
+        if reference:
+            line += f'   referência {reference * 1000:10.2f} ms   x{seconds / reference:5.2f}'
+        elif baseline:
+            line += '   sem referência'
+        print( line )
+
+    if baseline:
+        for key, recorded, current in environment_changes( result, baseline ):
+            print( f'  Aviso: {key} = {current}, mas a referência foi gravada com {key} = {recorded}; '
+                   'os tempos não são comparáveis' )
+
+
+if __name__ == '__main__':
+    # Uso: python -m breeze.bench [escalas...] [--repeticoes N] [--tolerancia T] [--motor M] [--baseline]
+    parser = argparse.ArgumentParser( prog='python -m breeze.bench',
+                                      description='Benchmarks de carga, filtros e agregações das páginas.' )
+    parser.add_argument( 'escalas', nargs='*', type=float, default=[ 1 ],
+                         help=f'múltiplos do volume do train.csv (por exemplo {synthetic.SCALES})' )
+    parser.add_argument( '--repeticoes', type=int, default=REPEAT )
+    parser.add_argument( '--tolerancia', type=float, default=TOLERANCE )
+    parser.add_argument( '--motor', choices=backend.BACKENDS, default=backend.BACKEND,
+                         help='motor das agregações dos cubos (ver breeze/backend.py)' )
+    parser.add_argument( '--baseline', action='store_true',
+                         help=f'grava os tempos como a nova referência em {BASELINE_PATH}' )
+    args = parser.parse_args()
+    backend.BACKEND = args.motor
+
+    baseline = read_baseline()
+    regressions = []
+    missing = []
+
+    for scale in args.escalas:
+        result = run( scale, args.repeticoes )
+        write_json( result, os.path.join( BENCH_DIR, f'results-x{scale:g}.json' ) )
+
+        reference = baseline.get( f'{scale:g}' )
+        report( result, reference )
+
+        if args.baseline:
+            baseline[f'{scale:g}'] = result
+        elif reference:
+            regressions += [ ( f'x{scale:g}', ) + regression
+                             for regression in compare( result, reference, args.tolerancia ) ]
+            missing += [ ( f'x{scale:g}', ) + stage for stage in missing_stages( result, reference ) ]
+        elif baseline:
+            missing.append( ( f'x{scale:g}', 'todas as etapas', 'escala sem referência' ) )
+
+    if args.baseline:
+        write_json( baseline, BASELINE_PATH )
+        print( f'\nReferência gravada em {BASELINE_PATH}' )
+
+    if missing:
+        print( '\nEtapas fora da referência (grave de novo com --baseline):' )
+        for scale, stage, reason in missing:
+            print( f'  {scale} {stage}: {reason}' )
+
+    if regressions:
+        print( '\nRegressões:' )
+        for scale, stage, reference, seconds, ratio in regressions:
+            print( f'  {scale} {stage}: {reference * 1000:.2f} ms -> {seconds * 1000:.2f} ms (x{ratio:.2f})' )
+
+    if regressions or missing:
+        sys.exit( 1 )
@@ -0,0 +1,200 @@
+# Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from breeze import results
+
+# -----------------------------------------------------------------
+
+# Gráficos das páginas. Cada um é desenhado uma única vez por estado dos
+# filtros e guardado no cache de resultados (ver results.cached), a
+# partir das agregações em cache dos recortes (ver results.select). As
+# páginas e o aquecimento (breeze.warmup) usam as mesmas funções, então
+# o aquecimento preenche exatamente as entradas que a página lê.
+
+# Funções
+# ----- pages/1_Visão_Empresa.py -----
+def pedidos_por_dia( cubes, filtros ):
+    """ Esta função desenha o gráfico de barras dos pedidos por dia.
+
+            Input: Dicionário de cubos, filtros da barra lateral
+            Output: Figura do Plotly
+    """
+    def build():
+        df_aux = results.select( cubes, 'orders', filtros ).rollup( 'Order_Date', 'ID', 'count' ).reset_index()
+        return px.bar( df_aux, x='Order_Date', y='ID' )
+
+    return results.cached( cubes, filtros, 'empresa/pedidos_por_dia', build )
+
+
+def pedidos_por_trafego( cubes, filtros ):
+    """ Esta função desenha o gráfico de pizza da fração dos pedidos em
+        cada tipo de tráfego.
+
+            Input: Dicionário de cubos, filtros da barra lateral
+            Output: Figura do Plotly
+    """
+    def build():
+        df_aux = results.select( cubes, 'orders', filtros ).rollup( 'Road_traffic_density', 'ID', 'count' ).reset_index()
+        df_aux['entregas_percent'] = df_aux['ID'] / df_aux['ID'].sum()
+        return px.pie( df_aux, values='entregas_percent', names='Road_traffic_density' )
+
+    return results.cached( cubes, filtros, 'empresa/pedidos_por_trafego', build )
+
+
+def pedidos_por_cidade_e_trafego( cubes, filtros ):
+    """ Esta função desenha o gráfico de bolhas do volume de pedidos por
+        cidade e tipo de tráfego.
+
+            Input: Dicionário de cubos, filtros da barra lateral
+            Output: Figura do Plotly
+    """
+    def build():
+        df_aux = (results.select( cubes, 'orders', filtros )
+                         .rollup( ['City', 'Road_traffic_density'], 'ID', 'count' ).reset_index())
+        return px.scatter( df_aux, x='City', y='Road_traffic_density', size='ID', color='City' )
+
+    return results.cached( cubes, filtros, 'empresa/pedidos_por_cidade_e_trafego', build )
+
+
+def pedidos_por_semana( cubes, filtros ):
+    """ Esta função desenha o gráfico de linha dos pedidos por semana
+        (semana derivada de Order_Date no próprio cubo).
+
+            Input: Dicionário de cubos, filtros da barra lateral
+            Output: Figura do Plotly
+    """
+    def build():
+        df_aux = results.select( cubes, 'orders', filtros ).rollup( 'week_of_year', 'ID', 'count' ).reset_index()
+        return px.line( df_aux, x='week_of_year', y='ID' )
+
+    return results.cached( cubes, filtros, 'empresa/pedidos_por_semana', build )
+
+
+def pedidos_por_entregador( cubes, filtros, aproximado ):
+    """ Esta função desenha o gráfico de linha dos pedidos por
+        entregador em cada semana.
+
+            Input: Dicionário de cubos, filtros da barra lateral, True
+                   para contar os entregadores pelo HyperLogLog
+            Output: Figura do Plotly
+    """
+    def build():
+        df_aux01 = results.select( cubes, 'orders', filtros ).rollup( 'week_of_year', 'ID', 'count' ).reset_index()
+        if aproximado:
+            df_aux02 = (results.select( cubes, 'uniques', filtros )
+                               .rollup( 'week_of_year', 'Delivery_person_ID', 'approx_nunique' ).reset_index())
+        else:
+            df_aux02 = (results.select( cubes, 'deliverers', filtros )
+                               .rollup( 'week_of_year', 'Delivery_person_ID', 'nunique' ).reset_index())
+
+        df_aux = pd.merge( df_aux01, df_aux02, how='inner' )
+        df_aux['order_by_deliver'] = df_aux['ID'] / df_aux['Delivery_person_ID']
+        return px.line( df_aux, x='week_of_year', y='order_by_deliver' )
+
+    return results.cached( cubes, filtros, ( 'empresa/pedidos_por_entregador', aproximado ), build )
+
+
+# ----- pages/3_Visão_Restaurante.py -----
+def tempo_por_cidade( cubes, filtros ):
+    """ Esta função desenha o tempo médio de entrega por cidade, com o
+        desvio padrão como barra de erro.
+
+            Input: Dicionário de cubos, filtros da barra lateral
+            Output: Figura do Plotly
+    """
+    def build():
+        df_aux = results.select( cubes, 'orders', filtros ).rollup( 'City', 'Time_taken(min)', ['mean', 'std'] )
+        df_aux.columns = ['avg_time', 'std_time']
+        df_aux = df_aux.reset_index()
+
+        fig = go.Figure()
+        fig.add_trace( go.Bar( name='Control', x=df_aux['City'], y=df_aux['avg_time'],
+                               error_y=dict( type='data', array=df_aux['std_time'] ) ) )
+        fig.update_layout( barmode='group' )
+        return fig
+
+    return results.cached( cubes, filtros, 'restaurante/tempo_por_cidade', build )
+
+
+def distancia_por_cidade( cubes, filtros ):
+    """ Esta função desenha o gráfico de pizza da distância média das
+        entregas por cidade.
+
+            Input: Dicionário de cubos, filtros da barra lateral
+            Output: Figura do Plotly
+    """
+    def build():
+        avg_distance = results.select( cubes, 'orders', filtros ).rollup( 'City', 'distance', 'mean' ).reset_index()
+        return go.Figure( data=[ go.Pie( labels=avg_distance['City'], values=avg_distance['distance'],
+                                         pull=[0, 0.1, 0] ) ] )
+
+    return results.cached( cubes, filtros, 'restaurante/distancia_por_cidade', build )
+
+
+def percentis( cubes, filtros ):
+    """ Esta função desenha os percentis 50, 90 e 99 do tempo de entrega
+        por cidade e densidade de tráfego.
+
+            Input: Dicionário de cubos, filtros da barra lateral
+            Output: Figura do Plotly
+    """
+    def build():
+        df_aux = (results.select( cubes, 'times', filtros )
+                         .rollup( ['City', 'Road_traffic_density'], 'Time_taken(min)', ['p50', 'p90', 'p99'] ))
+        df_aux = df_aux.reset_index()
+        df_aux['grupo'] = df_aux['City'].astype( str ) + ' - ' + df_aux['Road_traffic_density'].astype( str )
+
+        return px.bar( df_aux, x='grupo', y=['p50', 'p90', 'p99'], barmode='group',
+                       labels={'grupo': '', 'value': 'Tempo (min)', 'variable': 'Percentil'} )
+
+    return results.cached( cubes, filtros, 'restaurante/percentis', build )
+
+
+def tempo_por_distancia( cubes, filtros ):
+    """ Esta função desenha o tempo médio de entrega por faixa de
+        distância (faixas calculadas na agregação do cubo distances).
+
+            Input: Dicionário de cubos, filtros da barra lateral
+            Output: Figura do Plotly
+    """
+    def build():
+        df_aux = (results.select( cubes, 'distances', filtros )
+                         .rollup( 'distance', 'Time_taken(min)', ['count', 'mean', 'std'] ))
+        df_aux.columns = ['pedidos', 'avg_time', 'std_time']
+        df_aux = df_aux.reset_index()
+
+        fig = go.Figure()
+        fig.add_trace( go.Bar( x=df_aux['distance'].astype( str ), y=df_aux['avg_time'],
+                               error_y=dict( type='data', array=df_aux['std_time'] ),
+                               text=df_aux['pedidos'],
+                               hovertemplate='%{x}: %{y:.2f} min (%{text} pedidos)<extra></extra>' ) )
+        fig.update_layout( xaxis_title='Distância', yaxis_title='Tempo médio (min)' )
+        return fig
+
+    return results.cached( cubes, filtros, 'restaurante/tempo_por_distancia', build )
+
+
+def desvio_por_cidade_e_trafego( cubes, filtros ):
+    """ Esta função desenha o sunburst do tempo médio de entrega por
+        cidade e densidade de tráfego, colorido pelo desvio padrão.
+
+            Input: Dicionário de cubos, filtros da barra lateral
+            Output: Figura do Plotly
+    """
+    def build():
+        df_aux = (results.select( cubes, 'orders', filtros )
+                         .rollup( ['City', 'Road_traffic_density'], 'Time_taken(min)', ['mean', 'std'] ))
+        df_aux.columns = ['avg_time', 'std_time']
+        df_aux = df_aux.reset_index()
+
+        # Categorias fora dos filtros viram fatias vazias no sunburst
+        df_aux[['City', 'Road_traffic_density']] = df_aux[['City', 'Road_traffic_density']].astype( str )
+
+        return px.sunburst( df_aux, path=['City', 'Road_traffic_density'], values='avg_time',
+                            color='std_time', color_continuous_scale='RdBu',
+                            color_continuous_midpoint=np.average( df_aux['std_time'] ) )
+
+    return results.cached( cubes, filtros, 'restaurante/desvio_por_cidade_e_trafego', build )
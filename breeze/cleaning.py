@@ -0,0 +1,128 @@
+# Bibliotecas necessárias
+import pandas as pd
+from haversine import haversine_vector
+
+from breeze import instrument
+from breeze.schema import apply_schema
+
+# -----------------------------------------------------------------
+
+# Colunas lidas sempre: as linhas com NaN nelas são removidas, mesmo
+# quando a coluna em si não é usada
+ROW_FILTER_COLUMNS = [
+    'Delivery_person_Age',
+    'Road_traffic_density',
+    'City',
+    'Festival',
+    'multiple_deliveries',
+]
+
+# Colunas calculadas na limpeza -> colunas do CSV de onde elas saem
+DERIVED_COLUMNS = {
+    'distance': [
+        'Restaurant_latitude',
+        'Restaurant_longitude',
+        'Delivery_location_latitude',
+        'Delivery_location_longitude',
+    ],
+}
+
+# -----------------------------------------------------------------
+
+# Funções
+def csv_columns( columns ):
+    """ Esta função lista as colunas do CSV necessárias para obter as
+        colunas limpas pedidas (ver ROW_FILTER_COLUMNS e DERIVED_COLUMNS).
+
+            Input: Colunas do dataframe limpo
+            Output: Lista de colunas do CSV
+    """
+    needed = list( ROW_FILTER_COLUMNS )
+    for col in columns:
+        needed += DERIVED_COLUMNS.get( col, [ col ] )
+
+    return list( dict.fromkeys( needed ) )
+
+
+def clean_code( df1 ):
+    """ Esta função tem a responsabilidade de limpar o dataframe
+        Tipos de Limpeza:
+            1. Remoção de dados NaN.
+            2. Mudança do tipo da coluna de dados.
+            3. Remoção dos espaços das variáveis de texto.
+            4. Formatação da coluna de datas
+            5. Limpeza da coluna de tempo ( remoção do texto da variável numérica)
+            6. Cálculo da distância entre restaurante e local de entrega
+            7. Conversão para o schema compacto (ver breeze.schema)
+
+        Apenas as colunas presentes são limpas: o CSV pode ser lido só
+        com as colunas de csv_columns.
+
+            Input: Dataframe
+            Output: Dataframe
+    """
+    # ---------------------------- Limpeza -----------------------------
+
+    df1 = df1[
+        (df1['Delivery_person_Age'] != 'NaN ') &
+        (df1['Road_traffic_density'] != 'NaN ') &
+        (df1['City'] != 'NaN ') &
+        (df1['Festival'] != 'NaN ') &
+        (df1['multiple_deliveries'] != 'NaN ')
+    ].copy()
+
+    # ----------------------- Conversões de tipo ------------------------
+
+    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype( int )
+    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype( int )
+    if 'Delivery_person_Ratings' in df1:
+        df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype( float )
+    if 'Order_Date' in df1:
+        df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format='%d-%m-%Y' )
+
+    # ------------------------ Remoção de espaços ------------------------
+    cols_str = [
+        "ID",
+        "Road_traffic_density",
+        "Type_of_order",
+        "Type_of_vehicle",
+        "City",
+        "Festival"
+    ]
+
+    for col in cols_str:
+        if col in df1:
+            df1[col] = df1[col].astype(str).str.strip()
+
+    # ----------------- Limpeza da coluna time_taken(min) -----------------
+    if 'Time_taken(min)' in df1:
+        df1['Time_taken(min)'] = df1['Time_taken(min)'].str.split(' ').str[1].astype(int)
+
+    # ------------------- Distância da entrega (Km) -------------------
+    if set( DERIVED_COLUMNS['distance'] ) <= set( df1.columns ):
+        with instrument.stage( 'limpeza.distancia' ):
+            df1['distance'] = delivery_distance( df1 )
+
+    # ------------------------ Schema compacto ------------------------
+    df1 = apply_schema( df1 )
+
+    return df1
+
+
+def delivery_distance( df1 ):
+    """ Esta função calcula a distância em Km entre o restaurante e o
+        local de entrega de cada pedido, de forma vetorizada (uma única
+        chamada ao haversine para todas as linhas).
+
+            Input: Dataframe com as colunas de latitude e longitude
+            Output: Series com a distância de cada pedido
+    """
+    # haversine_vector não aceita vetores vazios ( partição sem pedidos
+    # depois da limpeza )
+    if df1.empty:
+        return pd.Series( index=df1.index, dtype='float64' )
+
+    restaurants = df1[['Restaurant_latitude', 'Restaurant_longitude']].to_numpy()
+    deliveries = df1[['Delivery_location_latitude', 'Delivery_location_longitude']].to_numpy()
+
+    return pd.Series( haversine_vector( restaurants, deliveries ), index=df1.index )
@@ -0,0 +1,594 @@
+# Bibliotecas necessárias
+import re
+
+import numpy as np
+import pandas as pd
+
+from breeze import backend, hll
+from breeze.filters import FilterEngine
+
+# -----------------------------------------------------------------
+
+# Dimensões filtradas pela barra lateral, presentes em todos os cubos
+# (a semana do ano é derivada de Order_Date na hora da consulta)
+FILTER_DIMENSIONS = [
+    'Order_Date',
+    'City',
+    'Road_traffic_density',
+    'Weatherconditions',
+]
+
+# Prefixo das colunas do cubo para cada medida do dataset
+PREFIXES = {
+    'Time_taken(min)': 'time',
+    'Delivery_person_Ratings': 'rating',
+    'distance': 'distance',
+    'Delivery_person_Age': 'age',
+    'Vehicle_condition': 'vehicle',
+    'Delivery_person_ID': 'deliverer',
+}
+
+# Contagem de pedidos (equivale a contar a coluna ID)
+COUNT_COLUMN = 'ID'
+
+# Especificação de cada cubo:
+#   - dimensions: colunas de agrupamento das células
+#   - moments: medidas com contagem, soma e soma dos quadrados
+#              (count, sum, mean, std, var)
+#   - extremes: medidas com mínimo e máximo (min, max)
+#   - sketches: colunas com um HyperLogLog por célula (approx_nunique)
+#   - rounding: casas decimais das dimensões numéricas contínuas
+#   - bins: limites das faixas de dimensões numéricas agrupadas em
+#           faixas (a dimensão guarda o rótulo da faixa)
+#   - collapse: para cubos com quase uma célula por pedido, as
+#               dimensões que as páginas agrupam depois dos filtros.
+#               No armazenamento em disco as células não são carregadas:
+#               cada recorte é lido em partes e reduzido a essas
+#               dimensões (ver collapse_cells). Vazio nos demais cubos.
+ORDERS = {
+    'dimensions': FILTER_DIMENSIONS + [ 'Festival', 'Type_of_order' ],
+    'moments': [ 'Time_taken(min)', 'Delivery_person_Ratings', 'distance' ],
+    'extremes': [],
+    'sketches': [],
+    'rounding': {},
+    'bins': {},
+    'collapse': [],
+}
+
+DELIVERERS = {
+    'dimensions': FILTER_DIMENSIONS + [ 'Delivery_person_ID' ],
+    'moments': [ 'Delivery_person_Ratings' ],
+    'extremes': [ 'Time_taken(min)', 'Delivery_person_Age', 'Vehicle_condition' ],
+    'sketches': [],
+    'rounding': {},
+    'bins': {},
+    'collapse': [ 'week_of_year', 'City', 'Delivery_person_ID' ],
+}
+
+# Grade do mapa: coordenadas arredondadas em 2 casas (~1,1 km). Cada
+# célula conta os pedidos de um quadrado da grade, de onde saem as
+# camadas de calor e de agrupamento do mapa e as medianas das entregas
+# por cidade e tráfego (exatas a menos desse arredondamento)
+GRID_DECIMALS = 2
+
+DELIVERY_GRID = {
+    'dimensions': FILTER_DIMENSIONS + [ 'Delivery_location_latitude', 'Delivery_location_longitude' ],
+    'moments': [],
+    'extremes': [],
+    'sketches': [],
+    'rounding': { 'Delivery_location_latitude': GRID_DECIMALS, 'Delivery_location_longitude': GRID_DECIMALS },
+    'bins': {},
+    'collapse': [ 'City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude' ],
+}
+
+RESTAURANT_GRID = {
+    'dimensions': FILTER_DIMENSIONS + [ 'Restaurant_latitude', 'Restaurant_longitude' ],
+    'moments': [],
+    'extremes': [],
+    'sketches': [],
+    'rounding': { 'Restaurant_latitude': GRID_DECIMALS, 'Restaurant_longitude': GRID_DECIMALS },
+    'bins': {},
+    'collapse': [ 'Restaurant_latitude', 'Restaurant_longitude' ],
+}
+
+# Faixas de distância entre restaurante e entrega, em Km
+DISTANCE_BANDS = [ 0, 3, 6, 9, 12, 15, np.inf ]
+
+DISTANCES = {
+    'dimensions': FILTER_DIMENSIONS + [ 'distance' ],
+    'moments': [ 'Time_taken(min)' ],
+    'extremes': [],
+    'sketches': [],
+    'rounding': {},
+    'bins': { 'distance': DISTANCE_BANDS },
+    'collapse': [],
+}
+
+# Histograma esparso do tempo de entrega: cada célula conta os pedidos
+# de um minuto. Juntar células é somar contagens, então os percentis de
+# qualquer combinação de filtros saem das células sem ordenar os
+# pedidos (exatos, já que o tempo é medido em minutos inteiros)
+TIMES = {
+    'dimensions': FILTER_DIMENSIONS + [ 'Festival', 'Type_of_order', 'Time_taken(min)' ],
+    'moments': [],
+    'extremes': [],
+    'sketches': [],
+    'rounding': { 'Time_taken(min)': 0 },
+    'bins': {},
+    'collapse': [],
+}
+
+# Entregadores distintos aproximados: só as dimensões dos filtros, para
+# que o cubo (2 KB de sketch por célula) não cresça com o volume e a
+# contagem custe o mesmo para qualquer tamanho de dataset
+UNIQUES = {
+    'dimensions': FILTER_DIMENSIONS,
+    'moments': [],
+    'extremes': [],
+    'sketches': [ 'Delivery_person_ID' ],
+    'rounding': {},
+    'bins': {},
+    'collapse': [],
+}
+
+# Avaliações por combinação dos filtros: a página dos entregadores as
+# agrupa por trânsito e clima sem depender do cubo dos pedidos, que
+# lê as coordenadas para calcular a distância
+RATINGS = {
+    'dimensions': FILTER_DIMENSIONS,
+    'moments': [ 'Delivery_person_Ratings' ],
+    'extremes': [],
+    'sketches': [],
+    'rounding': {},
+    'bins': {},
+    'collapse': [],
+}
+
+CUBES = {
+    'orders': ORDERS,
+    'deliverers': DELIVERERS,
+    'times': TIMES,
+    'uniques': UNIQUES,
+    'delivery_grid': DELIVERY_GRID,
+    'restaurant_grid': RESTAURANT_GRID,
+    'distances': DISTANCES,
+    'ratings': RATINGS,
+}
+
+# Percentis pedidos como estatística: 'p50', 'p90', 'p99', 'p99.9'...
+PERCENTILE = re.compile( r'p(\d+(?:\.\d+)?)' )
+
+# Estatísticas que valem 0 sobre uma seleção vazia (as demais são NaN),
+# como em Series.agg sobre uma Series vazia
+ZERO_STATS = ( 'count', 'sum', 'nunique', 'approx_nunique' )
+
+# -----------------------------------------------------------------
+
+# Funções
+def band_labels( edges ):
+    """ Esta função nomeia as faixas definidas por uma lista de limites.
+
+            Input: Limites das faixas
+            Output: Lista de rótulos ( '0-3 km', ..., '15+ km' )
+    """
+    labels = []
+    for lower, upper in zip( edges[:-1], edges[1:] ):
+        labels.append( f'{lower:g}+ km' if np.isinf( upper ) else f'{lower:g}-{upper:g} km' )
+
+    return labels
+
+
+def spec_columns( spec ):
+    """ Esta função lista as colunas do dataset limpo lidas por um cubo.
+
+            Input: Especificação do cubo
+            Output: Lista de colunas
+    """
+    columns = spec['dimensions'] + spec['moments'] + spec['extremes'] + spec['sketches']
+
+    return list( dict.fromkeys( columns ) )
+
+
+def cell_operations( spec ):
+    """ Esta função descreve como as colunas de um cubo são combinadas
+        quando células com as mesmas dimensões se juntam. Os sketches
+        são combinados à parte (ver combine_sketches).
+
+            Input: Especificação do cubo
+            Output: Dicionário coluna -> operação ( sum, min ou max )
+    """
+    operations = { 'orders': 'sum' }
+    for col in spec['moments']:
+        prefix = PREFIXES[col]
+        operations.update( { prefix + '_n': 'sum', prefix + '_sum': 'sum', prefix + '_sumsq': 'sum' } )
+    for col in spec['extremes']:
+        prefix = PREFIXES[col]
+        operations.update( { prefix + '_min': 'min', prefix + '_max': 'max' } )
+
+    return operations
+
+
+def build_cells( df1, spec ):
+    """ Esta função agrega o dataframe limpo nas células de um cubo.
+        Cada célula é uma combinação observada das dimensões, com a
+        quantidade de pedidos, contagem, soma e soma dos quadrados das
+        medidas em moments (em float64, para não perder precisão) e
+        mínimo e máximo das medidas em extremes e um HyperLogLog das
+        colunas em sketches.
+
+            Input: Dataframe limpo, especificação do cubo
+            Output: Dataframe com uma linha por célula do cubo
+    """
+    values = { 'orders': np.ones( len( df1 ), dtype='int64' ) }
+    for col in spec['moments']:
+        prefix = PREFIXES[col]
+        measure = df1[col].astype( 'float64' )
+        values[prefix + '_n'] = measure.notna().astype( 'int64' )
+        values[prefix + '_sum'] = measure
+        values[prefix + '_sumsq'] = measure ** 2
+    for col in spec['extremes']:
+        prefix = PREFIXES[col]
+        values[prefix + '_min'] = df1[col]
+        values[prefix + '_max'] = df1[col]
+
+    df_aux = pd.DataFrame( values, index=df1.index )
+    for col in spec['dimensions']:
+        if col in spec['rounding']:
+            df_aux[col] = df1[col].round( spec['rounding'][col] )
+        elif col in spec['bins']:
+            edges = spec['bins'][col]
+            df_aux[col] = pd.cut( df1[col], edges, right=False, labels=band_labels( edges ) )
+        else:
+            df_aux[col] = df1[col]
+
+    grouped = df_aux.groupby( spec['dimensions'], observed=True, sort=False )
+    cells = grouped.agg( cell_operations( spec ) ).reset_index()
+
+    for col in spec['sketches']:
+        cells[PREFIXES[col] + '_hll'] = hll.to_bytes(
+            hll.build( group_codes( grouped ), df1[col].to_numpy(), len( cells ) ) )
+
+    return cells
+
+
+def concat_cells( frames, spec ):
+    """ Esta função concatena células de um mesmo cubo, mantendo as
+        dimensões de texto como categorias.
+
+            Input: Lista de dataframes de células, especificação do cubo
+            Output: Dataframe de células
+    """
+    cells = pd.concat( frames, ignore_index=True )
+
+    # Pedaços com categorias diferentes viram texto na concatenação
+    for col in spec['dimensions']:
+        if cells[col].dtype == object:
+            cells[col] = cells[col].astype( 'category' )
+
+    return cells
+
+
+def merge_cells( frames, spec ):
+    """ Esta função junta células de um mesmo cubo calculadas sobre
+        partes diferentes do dataset (por exemplo, pedaços do CSV).
+        O resultado é igual ao das células calculadas de uma só vez.
+
+            Input: Lista de dataframes de células, especificação do cubo
+            Output: Dataframe de células
+    """
+    cells = concat_cells( frames, spec )
+
+    grouped = cells.groupby( spec['dimensions'], observed=True, sort=False )
+    merged = grouped.agg( cell_operations( spec ) ).reset_index()
+
+    for col in spec['sketches']:
+        column = PREFIXES[col] + '_hll'
+        merged[column] = hll.to_bytes( combine_sketches( grouped, column, len( merged ) ) )
+
+    return merged
+
+
+def collapsed_spec( spec ):
+    """ Esta função descreve o cubo reduzido às dimensões de collapse.
+
+            Input: Especificação do cubo
+            Output: Especificação do cubo reduzido
+    """
+    return dict( spec, dimensions=spec['collapse'], collapse=[] )
+
+
+def collapse_cells( frames, spec ):
+    """ Esta função junta células já filtradas de um cubo apenas nas
+        dimensões de collapse, descartando as dimensões dos filtros. As
+        dimensões derivadas (week_of_year) são calculadas antes, então
+        a função também serve para juntar células já reduzidas.
+
+            Input: Lista de dataframes de células, especificação do cubo
+            Output: Dataframe de células do cubo reduzido (ver
+                    collapsed_spec)
+    """
+    reduced = collapsed_spec( spec )
+    merged = merge_cells( [ backend.derive( cells, reduced['dimensions'] ) for cells in frames ], reduced )
+
+    # Como nas páginas, a semana do ano fica como texto
+    for col in reduced['dimensions']:
+        if col in backend.DERIVED:
+            merged[col] = merged[col].astype( object )
+
+    return merged
+
+
+def group_codes( grouped ):
+    """ Esta função numera o grupo de cada linha, na ordem das linhas
+        do resultado da agregação (-1 para linhas sem grupo).
+
+            Input: Objeto groupby
+            Output: Array de inteiros
+    """
+    return grouped.ngroup().fillna( -1 ).to_numpy( dtype='int64' )
+
+
+def combine_sketches( grouped, column, groups ):
+    """ Esta função junta os sketches de cada grupo de células.
+
+            Input: Células agrupadas, coluna de sketches, quantidade de
+                   grupos
+            Output: Matriz de sketches ( grupos x registradores )
+    """
+    codes = group_codes( grouped )
+    sketches = hll.from_bytes( grouped.obj[column] )
+
+    valid = codes >= 0
+    return hll.merge( sketches[valid], codes[valid], groups )
+
+
+def weighted_quantile( values, weights, q ):
+    """ Esta função calcula o quantil q de valores repetidos weights
+        vezes, com o mesmo resultado de Series.quantile( q ) (interpolação
+        linear) sobre os valores expandidos.
+
+            Input: Array de valores, array de repetições, quantil entre
+                   0 e 1
+            Output: Quantil
+    """
+    order = np.argsort( values, kind='stable' )
+    values = np.asarray( values )[order]
+    cumulative = np.cumsum( np.asarray( weights )[order] )
+
+    position = (cumulative[-1] - 1) * q
+    rank = int( np.floor( position ) )
+    fraction = position - rank
+
+    lower = values[np.searchsorted( cumulative, rank, side='right' )]
+    if fraction == 0:
+        return lower
+
+    upper = values[np.searchsorted( cumulative, rank + 1, side='right' )]
+    return lower + (upper - lower) * fraction
+
+
+def percentile( stat ):
+    """ Esta função interpreta estatísticas como 'p90'.
+
+            Input: Nome da estatística
+            Output: Quantil entre 0 e 1, ou None se não for um percentil
+    """
+    match = PERCENTILE.fullmatch( stat )
+    if match is None or float( match.group( 1 ) ) > 100:
+        return None
+
+    return float( match.group( 1 ) ) / 100
+
+
+def empty_row( result, stats_list ):
+    """ Esta função monta a linha única de um rollup sem agrupamento
+        sobre uma seleção vazia: 0 nas estatísticas de ZERO_STATS e NaN
+        nas demais.
+
+            Input: Resultado vazio do rollup ( Series ou Dataframe ),
+                   estatísticas pedidas
+            Output: Resultado com uma linha
+    """
+    if isinstance( result, pd.Series ):
+        value = 0 if stats_list[0] in ZERO_STATS else np.nan
+        return pd.Series( [value], name=result.name )
+
+    return pd.DataFrame( { stat: [0 if stat in ZERO_STATS else np.nan] for stat in stats_list } )
+
+
+class Cube:
+    """ Cubo OLAP pré-agregado, descrito por uma das especificações de
+        CUBES.
+
+        Os gráficos são respondidos combinando células do cubo em vez
+        de percorrer os pedidos. O custo de cada consulta depende da
+        quantidade de células, não do volume de pedidos.
+
+        As células ficam ordenadas por Order_Date: a janela de datas é
+        recortada por busca binária e as células fora dela nem chegam a
+        ser lidas pelos demais filtros.
+
+        Um cubo consultado muitas vezes (indexed=True, os que ficam em
+        cache) guarda também um FilterEngine (ver breeze.filters): os
+        recortes não percorrem as células, o que importa nos cubos com
+        quase uma célula por pedido (entregadores e grades do mapa).
+    """
+
+    def __init__( self, cells, spec, indexed=False ):
+        # Cubos reduzidos por collapse_cells não têm Order_Date
+        if 'Order_Date' in cells and not cells['Order_Date'].is_monotonic_increasing:
+            cells = cells.sort_values( 'Order_Date', kind='stable', ignore_index=True )
+
+        self.cells = cells
+        self.spec = spec
+        self.engine = FilterEngine( cells ) if indexed and 'Order_Date' in cells else None
+
+    @classmethod
+    def from_frame( cls, df1, spec ):
+        """ Esta função constrói o cubo a partir do dataframe limpo. """
+        return cls( build_cells( df1, spec ), spec )
+
+    def select( self, date_cutoff, cities, weathers, traffics, date_start=None ):
+        """ Esta função aplica os filtros da barra lateral às células.
+
+                Input: Data de corte (exclusiva), cidades, climas e
+                       condições de trânsito selecionados, início
+                       opcional da janela de datas (inclusivo)
+                Output: Cubo apenas com as células selecionadas
+        """
+        if self.engine is not None:
+            rows = self.engine.rows( date_cutoff, cities, weathers, traffics, date_start )
+            return Cube( self.cells.iloc[rows], self.spec )
+
+        dates = self.cells['Order_Date'].to_numpy()
+        start = 0
+        if date_start is not None:
+            start = np.searchsorted( dates, np.datetime64( pd.Timestamp( date_start ) ), side='left' )
+        end = np.searchsorted( dates, np.datetime64( pd.Timestamp( date_cutoff ) ), side='left' )
+
+        cells = self.cells.iloc[start:end]
+        linhas_selecionadas = (
+            cells['City'].isin( cities ) &
+            cells['Weatherconditions'].isin( weathers ) &
+            cells['Road_traffic_density'].isin( traffics )
+        )
+
+        return Cube( cells.loc[linhas_selecionadas], self.spec )
+
+    def rollup( self, by, column, stats ):
+        """ Esta função agrega as células do cubo, com o mesmo resultado
+            de df1.groupby( by )[column].agg( stats ) sobre os pedidos.
+
+            Estatísticas suportadas:
+                - ID: 'count'
+                - medidas em moments: 'count', 'sum', 'mean', 'std', 'var'
+                - medidas em extremes: 'min', 'max'
+                - dimensões: 'nunique', 'median' e percentis ('p50',
+                  'p90', 'p99'...)
+                - colunas em sketches: 'approx_nunique' (HyperLogLog,
+                  erro padrão hll.standard_error())
+
+            'week_of_year' pode ser usado em by e é derivado de
+            Order_Date da mesma forma que nas páginas. Com by vazio o
+            cubo inteiro é agregado em uma única linha, mesmo sem
+            células (ver ZERO_STATS).
+
+                Input: Coluna(s) de agrupamento, coluna agregada,
+                       estatística ou lista de estatísticas
+                Output: Series (uma estatística) ou Dataframe (lista)
+                        indexado pelas colunas de agrupamento
+        """
+        keys = [by] if isinstance( by, str ) else list( by )
+        stats_list = [stats] if isinstance( stats, str ) else list( stats )
+
+        cells = self.cells
+        if not keys:
+            cells = cells.assign( _all=0 )
+        group_keys = keys or ['_all']
+
+        # Somas, mínimos e máximos das células saem de uma única agregação
+        # no motor configurado (ver backend.BACKEND), que também deriva
+        # week_of_year
+        operations = {}
+        for stat in stats_list:
+            operations.update( self.reductions( column, stat ) )
+        totals = backend.aggregate( cells, group_keys, operations ) if operations else None
+
+        # Percentis e sketches agrupam as células no pandas
+        grouped = None
+        if any( not self.reductions( column, stat ) for stat in stats_list ):
+            grouped = backend.derive( cells, group_keys ).groupby( group_keys, observed=True )
+
+        results = {}
+        for stat in stats_list:
+            results[stat] = self.statistic( grouped, totals, column, stat )
+
+        if isinstance( stats, str ):
+            result = results[stats].rename( column )
+        else:
+            result = pd.DataFrame( results )
+
+        if not keys:
+            result = result.reset_index( drop=True )
+        if not keys and result.empty:
+            result = empty_row( result, stats_list )
+
+        return result
+
+    def reductions( self, column, stat ):
+        """ Esta função lista as colunas das células que uma estatística
+            reduz por grupo, e com qual operação (ver backend.aggregate).
+            Sketches e percentis são calculados à parte.
+
+                Input: Coluna, estatística
+                Output: Dicionário coluna das células -> operação
+        """
+        spec = self.spec
+
+        if column == COUNT_COLUMN and stat == 'count':
+            return { 'orders': 'sum' }
+
+        if column in spec['dimensions'] and stat == 'nunique':
+            return { column: 'nunique' }
+
+        if column in spec['moments'] and stat in ( 'count', 'sum', 'mean', 'var', 'std' ):
+            prefix = PREFIXES[column]
+            return { prefix + '_n': 'sum', prefix + '_sum': 'sum', prefix + '_sumsq': 'sum' }
+
+        if column in spec['extremes'] and stat in ( 'min', 'max' ):
+            return { PREFIXES[column] + '_' + stat: stat }
+
+        return {}
+
+    def statistic( self, grouped, totals, column, stat ):
+        """ Esta função calcula uma estatística de uma coluna sobre as
+            células já agrupadas (ver rollup).
+
+                Input: Células agrupadas, reduções das células por grupo
+                       (ver reductions), coluna, estatística
+                Output: Series indexada pelos grupos
+        """
+        spec = self.spec
+
+        if column == COUNT_COLUMN and stat == 'count':
+            return totals['orders']
+
+        if column in spec['dimensions'] and stat == 'nunique':
+            return totals[column]
+
+        if column in spec['sketches'] and stat == 'approx_nunique':
+            index = grouped['orders'].sum().index
+            sketches = combine_sketches( grouped, PREFIXES[column] + '_hll', len( index ) )
+            return pd.Series( hll.estimate( sketches ), index=index )
+
+        q = 0.5 if stat == 'median' else percentile( stat )
+        if column in spec['dimensions'] and q is not None:
+            result = grouped[[column, 'orders']].apply(
+                lambda df_aux: weighted_quantile( df_aux[column].to_numpy(), df_aux['orders'].to_numpy(), q ) )
+
+            # Sem células o apply devolve um dataframe vazio
+            if isinstance( result, pd.DataFrame ):
+                result = pd.Series( index=result.index, dtype='float64' )
+            return result
+
+        if column in spec['moments'] and stat in ( 'count', 'sum', 'mean', 'var', 'std' ):
+            prefix = PREFIXES[column]
+            n = totals[prefix + '_n']
+            s = totals[prefix + '_sum']
+            sq = totals[prefix + '_sumsq']
+
+            if stat == 'count':
+                return n
+            if stat == 'sum':
+                return s
+            if stat == 'mean':
+                return s / n.where( n > 0 )
+
+            var = ((sq - s ** 2 / n.where( n > 0 )) / (n - 1).where( n > 1 )).clip( lower=0 )
+            return var if stat == 'var' else np.sqrt( var )
+
+        if column in spec['extremes'] and stat in ( 'min', 'max' ):
+            prefix = PREFIXES[column]
+            return totals[prefix + '_' + stat]
+
+        raise ValueError( f'Estatística {stat} não suportada para {column} neste cubo' )
@@ -0,0 +1,88 @@
+# Bibliotecas necessárias
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------
+
+# Colunas filtradas pelos multiselects da barra lateral
+FILTER_COLUMNS = [ 'City', 'Weatherconditions', 'Road_traffic_density' ]
+
+# -----------------------------------------------------------------
+
+class FilterEngine:
+    """ Motor de filtros da barra lateral sobre linhas ordenadas por
+        Order_Date (as células de um cubo, ver breeze.cube.Cube).
+
+        Construído uma única vez por cubo, ele guarda as posições das
+        linhas agrupadas pela combinação de cidade, clima e trânsito,
+        cada grupo na ordem das datas. Um recorte não percorre as linhas:
+        para cada combinação selecionada o corte de data é uma busca
+        binária no grupo, e as posições dos grupos são juntadas em uma
+        única seleção. O custo depende das combinações e das linhas
+        selecionadas, não do total de linhas.
+    """
+
+    def __init__( self, df1 ):
+        self.uniques = {}
+        key = np.zeros( len( df1 ), dtype='int64' )
+        valid = np.ones( len( df1 ), dtype=bool )
+        for col in FILTER_COLUMNS:
+            codes, uniques = pd.factorize( df1[col] )
+            self.uniques[col] = { value: code for code, value in enumerate( uniques ) }
+            key = key * len( uniques ) + codes
+            valid &= codes >= 0
+
+        # Posições agrupadas por combinação; o sort estável mantém as
+        # datas em ordem dentro de cada grupo
+        positions = np.flatnonzero( valid )
+        order = np.argsort( key[positions], kind='stable' )
+        self.positions = positions[order]
+        self.dates = df1['Order_Date'].to_numpy()[self.positions]
+
+        keys = key[self.positions]
+        starts = np.flatnonzero( np.r_[True, keys[1:] != keys[:-1]] ) if len( keys ) else np.empty( 0, dtype='int64' )
+        ends = np.r_[starts[1:], len( keys )]
+        self.groups = { int( keys[start] ): ( start, end ) for start, end in zip( starts, ends ) }
+
+    def group_key( self, codes ):
+        """ Esta função calcula a chave de uma combinação de códigos. """
+        key = 0
+        for col, code in zip( FILTER_COLUMNS, codes ):
+            key = key * len( self.uniques[col] ) + code
+
+        return key
+
+    def rows( self, date_cutoff, cities, weathers, traffics, date_start=None ):
+        """ Esta função devolve as posições das linhas que passam em
+            todos os filtros da barra lateral, em ordem.
+
+                Input: Data de corte (exclusiva), cidades, climas e
+                       condições de trânsito selecionados, início
+                       opcional da janela de datas (inclusivo)
+                Output: Array com as posições das linhas
+        """
+        cutoff = np.datetime64( pd.Timestamp( date_cutoff ) )
+        first = None if date_start is None else np.datetime64( pd.Timestamp( date_start ) )
+
+        selected = [ [ self.uniques[col][value] for value in values if value in self.uniques[col] ]
+                     for col, values in zip( FILTER_COLUMNS, ( cities, weathers, traffics ) ) ]
+
+        slices = []
+        for codes in itertools.product( *selected ):
+            group = self.groups.get( self.group_key( codes ) )
+            if group is None:
+                continue
+
+            start, end = group
+            dates = self.dates[start:end]
+            lower = 0 if first is None else np.searchsorted( dates, first, side='left' )
+            upper = np.searchsorted( dates, cutoff, side='left' )
+            slices.append( self.positions[start + lower:start + upper] )
+
+        if not slices:
+            return np.empty( 0, dtype='int64' )
+
+        # Os grupos voltam à ordem das datas, como no dataframe original
+        return np.sort( np.concatenate( slices ), kind='stable' )
@@ -0,0 +1,106 @@
+# Bibliotecas necessárias
+import folium
+import pandas as pd
+from folium.plugins import FastMarkerCluster, HeatMap
+
+from breeze import results
+from breeze.cube import GRID_DECIMALS
+
+# -----------------------------------------------------------------
+
+# Camadas disponíveis para os pedidos e restaurantes da grade
+LAYERS = [ 'Calor', 'Agrupamento' ]
+
+# Marcador do agrupamento: cada ponto da grade mostra seus pedidos
+CLUSTER_CALLBACK = """
+function (row) {
+    var marker = L.marker( new L.LatLng( row[0], row[1] ) );
+    marker.bindPopup( row[2] + ' pedidos' );
+    return marker;
+};
+"""
+
+# -----------------------------------------------------------------
+
+# Funções
+def grid_points( cube, latitude, longitude ):
+    """ Esta função soma os pedidos de cada ponto da grade.
+
+            Input: Cubo de grade já filtrado, colunas de latitude e
+                   longitude
+            Output: Lista de [ latitude, longitude, pedidos ]
+    """
+    df_aux = cube.rollup( [latitude, longitude], 'ID', 'count' ).reset_index()
+
+    # Coordenadas em float32: o arredondamento evita casas espúrias no HTML
+    df_aux[[latitude, longitude]] = df_aux[[latitude, longitude]].astype( 'float64' ).round( GRID_DECIMALS )
+
+    return [ [ lat, lon, int( orders ) ] for lat, lon, orders in df_aux[[latitude, longitude, 'ID']].itertuples( index=False ) ]
+
+
+def add_layer( map, name, points, layer ):
+    """ Esta função adiciona ao mapa a camada de calor ou de agrupamento
+        de um conjunto de pontos da grade.
+
+            Input: Mapa, nome da camada, pontos da grade, camada (LAYERS)
+            Output: -
+    """
+    if not points:
+        return
+
+    if layer == 'Calor':
+        HeatMap( points, name=name, radius=12 ).add_to( map )
+    else:
+        FastMarkerCluster( points, name=name, callback=CLUSTER_CALLBACK ).add_to( map )
+
+
+def build_map( cubes, filtros, layer ):
+    """ Esta função desenha o mapa do país a partir dos cubos de grade:
+        pedidos por local de entrega, pedidos por restaurante e a
+        mediana das entregas por cidade e tipo de tráfego (nos pontos
+        da grade).
+
+            Input: Dicionário de cubos, filtros da barra lateral, camada
+            Output: HTML do mapa
+    """
+    grid1 = cubes['delivery_grid'].select( *filtros )
+    deliveries = grid_points( grid1, 'Delivery_location_latitude', 'Delivery_location_longitude' )
+    restaurants = grid_points( cubes['restaurant_grid'].select( *filtros ),
+                               'Restaurant_latitude', 'Restaurant_longitude' )
+
+    cols = [ 'Delivery_location_latitude', 'Delivery_location_longitude' ]
+    df_aux = (pd.concat( [ grid1.rollup( ['City', 'Road_traffic_density'], col, 'median' ) for col in cols ],
+                         axis=1 )
+                .reset_index())
+
+    map = folium.Map()
+
+    add_layer( map, 'Entregas', deliveries, layer )
+    add_layer( map, 'Restaurantes', restaurants, layer )
+
+    medians = folium.FeatureGroup( name='Mediana por cidade e tráfego' )
+    for location_info in df_aux.itertuples( index=False ):
+        (folium.Marker( [location_info.Delivery_location_latitude,
+                         location_info.Delivery_location_longitude],
+                        popup=f'{location_info.City} - {location_info.Road_traffic_density}' )
+                        .add_to( medians ))
+    medians.add_to( map )
+
+    points = deliveries + restaurants
+    if points:
+        map.fit_bounds( [ [ min( p[0] for p in points ), min( p[1] for p in points ) ],
+                          [ max( p[0] for p in points ), max( p[1] for p in points ) ] ] )
+
+    folium.LayerControl().add_to( map )
+
+    return folium.Figure().add_child( map ).render()
+
+
+def map_html( cubes, filtros, layer ):
+    """ Esta função devolve o HTML do mapa, desenhado uma única vez por
+        estado dos filtros e guardado no cache de resultados.
+
+            Input: Dicionário de cubos, filtros da barra lateral, camada
+            Output: HTML do mapa
+    """
+    return results.cached( cubes, filtros, ( 'geo/mapa', layer ), lambda: build_map( cubes, filtros, layer ) )
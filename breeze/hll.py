@@ -0,0 +1,109 @@
+# Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------
+
+# Bits do hash usados para escolher o registrador: 2 ** 11 = 2048
+# registradores (2 KB por sketch), erro padrão de cerca de 2,3%. Com
+# precisão >= 11 o restante do hash cabe exato em um float64 (53 bits).
+PRECISION = 11
+
+# -----------------------------------------------------------------
+
+# Funções
+def standard_error( precision=PRECISION ):
+    """ Esta função devolve o erro padrão relativo da estimativa do
+        HyperLogLog.
+
+            Input: Precisão do sketch
+            Output: Erro relativo (0.023 = 2,3%)
+    """
+    return 1.04 / np.sqrt( 2 ** precision )
+
+
+def observations( values, precision=PRECISION ):
+    """ Esta função calcula, para cada valor, o registrador do sketch e
+        a posição do primeiro bit 1 do restante do hash.
+
+            Input: Array de valores, precisão do sketch
+            Output: Array de registradores, array de posições (uint8)
+    """
+    bits = 64 - precision
+    hashes = pd.util.hash_array( np.asarray( values, dtype=object ) )
+
+    registers = (hashes >> np.uint64( bits )).astype( 'int64' )
+    rest = hashes & np.uint64( (1 << bits) - 1 )
+
+    length = np.zeros( len( rest ), dtype='int64' )
+    nonzero = rest > 0
+    length[nonzero] = np.floor( np.log2( rest[nonzero].astype( 'float64' ) ) ).astype( 'int64' ) + 1
+
+    return registers, (bits - length + 1).astype( 'uint8' )
+
+
+def build( codes, values, groups, precision=PRECISION ):
+    """ Esta função constrói um sketch por grupo.
+
+            Input: Array com o grupo de cada valor (-1 para ignorar),
+                   array de valores, quantidade de grupos, precisão
+            Output: Matriz uint8 ( grupos x registradores )
+    """
+    sketches = np.zeros( ( groups, 2 ** precision ), dtype='uint8' )
+
+    valid = (codes >= 0) & pd.notna( values )
+    registers, ranks = observations( np.asarray( values )[valid], precision )
+    np.maximum.at( sketches, ( codes[valid], registers ), ranks )
+
+    return sketches
+
+
+def merge( sketches, codes, groups ):
+    """ Esta função junta sketches do mesmo grupo (máximo registrador a
+        registrador). O resultado é o mesmo de construir o sketch sobre
+        a união dos valores.
+
+            Input: Matriz de sketches, array com o grupo de cada sketch,
+                   quantidade de grupos
+            Output: Matriz uint8 ( grupos x registradores )
+    """
+    merged = np.zeros( ( groups, sketches.shape[1] ), dtype='uint8' )
+    if len( codes ) == 0:
+        return merged
+
+    order = np.argsort( codes, kind='stable' )
+    codes = codes[order]
+    starts = np.flatnonzero( np.r_[True, codes[1:] != codes[:-1]] )
+    merged[codes[starts]] = np.maximum.reduceat( sketches[order], starts, axis=0 )
+
+    return merged
+
+
+def estimate( sketches ):
+    """ Esta função estima a quantidade de valores distintos de cada
+        sketch, com a correção de linear counting para poucos valores.
+
+            Input: Matriz de sketches
+            Output: Array de estimativas
+    """
+    m = sketches.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+
+    raw = alpha * m * m / np.sum( np.exp2( -sketches.astype( 'float64' ) ), axis=1 )
+    zeros = np.sum( sketches == 0, axis=1 )
+
+    small = (raw <= 2.5 * m) & (zeros > 0)
+    with np.errstate( divide='ignore' ):
+        linear = m * np.log( m / zeros )
+
+    return np.where( small, linear, raw )
+
+
+def to_bytes( sketches ):
+    """ Esta função guarda cada sketch como bytes (uma célula do cubo). """
+    return [ sketch.tobytes() for sketch in sketches ]
+
+
+def from_bytes( column, precision=PRECISION ):
+    """ Esta função recupera a matriz de sketches de uma coluna de bytes. """
+    return np.frombuffer( b''.join( column ), dtype='uint8' ).reshape( -1, 2 ** precision )
@@ -0,0 +1,858 @@
+# Bibliotecas necessárias
+import glob
+import json
+import os
+import shutil
+import sys
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from breeze import hll, parallel
+from breeze.cube import CUBES, Cube, build_cells, collapse_cells, collapsed_spec, concat_cells, merge_cells
+from breeze.schema import apply_schema
+from breeze.snapshot import source_fingerprint
+from breeze.spatial import (POINTS, SPATIAL_COLUMNS, SpatialIndex, cell_keys, filter_orders, haversine_km,
+                            tile_names, tile_ranges)
+
+# -----------------------------------------------------------------
+
+# Linhas do CSV lidas por vez: o pico de memória da ingestão é
+# proporcional a este valor, não ao tamanho do arquivo
+CHUNKSIZE = 100_000
+
+# Versão do formato do armazenamento. Um armazenamento gravado em outra
+# versão é refeito por inteiro.
+STORE_VERSION = 10
+
+# Células de cada arquivo gravado dos cubos, em múltiplos do pedaço: os
+# fragmentos de uma semana são combinados em arquivos de até cerca de
+# MERGE_FACTOR * chunksize células, e a memória da combinação e dos
+# recortes dos cubos gravados fica limitada por esse valor
+MERGE_FACTOR = 4
+
+# Tamanho aproximado, em bytes, de uma célula sem sketches
+CELL_BYTES = 64
+
+# Linhas por grupo dos arquivos do índice espacial: uma consulta por
+# raio lê só os grupos com células do círculo
+SPATIAL_ROW_GROUP = 4096
+
+# Colunas que ordenam os pontos do índice espacial gravado como no
+# índice em memória: célula da grade e posição do pedido na origem
+POINT_ORDER = [ 'cell', 'source_file', 'source_row' ]
+
+# -----------------------------------------------------------------
+
+# Funções
+def week_start( dates ):
+    """ Esta função devolve o domingo que inicia a semana de cada data
+        (a mesma semana de strftime( '%U' ) usada nas páginas). É a
+        chave das partições do armazenamento.
+
+            Input: Series de datas
+            Output: Series de textos no formato AAAA-MM-DD
+    """
+    # Só as datas distintas são convertidas; datas nulas ficam nulas
+    codes, days = pd.factorize( dates )
+    sundays = days - pd.to_timedelta( (days.dayofweek + 1) % 7, unit='D' )
+    labels = np.append( sundays.strftime( '%Y-%m-%d' ).to_numpy( dtype=object ), None )
+
+    return pd.Series( labels[codes], index=dates.index )
+
+
+def weeks_in_window( weeks, start=None, end=None ):
+    """ Esta função seleciona as partições semanais que têm alguma data
+        na janela [start, end). As demais partições nem são lidas.
+
+            Input: Chaves das semanas, início (inclusivo) e fim
+                   (exclusivo) opcionais da janela
+            Output: Lista das semanas selecionadas, em ordem
+    """
+    selected = []
+    for week in sorted( weeks ):
+        first_day = pd.Timestamp( week )
+        if end is not None and first_day >= pd.Timestamp( end ):
+            continue
+        if start is not None and first_day + pd.Timedelta( days=7 ) <= pd.Timestamp( start ):
+            continue
+        selected.append( week )
+
+    return selected
+
+
+def manifest_path( store_dir ):
+    """ Esta função devolve o caminho do manifesto do armazenamento. """
+    return os.path.join( store_dir, 'manifest.json' )
+
+
+def read_manifest( store_dir ):
+    """ Esta função lê o manifesto do armazenamento, ou None se ele não
+        existir.
+
+            Input: Diretório do armazenamento
+            Output: Dicionário do manifesto
+    """
+    try:
+        with open( manifest_path( store_dir ) ) as file:
+            return json.load( file )
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest( manifest, store_dir ):
+    """ Esta função grava o manifesto de forma atômica. Ele é sempre o
+        último arquivo gravado e é o ponto de confirmação da ingestão:
+        os leitores só enxergam os arquivos listados nele. Uma ingestão
+        interrompida não aparece no manifesto e é refeita na próxima
+        execução, e os arquivos que ela deixou são descartados (ver
+        remove_orphans).
+
+            Input: Dicionário do manifesto, diretório do armazenamento
+            Output: None
+    """
+    tmp_path = manifest_path( store_dir ) + '.tmp'
+    with open( tmp_path, 'w' ) as file:
+        json.dump( manifest, file, indent=2 )
+    os.replace( tmp_path, manifest_path( store_dir ) )
+
+
+def source_files( source ):
+    """ Esta função lista os CSVs de pedidos de uma origem: o próprio
+        arquivo, ou todos os CSVs de um diretório (por exemplo, o
+        histórico mais um arquivo novo por dia).
+
+            Input: Caminho de um CSV ou de um diretório
+            Output: Dicionário nome do arquivo -> caminho, em ordem
+    """
+    if os.path.isdir( source ):
+        paths = sorted( glob.glob( os.path.join( source, '*.csv' ) ) )
+    else:
+        paths = [ source ]
+
+    return { os.path.basename( path ): path for path in paths }
+
+
+def ingest_partition( csv_path, start, end, store_dir, stem, i ):
+    """ Esta função faz a ingestão de uma partição do CSV (uma faixa de
+        bytes, ver breeze.parallel):
+            1. Aplica as regras de limpeza de clean_code.
+            2. Grava a partição limpa em partições Parquet por semana
+               (parts/AAAA-MM-DD/).
+            3. Agrega a partição nas células de cada cubo de CUBES e
+               grava um fragmento por semana (ver write_cells).
+            4. Grava os pontos do índice espacial por bloco da grade e
+               a contagem de pedidos dos restaurantes (ver
+               write_points).
+
+        Pode rodar em outro processo: só recebe e devolve valores
+        simples. Nada da partição fica em memória depois dela.
+
+            Input: Caminho do CSV, início e fim da faixa em bytes,
+                   diretório do armazenamento, nome base e número da
+                   partição
+            Output: Lista das partições gravadas, quantidade de linhas,
+                    dicionário nome do cubo -> { semana: fragmento },
+                    dicionário coordenadas -> { bloco: fragmento },
+                    fragmento dos restaurantes
+    """
+    df1 = parallel.clean_partition( csv_path, start, end )
+
+    # ----- Partições limpas, uma por semana -----
+    parts = []
+    for week, df_week in df1.groupby( week_start( df1['Order_Date'] ) ):
+        part = os.path.join( week, f'{stem}-{i:05d}.parquet' )
+        os.makedirs( os.path.join( store_dir, 'parts', week ), exist_ok=True )
+        df_week.to_parquet( os.path.join( store_dir, 'parts', part ), index=False )
+        parts.append( part )
+
+    # ----- Agregados da partição -----
+    fragments = { name: write_cells( build_cells( df1, spec ), store_dir, name, f'{stem}-{i:05d}.parquet' )
+                  for name, spec in CUBES.items() }
+
+    # ----- Índice espacial -----
+    points = write_points( df1, store_dir, os.path.basename( csv_path ), i, f'{stem}-{i:05d}.parquet' )
+
+    latitude, longitude = POINTS['restaurant']
+    restaurants = df1.groupby( [latitude, longitude], observed=True ).size().rename( 'pedidos' ).reset_index()
+    os.makedirs( os.path.join( store_dir, 'spatial', 'restaurants' ), exist_ok=True )
+    restaurants.to_parquet( os.path.join( store_dir, 'spatial', 'restaurants', f'{stem}-{i:05d}.parquet' ),
+                            index=False )
+
+    return parts, len( df1 ), fragments, points, f'{stem}-{i:05d}.parquet'
+
+
+def write_cells( cells, store_dir, name, file ):
+    """ Esta função grava células de um cubo em fragmentos, um por
+        semana (cubes/<cubo>/AAAA-MM-DD/<file>).
+
+            Input: Dataframe de células, diretório do armazenamento,
+                   nome do cubo, nome do arquivo
+            Output: Dicionário semana -> nome do arquivo gravado
+    """
+    fragments = {}
+    for week, cells_week in cells.groupby( week_start( cells['Order_Date'] ) ):
+        week_dir = os.path.join( store_dir, 'cubes', name, week )
+        os.makedirs( week_dir, exist_ok=True )
+        cells_week.to_parquet( os.path.join( week_dir, file ), index=False )
+        fragments[week] = file
+
+    return fragments
+
+
+def write_points( df1, store_dir, source, i, file ):
+    """ Esta função grava os pedidos de uma partição para o índice
+        espacial, uma vez para cada par de coordenadas (ver
+        spatial.POINTS), em um fragmento por bloco da grade
+        (spatial/<coordenadas>/<bloco>/<file>). Os pontos ficam
+        ordenados pela célula e a posição do pedido na origem vai junto,
+        para que as consultas devolvam a mesma ordem do índice em
+        memória.
+
+            Input: Dataframe limpo da partição, diretório do
+                   armazenamento, nome do CSV, número da partição, nome
+                   do arquivo
+            Output: Dicionário coordenadas -> { bloco: nome do arquivo }
+    """
+    df_aux = df1[SPATIAL_COLUMNS].assign( source_file=source,
+                                          source_row=i * 2 ** 32 + np.arange( len( df1 ), dtype='int64' ) )
+
+    written = {}
+    for points, ( latitude, longitude ) in POINTS.items():
+        # Pedidos sem coordenadas nunca estão em um raio
+        located = df_aux.loc[df_aux[latitude].notna() & df_aux[longitude].notna()]
+        located = located.assign( cell=cell_keys( located[latitude], located[longitude] ) )
+
+        written[points] = {}
+        for tile, df_tile in located.groupby( tile_names( located['cell'] ) ):
+            tile_dir = os.path.join( store_dir, 'spatial', points, tile )
+            os.makedirs( tile_dir, exist_ok=True )
+            df_tile.sort_values( POINT_ORDER ).to_parquet( os.path.join( tile_dir, file ), index=False,
+                                                          row_group_size=SPATIAL_ROW_GROUP )
+            written[points][tile] = file
+
+    return written
+
+
+def ingest_file( csv_path, store_dir, chunksize=CHUNKSIZE, workers=None ):
+    """ Esta função faz a ingestão de um CSV em partições de cerca de
+        chunksize linhas, sem nunca carregar o arquivo inteiro em
+        memória (ver ingest_partition). Com workers > 1 as partições
+        são processadas em um pool de processos. As células vão para o
+        disco a cada partição: a memória não cresce com o arquivo.
+
+            Input: Caminho do CSV, diretório do armazenamento, linhas
+                   por partição, quantidade de processos (None para
+                   BREEZE_WORKERS)
+            Output: Entrada do manifesto do arquivo, dicionário
+                    nome do cubo -> { semana: lista de fragmentos },
+                    dicionário coordenadas -> { bloco: lista de
+                    fragmentos }, lista de fragmentos dos restaurantes
+    """
+    stem = os.path.splitext( os.path.basename( csv_path ) )[0]
+
+    entry = { 'source': source_fingerprint( csv_path ), 'rows': 0, 'parts': [] }
+    fragments = { name: {} for name in CUBES }
+    points = { name: {} for name in POINTS }
+    restaurants = []
+
+    tasks = [
+        ( csv_path, start, end, store_dir, stem, i )
+        for i, ( start, end ) in enumerate( parallel.csv_partitions( csv_path, chunksize ) )
+    ]
+
+    for parts, rows, written, located, counted in parallel.map_partitions( ingest_partition, tasks, workers ):
+        entry['parts'].extend( parts )
+        entry['rows'] += rows
+        for name in CUBES:
+            for week, file in written[name].items():
+                fragments[name].setdefault( week, [] ).append( file )
+        for name in POINTS:
+            for tile, file in located[name].items():
+                points[name].setdefault( tile, [] ).append( file )
+        restaurants.append( counted )
+
+    return entry, fragments, points, restaurants
+
+
+def cell_paths( cube_dir, listing, weeks ):
+    """ Esta função lista os arquivos de células das semanas de um cubo.
+
+            Input: Diretório do cubo, dicionário semana -> arquivos (do
+                   manifesto), semanas
+            Output: Lista de caminhos, em ordem
+    """
+    return [ os.path.join( cube_dir, week, file ) for week in weeks for file in listing[week] ]
+
+
+def compact_week( store_dir, name, week, files, limit ):
+    """ Esta função combina os arquivos de células de uma semana de um
+        cubo em arquivos de até cerca de limit células. Os arquivos são
+        lidos um a um e combinados em lotes: a memória depende de limit,
+        não do volume da semana. Arquivos com mais da metade de limit
+        células ficam como estão, então acrescentar pedidos não relê o
+        histórico de cubos que crescem com o volume.
+
+        Nenhum arquivo é apagado aqui: os combinados continuam valendo
+        até que o novo manifesto seja gravado (ver add_files).
+
+            Input: Diretório do armazenamento, nome do cubo, semana,
+                   arquivos da semana, células por arquivo
+            Output: Tupla ( arquivos da semana depois da combinação,
+                    arquivos substituídos )
+    """
+    spec = CUBES[name]
+    week_dir = os.path.join( store_dir, 'cubes', name, week )
+
+    # Um sketch ocupa 2 ** hll.PRECISION bytes, dezenas de vezes o resto
+    # da célula: os lotes desses cubos têm proporcionalmente menos células
+    limit = limit // ( 1 + len( spec['sketches'] ) * 2 ** hll.PRECISION // CELL_BYTES )
+
+    small = [ file for file in sorted( files )
+              if pq.read_metadata( os.path.join( week_dir, file ) ).num_rows <= limit // 2 ]
+    if len( small ) < 2:
+        return sorted( files ), []
+
+    outputs = []
+
+    def write( cells ):
+        outputs.append( f'c-{uuid.uuid4().hex}.parquet' )
+        cells.to_parquet( os.path.join( week_dir, outputs[-1] ), index=False )
+
+    batch, size = [], 0
+    for file in small:
+        batch.append( pd.read_parquet( os.path.join( week_dir, file ) ) )
+        size += len( batch[-1] )
+        if size <= limit:
+            continue
+
+        # Células que quase não se combinam (uma por pedido) formam um
+        # arquivo cheio; as demais seguem acumulando
+        batch = [ merge_cells( batch, spec ) ]
+        size = len( batch[0] )
+        if size > limit // 2:
+            write( batch[0] )
+            batch, size = [], 0
+
+    if batch:
+        write( merge_cells( batch, spec ) )
+
+    kept = [ file for file in sorted( files ) if file not in small ]
+    return kept + outputs, small
+
+
+def compact_tile( store_dir, points, tile, files, limit ):
+    """ Esta função junta os arquivos pequenos de um bloco do índice
+        espacial em arquivos de até cerca de limit pontos, ordenados
+        pela célula (ver compact_week). Nenhum arquivo é apagado aqui.
+
+            Input: Diretório do armazenamento, coordenadas, bloco,
+                   arquivos do bloco, pontos por arquivo
+            Output: Tupla ( arquivos do bloco depois da junção,
+                    arquivos substituídos )
+    """
+    tile_dir = os.path.join( store_dir, 'spatial', points, tile )
+
+    small = [ file for file in sorted( files )
+              if pq.read_metadata( os.path.join( tile_dir, file ) ).num_rows <= limit // 2 ]
+    if len( small ) < 2:
+        return sorted( files ), []
+
+    outputs = []
+
+    def write( frames ):
+        outputs.append( f'c-{uuid.uuid4().hex}.parquet' )
+        (pd.concat( frames, ignore_index=True )
+           .sort_values( POINT_ORDER )
+           .to_parquet( os.path.join( tile_dir, outputs[-1] ), index=False, row_group_size=SPATIAL_ROW_GROUP ))
+
+    batch, size = [], 0
+    for file in small:
+        batch.append( pd.read_parquet( os.path.join( tile_dir, file ) ) )
+        size += len( batch[-1] )
+        if size > limit // 2:
+            write( batch )
+            batch, size = [], 0
+
+    if batch:
+        write( batch )
+
+    kept = [ file for file in sorted( files ) if file not in small ]
+    return kept + outputs, small
+
+
+def merge_restaurants( store_dir, files, limit ):
+    """ Esta função soma as contagens de pedidos dos restaurantes em um
+        único arquivo, lendo os fragmentos um a um. A memória depende
+        da quantidade de restaurantes e de limit, não da de pedidos.
+
+            Input: Diretório do armazenamento, arquivos dos restaurantes,
+                   linhas acumuladas antes de cada soma
+            Output: Nome do arquivo gravado
+    """
+    restaurants_dir = os.path.join( store_dir, 'spatial', 'restaurants' )
+    keys = list( POINTS['restaurant'] )
+
+    def reduce( frames ):
+        return pd.concat( frames, ignore_index=True ).groupby( keys )['pedidos'].sum().reset_index()
+
+    batch, size = [], 0
+    for file in files:
+        batch.append( pd.read_parquet( os.path.join( restaurants_dir, file ) ) )
+        size += len( batch[-1] )
+        if size > limit:
+            batch = [ reduce( batch ) ]
+            size = len( batch[0] )
+
+    output = f'r-{uuid.uuid4().hex}.parquet'
+    reduce( batch ).to_parquet( os.path.join( restaurants_dir, output ), index=False )
+
+    return output
+
+
+def add_files( files, store_dir, manifest, workers=None ):
+    """ Esta função acrescenta CSVs a um armazenamento e confirma tudo
+        de uma vez no manifesto:
+            1. Cada CSV é limpo e agregado em partições e fragmentos
+               novos (ver ingest_file).
+            2. Os fragmentos das semanas afetadas são combinados com os
+               arquivos dessas semanas (ver compact_week), e os dos
+               blocos afetados do índice espacial com os desses blocos
+               (ver compact_tile), em um pool de processos quando
+               workers > 1. As demais semanas e blocos não são lidos.
+               As contagens dos restaurantes são somadas em um arquivo.
+            3. O manifesto com os novos arquivos é gravado.
+            4. Só então os arquivos substituídos são apagados.
+        Uma interrupção antes do passo 3 deixa o armazenamento como
+        estava; depois dele, no máximo sobram arquivos que ninguém lê.
+
+            Input: Dicionário nome -> caminho dos CSVs, diretório do
+                   armazenamento, manifesto atual, quantidade de
+                   processos
+            Output: Dicionário do manifesto gravado
+    """
+    chunksize = manifest['chunksize']
+    added = { name: {} for name in CUBES }
+    added_points = { name: {} for name in POINTS }
+    restaurants = []
+
+    for name, path in files.items():
+        entry, fragments, points, counted = ingest_file( path, store_dir, chunksize, workers )
+        manifest['files'][name] = entry
+        for cube_name in CUBES:
+            for week, fragment_files in fragments[cube_name].items():
+                added[cube_name].setdefault( week, [] ).extend( fragment_files )
+        for points_name in POINTS:
+            for tile, fragment_files in points[points_name].items():
+                added_points[points_name].setdefault( tile, [] ).extend( fragment_files )
+        restaurants += counted
+
+    tasks = [
+        ( store_dir, name, week, manifest['cubes'][name].get( week, [] ) + fragment_files,
+          MERGE_FACTOR * chunksize )
+        for name, weeks in added.items()
+        for week, fragment_files in sorted( weeks.items() )
+    ]
+
+    superseded = []
+    for ( _, name, week, _, _ ), ( kept, replaced ) in zip( tasks, parallel.map_partitions( compact_week, tasks,
+                                                                                            workers ) ):
+        manifest['cubes'][name][week] = kept
+        superseded += [ os.path.join( store_dir, 'cubes', name, week, file ) for file in replaced ]
+
+    tasks = [
+        ( store_dir, name, tile, manifest['spatial'][name].get( tile, [] ) + fragment_files,
+          MERGE_FACTOR * chunksize )
+        for name, tiles in added_points.items()
+        for tile, fragment_files in sorted( tiles.items() )
+    ]
+
+    for ( _, name, tile, _, _ ), ( kept, replaced ) in zip( tasks, parallel.map_partitions( compact_tile, tasks,
+                                                                                            workers ) ):
+        manifest['spatial'][name][tile] = kept
+        superseded += [ os.path.join( store_dir, 'spatial', name, tile, file ) for file in replaced ]
+
+    if restaurants:
+        merged = manifest['restaurants'] + restaurants
+        superseded += [ os.path.join( store_dir, 'spatial', 'restaurants', file ) for file in merged ]
+        manifest['restaurants'] = [ merge_restaurants( store_dir, merged, MERGE_FACTOR * chunksize ) ]
+
+    write_manifest( manifest, store_dir )
+
+    for path in superseded:
+        os.remove( path )
+
+    return manifest
+
+
+def remove_orphans( store_dir, manifest ):
+    """ Esta função apaga os arquivos de partições e de células que não
+        estão no manifesto: sobras de uma ingestão interrompida ou
+        arquivos já substituídos.
+
+            Input: Diretório do armazenamento, manifesto
+            Output: None
+    """
+    listed = { os.path.join( store_dir, 'parts', part )
+               for entry in manifest['files'].values() for part in entry['parts'] }
+    for name, listing in manifest['cubes'].items():
+        listed.update( cell_paths( os.path.join( store_dir, 'cubes', name ), listing, listing ) )
+    for name, listing in manifest['spatial'].items():
+        listed.update( cell_paths( os.path.join( store_dir, 'spatial', name ), listing, listing ) )
+    listed.update( os.path.join( store_dir, 'spatial', 'restaurants', file ) for file in manifest['restaurants'] )
+
+    for path in glob.glob( os.path.join( store_dir, '*', '**', '*.parquet' ), recursive=True ):
+        if path not in listed:
+            os.remove( path )
+
+
+def ingest( source, store_dir, chunksize=CHUNKSIZE, workers=None ):
+    """ Esta função refaz o armazenamento inteiro a partir dos CSVs da
+        origem. Ele é montado em um diretório temporário e só substitui
+        o anterior quando a ingestão termina.
+
+            Input: Caminho de um CSV ou diretório, diretório do
+                   armazenamento, linhas por pedaço, quantidade de
+                   processos
+            Output: Dicionário do manifesto
+    """
+    files = source_files( source )
+    if not files:
+        raise ValueError( f'{source} não tem arquivos de pedidos para a ingestão' )
+
+    tmp_dir = store_dir.rstrip( os.sep ) + '.tmp'
+    shutil.rmtree( tmp_dir, ignore_errors=True )
+    os.makedirs( tmp_dir )
+
+    manifest = { 'version': STORE_VERSION, 'chunksize': chunksize, 'files': {},
+                 'cubes': { name: {} for name in CUBES },
+                 'spatial': { name: {} for name in POINTS }, 'restaurants': [] }
+    manifest = add_files( files, tmp_dir, manifest, workers )
+
+    shutil.rmtree( store_dir, ignore_errors=True )
+    os.replace( tmp_dir, store_dir )
+
+    return manifest
+
+
+def append( source, store_dir, names, chunksize=CHUNKSIZE, workers=None ):
+    """ Esta função acrescenta ao armazenamento apenas os arquivos novos
+        da origem. Somente esses arquivos são lidos e limpos; suas
+        células são combinadas com os arquivos pequenos já gravados das
+        semanas que eles atingem (ver compact_week). O custo depende do
+        volume novo, não do histórico de pedidos.
+
+        A operação é atômica (ver add_files): se for interrompida, o
+        armazenamento continua com o conteúdo anterior, as sobras são
+        apagadas na próxima execução e os arquivos são acrescentados de
+        novo, sem contar pedidos duas vezes. Os pedaços seguem o
+        chunksize do manifesto.
+
+            Input: Caminho de um CSV ou diretório, diretório do
+                   armazenamento, nomes dos arquivos novos, linhas por
+                   pedaço (ignorado), quantidade de processos
+            Output: Dicionário do manifesto
+    """
+    files = source_files( source )
+    manifest = read_manifest( store_dir )
+
+    remove_orphans( store_dir, manifest )
+
+    return add_files( { name: files[name] for name in names }, store_dir, manifest, workers )
+
+
+def ensure_store( source, store_dir, chunksize=CHUNKSIZE, workers=None ):
+    """ Esta função mantém o armazenamento atualizado em relação à origem:
+            1. Nada muda se todos os arquivos já foram ingeridos.
+               Um armazenamento de outra versão é refeito.
+            2. Arquivos novos são acrescentados (ver append).
+            3. Se algum arquivo já ingerido foi alterado ou removido, o
+               armazenamento é refeito: mínimos e máximos dos cubos não
+               podem ser desfeitos célula a célula.
+
+            Input: Caminho de um CSV ou diretório, diretório do
+                   armazenamento, linhas por pedaço, quantidade de
+                   processos
+            Output: Dicionário do manifesto
+    """
+    files = source_files( source )
+    manifest = read_manifest( store_dir )
+
+    if manifest is None or manifest.get( 'version' ) != STORE_VERSION:
+        return ingest( source, store_dir, chunksize, workers )
+
+    stored = manifest['files']
+    for name, entry in stored.items():
+        if name not in files or entry['source'] != source_fingerprint( files[name] ):
+            return ingest( source, store_dir, chunksize, workers )
+
+    new_names = [ name for name in files if name not in stored ]
+    if new_names:
+        return append( source, store_dir, new_names, chunksize, workers )
+
+    return manifest
+
+
+def read_cubes( store_dir, start=None, end=None ):
+    """ Esta função abre os cubos gravados pela ingestão, apenas com os
+        arquivos listados no manifesto. Nenhuma célula é lida aqui: cada
+        recorte lê só as semanas até a data de corte do filtro (e dentro
+        da janela [start, end), se houver). Os cubos pequenos guardam em
+        memória as semanas já lidas (ver WeeklyCube); os que crescem com
+        o volume de pedidos (com collapse na especificação) são lidos do
+        disco a cada recorte (ver StoredCube).
+
+            Input: Diretório do armazenamento, início (inclusivo) e fim
+                   (exclusivo) opcionais da janela de datas
+            Output: Dicionário nome -> WeeklyCube ou StoredCube
+    """
+    manifest = read_manifest( store_dir )
+    limit = MERGE_FACTOR * manifest['chunksize']
+
+    cubes = {}
+    for name, spec in CUBES.items():
+        cube_dir = os.path.join( store_dir, 'cubes', name )
+        listing = manifest['cubes'][name]
+        if spec['collapse']:
+            cubes[name] = StoredCube( cube_dir, listing, spec, limit, start, end )
+        else:
+            cubes[name] = WeeklyCube( cube_dir, listing, spec, start, end )
+
+    return cubes
+
+
+def empty_cells( cube_dir, listing ):
+    """ Esta função devolve um dataframe de células vazio, com as
+        colunas de um cubo gravado.
+
+            Input: Diretório do cubo, dicionário semana -> arquivos
+            Output: Dataframe vazio
+    """
+    return pd.read_parquet( cell_paths( cube_dir, listing, sorted( listing ) )[0] ).iloc[:0]
+
+
+class WeeklyCube:
+    """ Cubo gravado lido sob demanda, uma semana por vez.
+
+        Cada recorte lê apenas as semanas antes da data de corte; as
+        semanas lidas ficam em memória e servem aos recortes seguintes.
+        Com a data de corte no início do período, o histórico posterior
+        nunca é lido. O cubo das semanas do último recorte também fica
+        guardado, para que mudar só cidades, climas ou trânsito não
+        refaça a concatenação.
+    """
+
+    def __init__( self, cube_dir, listing, spec, start=None, end=None ):
+        self.cube_dir = cube_dir
+        self.listing = listing
+        self.spec = spec
+        self.start = start
+        self.end = end
+        self.weeks = {}
+        self.window = ( None, None )
+        self.lock = threading.Lock()
+
+    def week_cells( self, week ):
+        """ Esta função devolve as células de uma semana, lidas do disco
+            na primeira vez.
+
+                Input: Semana
+                Output: Dataframe de células
+        """
+        if week not in self.weeks:
+            self.weeks[week] = concat_cells( [ pd.read_parquet( path )
+                                               for path in cell_paths( self.cube_dir, self.listing, [ week ] ) ],
+                                             self.spec )
+
+        return self.weeks[week]
+
+    def select( self, date_cutoff, cities, weathers, traffics, date_start=None ):
+        """ Esta função aplica os filtros da barra lateral às células
+            das semanas da janela (ver Cube.select).
+
+                Input: Data de corte (exclusiva), cidades, climas e
+                       condições de trânsito selecionados, início
+                       opcional da janela de datas (inclusivo)
+                Output: Cubo apenas com as células selecionadas
+        """
+        weeks = weeks_in_window( self.listing, self.start, self.end )
+        weeks = tuple( weeks_in_window( weeks, date_start, date_cutoff ) )
+
+        with self.lock:
+            if self.window[0] != weeks:
+                if weeks:
+                    cells = concat_cells( [ self.week_cells( week ) for week in weeks ], self.spec )
+                else:
+                    # Nenhuma semana na janela: cubo vazio com as colunas corretas
+                    cells = empty_cells( self.cube_dir, self.listing )
+                self.window = ( weeks, Cube( cells, self.spec, indexed=True ) )
+            cube1 = self.window[1]
+
+        return cube1.select( date_cutoff, cities, weathers, traffics, date_start )
+
+
+class StoredCube:
+    """ Cubo gravado cujas células crescem com o volume de pedidos (com
+        collapse na especificação, ver breeze.cube).
+
+        As células não ficam em memória: cada recorte lê apenas as
+        semanas da janela de datas, um arquivo por vez, filtra as
+        células e as reduz às dimensões de collapse. A memória depende
+        dessas dimensões (entregadores, pontos da grade) e de limit, não
+        da quantidade de pedidos.
+    """
+
+    def __init__( self, cube_dir, listing, spec, limit, start=None, end=None ):
+        self.cube_dir = cube_dir
+        self.listing = listing
+        self.spec = spec
+        self.limit = limit
+        self.start = start
+        self.end = end
+
+    def select( self, date_cutoff, cities, weathers, traffics, date_start=None ):
+        """ Esta função aplica os filtros da barra lateral às células
+            gravadas (ver Cube.select).
+
+                Input: Data de corte (exclusiva), cidades, climas e
+                       condições de trânsito selecionados, início
+                       opcional da janela de datas (inclusivo)
+                Output: Cube reduzido às dimensões de collapse
+        """
+        weeks = weeks_in_window( self.listing, self.start, self.end )
+        weeks = weeks_in_window( weeks, date_start, date_cutoff )
+
+        partials, size = [], 0
+        for path in cell_paths( self.cube_dir, self.listing, weeks ):
+            cube1 = Cube( pd.read_parquet( path ), self.spec ).select( date_cutoff, cities, weathers, traffics,
+                                                                      date_start )
+            partials.append( collapse_cells( [ cube1.cells ], self.spec ) )
+            size += len( partials[-1] )
+
+            if size > self.limit:
+                partials = [ collapse_cells( partials, self.spec ) ]
+                size = len( partials[0] )
+
+        if not partials:
+            partials = [ empty_cells( self.cube_dir, self.listing ) ]
+
+        return Cube( collapse_cells( partials, self.spec ), collapsed_spec( self.spec ) )
+
+
+def read_spatial_index( store_dir ):
+    """ Esta função abre o índice espacial gravado pela ingestão (ver
+        StoredSpatialIndex).
+
+            Input: Diretório do armazenamento
+            Output: StoredSpatialIndex
+    """
+    return StoredSpatialIndex( store_dir, read_manifest( store_dir ) )
+
+
+class StoredSpatialIndex( SpatialIndex ):
+    """ Índice espacial gravado, com as mesmas consultas de
+        spatial.SpatialIndex.
+
+        Os pedidos não ficam em memória: cada consulta por raio lê só os
+        blocos da grade que cobrem o círculo e, neles, só os grupos de
+        linhas com células do círculo. Apenas os restaurantes distintos
+        ficam em memória.
+    """
+
+    def __init__( self, store_dir, manifest ):
+        self.spatial_dir = os.path.join( store_dir, 'spatial' )
+        self.listing = manifest['spatial']
+
+        self.index_restaurants( pd.concat( [ pd.read_parquet( os.path.join( self.spatial_dir, 'restaurants', file ) )
+                                             for file in manifest['restaurants'] ], ignore_index=True ) )
+
+    def within( self, lat, lon, radius_km, points='delivery', filtros=None ):
+        """ Esta função seleciona os pedidos com o local de entrega (ou o
+            restaurante) a até radius_km do ponto (ver
+            SpatialIndex.within).
+
+                Input: Latitude, longitude, raio em Km, coordenadas
+                       usadas ( 'delivery' ou 'restaurant' ), filtros
+                       opcionais ( data de corte, cidades, climas,
+                       condições de trânsito )
+                Output: Dataframe dos pedidos, com a coluna
+                        distance_to_point (Km), do mais próximo para o
+                        mais distante
+        """
+        frames = []
+        for tile, ranges in tile_ranges( lat, lon, radius_km ).items():
+            filters = [ [ ( 'cell', '>=', first ), ( 'cell', '<=', last ) ] for first, last in ranges ]
+            frames += [ pd.read_parquet( os.path.join( self.spatial_dir, points, tile, file ), filters=filters )
+                        for file in self.listing[points].get( tile, [] ) ]
+
+        if frames:
+            # Arquivos sem células do círculo só servem para as colunas
+            frames = [ frame for frame in frames if len( frame ) ] or frames[:1]
+            df_aux = pd.concat( frames, ignore_index=True ).sort_values( POINT_ORDER, ignore_index=True )
+        else:
+            df_aux = pd.DataFrame( columns=SPATIAL_COLUMNS )
+
+        latitude, longitude = POINTS[points]
+        distances = haversine_km( df_aux[latitude].to_numpy( dtype='float64' ),
+                                  df_aux[longitude].to_numpy( dtype='float64' ), lat, lon )
+
+        inside = np.flatnonzero( distances <= radius_km )
+        order = inside[np.argsort( distances[inside], kind='stable' )]
+
+        df_aux = apply_schema( df_aux.iloc[order][SPATIAL_COLUMNS] ).assign( distance_to_point=distances[order] )
+
+        if filtros is not None:
+            df_aux = filter_orders( df_aux, filtros )
+
+        return df_aux.reset_index( drop=True )
+
+
+def read_orders( store_dir, start=None, end=None, columns=None ):
+    """ Esta função lê os pedidos limpos do armazenamento, apenas das
+        partições listadas no manifesto. Apenas as partições semanais
+        com datas na janela [start, end) são lidas, e o recorte exato da
+        janela é feito só nelas.
+
+            Input: Diretório do armazenamento, início (inclusivo) e fim
+                   (exclusivo) opcionais da janela de datas, colunas
+                   (None para todas)
+            Output: Dataframe limpo
+    """
+    parts = sorted( part for entry in read_manifest( store_dir )['files'].values() for part in entry['parts'] )
+    selected = set( weeks_in_window( { os.path.dirname( part ) for part in parts }, start, end ) )
+
+    paths = [ os.path.join( store_dir, 'parts', part ) for part in parts if os.path.dirname( part ) in selected ]
+
+    if paths:
+        frames = [ pd.read_parquet( path, columns=columns ) for path in paths ]
+    else:
+        # Nenhuma semana na janela: dataframe vazio com as colunas corretas
+        frames = [ pd.read_parquet( os.path.join( store_dir, 'parts', parts[0] ), columns=columns ).iloc[:0] ]
+
+    df1 = apply_schema( pd.concat( frames, ignore_index=True ) )
+
+    if 'Order_Date' in df1.columns:
+        linhas_selecionadas = pd.Series( True, index=df1.index )
+        if start is not None:
+            linhas_selecionadas &= df1['Order_Date'] >= pd.Timestamp( start )
+        if end is not None:
+            linhas_selecionadas &= df1['Order_Date'] < pd.Timestamp( end )
+        df1 = df1.loc[linhas_selecionadas].reset_index( drop=True )
+
+    return df1
+
+
+if __name__ == '__main__':
+    # Uso: python -m breeze.ingest [dataset] [dataset/store] [linhas por pedaço] [processos]
+    source = sys.argv[1] if len( sys.argv ) > 1 else 'dataset'
+    store_dir = sys.argv[2] if len( sys.argv ) > 2 else 'dataset/store'
+    chunksize = int( sys.argv[3] ) if len( sys.argv ) > 3 else CHUNKSIZE
+    workers = int( sys.argv[4] ) if len( sys.argv ) > 4 else None
+
+    manifest = ensure_store( source, store_dir, chunksize, workers )
+    rows = sum( entry['rows'] for entry in manifest['files'].values() )
+    print( f'Armazenamento atualizado: {rows} linhas de '
+           f'{len( manifest["files"] )} arquivos em {store_dir}' )
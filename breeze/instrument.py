@@ -0,0 +1,154 @@
+# Bibliotecas necessárias
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import psutil
+
+from breeze import results
+
+# -----------------------------------------------------------------
+
+# Painel de desempenho na barra lateral de todas as páginas. Também pode
+# ser aberto por sessão com ?debug=1 na URL.
+DEBUG = os.environ.get( 'BREEZE_DEBUG', '' ) not in ( '', '0' )
+
+# Com BREEZE_METRICS cada etapa vira uma linha JSON no stderr (logger
+# breeze.metrics, nível INFO). Sem ela o logger segue a configuração de
+# logging do processo.
+METRICS = os.environ.get( 'BREEZE_METRICS', '' ) not in ( '', '0' )
+
+logger = logging.getLogger( 'breeze.metrics' )
+if METRICS:
+    _handler = logging.StreamHandler( sys.stderr )
+    _handler.setFormatter( logging.Formatter( '%(message)s' ) )
+    logger.addHandler( _handler )
+    logger.setLevel( logging.INFO )
+    logger.propagate = False
+
+_process = psutil.Process()
+_local = threading.local()
+
+# -----------------------------------------------------------------
+
+# Classes e funções
+class Run:
+    """ Etapas medidas em uma execução de uma página. """
+
+    def __init__( self, page ):
+        self.page = page
+        self.stages = []
+        self.depth = 0
+        self.start = time.perf_counter()
+
+
+def rss_mb():
+    """ Esta função devolve a memória residente do processo, em MB. """
+    return _process.memory_info().rss / 2 ** 20
+
+
+def start_run( page ):
+    """ Esta função inicia a medição de uma execução da página. O
+        Streamlit executa cada sessão em uma thread, então as etapas
+        ficam separadas por thread.
+
+            Input: Nome da página
+            Output: Run
+    """
+    _local.run = Run( page )
+    return _local.run
+
+
+def current_run():
+    """ Esta função devolve a execução em andamento na thread, ou None. """
+    return getattr( _local, 'run', None )
+
+
+@contextmanager
+def stage( name ):
+    """ Esta função mede o tempo e a variação da memória residente de
+        uma etapa. A medição vai para a execução em andamento (ver
+        start_run) e para o logger breeze.metrics. Etapas dentro de
+        etapas ficam aninhadas. Fora de uma página e com o logger
+        desligado nada é medido.
+
+            Input: Nome da etapa
+            Output: -
+    """
+    run = current_run()
+    log = logger.isEnabledFor( logging.INFO )
+    if run is None and not log:
+        yield
+        return
+
+    depth = 0
+    if run is not None:
+        depth = run.depth
+        run.depth += 1
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        rss_after = rss_mb()
+
+        if run is not None:
+            run.depth -= 1
+            run.stages.append( { 'start': start, 'depth': depth, 'stage': name, 'ms': seconds * 1000,
+                                 'rss_mb': rss_after, 'delta_mb': rss_after - rss_before } )
+
+        if log:
+            logger.info( json.dumps( {
+                'page': run.page if run is not None else None,
+                'stage': name,
+                'ms': round( seconds * 1000, 3 ),
+                'rss_mb': round( rss_after, 1 ),
+                'delta_mb': round( rss_after - rss_before, 1 ),
+                'thread': threading.current_thread().name,
+            } ) )
+
+
+def enabled():
+    """ Esta função verifica se o painel de desempenho está ligado
+        (BREEZE_DEBUG ou ?debug=1 na URL). """
+    import streamlit as st
+
+    return DEBUG or st.query_params.get( 'debug' ) in ( '1', 'true' )
+
+
+def panel():
+    """ Esta função mostra na barra lateral as etapas medidas na execução
+        da página, a memória do processo e os contadores do cache de
+        resultados, quando o painel está ligado (ver enabled).
+
+            Input: -
+            Output: -
+    """
+    import streamlit as st
+
+    run = current_run()
+    if run is None or not enabled():
+        return
+
+    total = ( time.perf_counter() - run.start ) * 1000
+    stages = sorted( run.stages, key=lambda item: item['start'] )
+    df_aux = pd.DataFrame( {
+        'Etapa': [ ' ' * item['depth'] + item['stage'] for item in stages ],
+        'ms': [ round( item['ms'], 1 ) for item in stages ],
+        'Δ MB': [ round( item['delta_mb'], 1 ) for item in stages ],
+    } )
+    cache = results.stats()
+
+    with st.sidebar.expander( 'Desempenho', expanded=True ):
+        st.dataframe( df_aux, hide_index=True, use_container_width=True )
+        st.caption( f'Execução: {total:.0f} ms · memória do processo: {rss_mb():.0f} MB' )
+        st.caption( f'Cache de resultados: {cache["hits"]} acertos, {cache["misses"]} faltas, '
+                    f'{cache["evictions"]} remoções, {cache["bytes"] / 2 ** 20:.1f} de '
+                    f'{cache["budget"] / 2 ** 20:.0f} MB' )
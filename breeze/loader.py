@@ -0,0 +1,247 @@
+# Bibliotecas necessárias
+import ast
+import os
+import threading
+
+import pandas as pd
+
+from breeze import ingest, instrument, parallel, snapshot
+from breeze.cube import CUBES, Cube, spec_columns
+from breeze.schema import apply_schema
+from breeze.spatial import SPATIAL_COLUMNS, SpatialIndex
+
+# -----------------------------------------------------------------
+
+# Origem dos pedidos: um CSV ou um diretório com vários CSVs
+# (por exemplo, o histórico mais um arquivo novo por dia)
+DATASET_PATH = 'dataset'
+
+# Páginas do app. Cada página declara em CUBOS os cubos que usa (ver
+# load_cubes e page_cubes)
+PAGES_DIR = 'pages'
+
+# Cache do processo: (nome, caminho absoluto) -> (impressão digital do arquivo, valor)
+_cache = {}
+_lock = threading.RLock()
+
+# -----------------------------------------------------------------
+
+# Funções
+def file_fingerprint( path ):
+    """ Esta função gera a impressão digital de um arquivo a partir do
+        instante da última modificação (em nanossegundos) e do tamanho.
+        Qualquer alteração no arquivo muda a impressão digital. Para um
+        diretório, a impressão digital reúne a de cada CSV dele, e muda
+        também quando um arquivo é acrescentado ou removido.
+
+        Input: Caminho do arquivo ou diretório
+        Output: Tupla (mtime_ns, tamanho), ou tupla de
+                (nome, mtime_ns, tamanho) para um diretório
+    """
+    if os.path.isdir( path ):
+        return tuple( ( name, ) + file_fingerprint( csv_path )
+                      for name, csv_path in ingest.source_files( path ).items() )
+
+    stat = os.stat( path )
+    return ( stat.st_mtime_ns, stat.st_size )
+
+
+def read_clean( path, columns=None ):
+    """ Esta função lê o dataset limpo de um CSV ou de todos os CSVs de
+        um diretório (ver read_clean_file). Cada CSV tem seu próprio
+        snapshot, então um arquivo novo não obriga a limpar os demais.
+
+            Input: Caminho do CSV ou diretório, colunas (None para todas)
+            Output: Dataframe limpo
+    """
+    if not os.path.isdir( path ):
+        return read_clean_file( path, columns )
+
+    frames = [ read_clean_file( csv_path, columns ) for csv_path in ingest.source_files( path ).values() ]
+    if len( frames ) == 1:
+        return frames[0]
+
+    # Com vários arquivos a concatenação é uma cópia (ainda única por
+    # processo). Arquivos com categorias diferentes viram texto nela
+    return apply_schema( pd.concat( frames, ignore_index=True ) )
+
+
+def read_clean_file( path, columns=None ):
+    """ Esta função lê o dataset limpo a partir do snapshot Arrow,
+        mapeado em memória (ver breeze.snapshot.read_snapshot). Se o
+        snapshot não existir ou estiver desatualizado em relação ao
+        CSV, ele é reconstruído e relido do arquivo, para que o
+        dataframe em cache também seja o mapeado. Caso não seja
+        possível gravar o snapshot (por exemplo, em um disco somente
+        leitura), o dataframe limpo a partir do CSV é devolvido mesmo
+        assim.
+
+        O snapshot guarda todas as colunas, para servir a qualquer
+        página; com columns, só elas são lidas dele (ou do CSV).
+
+            Input: Caminho do CSV, colunas (None para todas)
+            Output: Dataframe limpo
+    """
+    snapshot_path = snapshot.snapshot_path_for( path )
+
+    if not snapshot.snapshot_is_fresh( path, snapshot_path ):
+        try:
+            with instrument.stage( 'carga.snapshot' ):
+                snapshot.build_snapshot( path, snapshot_path )
+        except OSError:
+            return parallel.clean_csv( path, columns=columns )
+
+    with instrument.stage( 'carga.leitura_snapshot' ):
+        return snapshot.read_snapshot( snapshot_path, columns )
+
+
+def cached( name, path, build, columns=None ):
+    """ Esta função guarda em cache, uma única vez por processo, um valor
+        derivado de um arquivo. O valor é reconstruído com build( path )
+        sempre que a impressão digital do arquivo (ou diretório) mudar.
+        Cada conjunto de colunas tem sua própria entrada.
+
+            Input: Nome do valor, caminho do arquivo, função de
+                   construção, colunas (None para todas)
+            Output: Valor em cache
+    """
+    key = os.path.abspath( path )
+    fingerprint = file_fingerprint( key )
+    entry_key = ( name, key, None if columns is None else tuple( columns ) )
+
+    with _lock:
+        entry = _cache.get( entry_key )
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+
+        with instrument.stage( f'carga.{name}' ):
+            value = build( key )
+
+        _cache[entry_key] = ( fingerprint, value )
+        return value
+
+
+def load_dataset( path=DATASET_PATH, columns=None ):
+    """ Esta função carrega e limpa o dataset uma única vez por processo.
+        O resultado fica em cache, indexado pela impressão digital do
+        arquivo: se o CSV for alterado, o cache é invalidado e o dataset
+        é lido e limpo novamente na próxima chamada. A leitura passa
+        pelo snapshot Arrow (ver breeze.snapshot), que torna a partida
+        a frio muito mais rápida que o CSV.
+
+        O dataframe devolvido é um só por processo, compartilhado por
+        todas as sessões: com um único CSV as colunas apontam direto
+        para o snapshot mapeado em memória e são somente leitura, e a
+        memória não cresce com a quantidade de usuários. As páginas
+        guardam apenas recortes dos cubos.
+
+        Com columns (por exemplo, as de um cubo), apenas essas colunas
+        são carregadas.
+
+            Input: Caminho do CSV ou diretório, colunas (None para todas)
+            Output: Dataframe limpo
+    """
+    return cached( 'dataset', path, lambda key: read_clean( key, columns ), columns )
+
+
+def load_cubes( path=DATASET_PATH, names=None ):
+    """ Esta função devolve os cubos OLAP (ver breeze.cube) do dataset.
+        Cada cubo é construído uma única vez por versão do arquivo, com
+        todas as suas medidas, e o mesmo objeto serve a todas as páginas
+        que o pedem (cada página lista os seus em CUBOS).
+
+        Por padrão os cubos são calculados a partir do dataset limpo,
+        lendo apenas as colunas de cada cubo (ver cube.spec_columns).
+        A projeção vale para a leitura do snapshot e para a limpeza
+        direta do CSV (sem snapshot gravável): a construção do snapshot
+        limpa todas as colunas, uma única vez por versão do CSV, para
+        servir a qualquer cubo. Essas colunas não ficam em cache: depois da construção, só as
+        células do cubo continuam em memória. Se a variável de ambiente BREEZE_STORE apontar para um
+        diretório, os CSVs passam pela ingestão em pedaços (ver
+        breeze.ingest) e apenas os cubos gravados são lidos, semana a
+        semana e só até a data de corte do filtro: os que não crescem com
+        o volume de pedidos guardam em memória as semanas lidas (ver
+        ingest.WeeklyCube), e os demais são lidos do disco a cada
+        recorte, já reduzidos (ver ingest.StoredCube). Nem o dataset nem
+        células na escala dos pedidos ficam em memória. Arquivos novos na origem são
+        acrescentados aos cubos sem reprocessar o histórico.
+        Com BREEZE_WORKERS > 1, a limpeza e a agregação rodam em um pool
+        de processos (ver breeze.parallel).
+
+            Input: Caminho do CSV ou diretório, nomes dos cubos (por
+                   exemplo, CUBOS de uma página; None para todos)
+            Output: Dicionário nome -> Cube (ou WeeklyCube e StoredCube)
+    """
+    store_dir = os.environ.get( 'BREEZE_STORE' )
+    names = list( CUBES ) if names is None else names
+
+    if store_dir:
+        def build( key ):
+            ingest.ensure_store( key, store_dir )
+            return ingest.read_cubes( store_dir )
+
+        cubes = cached( 'cubes', path, build )
+        return { name: cubes[name] for name in names }
+
+    def build_cube( spec ):
+        def build( key ):
+            cells = parallel.build_cells_partitioned( read_clean( key, spec_columns( spec ) ), spec )
+            return Cube( cells, spec, indexed=True )
+
+        return build
+
+    return { name: cached( f'cubes.{name}', path, build_cube( CUBES[name] ) ) for name in names }
+
+
+def load_spatial_index( path=DATASET_PATH ):
+    """ Esta função devolve o índice espacial (ver breeze.spatial) do
+        dataset, construído uma única vez por versão do arquivo. Apenas
+        as colunas usadas pelo índice são lidas do snapshot. Com
+        BREEZE_STORE os pedidos não são carregados: o índice gravado na
+        ingestão lê só os blocos da grade de cada consulta (ver
+        ingest.StoredSpatialIndex).
+
+            Input: Caminho do CSV ou diretório
+            Output: SpatialIndex (ou StoredSpatialIndex)
+    """
+    store_dir = os.environ.get( 'BREEZE_STORE' )
+
+    if store_dir:
+        def build( key ):
+            ingest.ensure_store( key, store_dir )
+            return ingest.read_spatial_index( store_dir )
+    else:
+        def build( key ):
+            return SpatialIndex( load_dataset( key, SPATIAL_COLUMNS ) )
+
+    return cached( 'spatial_index', path, build )
+
+
+def page_cubes( pages_dir=PAGES_DIR ):
+    """ Esta função lê a lista CUBOS declarada em cada página, sem
+        executá-la: importar uma página a desenharia no Streamlit.
+
+            Input: Diretório das páginas
+            Output: Dicionário página -> nomes dos cubos. A página é a
+                    última palavra do nome do arquivo, em minúsculas
+                    (1_Visão_Empresa.py -> empresa)
+    """
+    pages = {}
+    for file_name in sorted( os.listdir( pages_dir ) ):
+        if not file_name.endswith( '.py' ):
+            continue
+
+        with open( os.path.join( pages_dir, file_name ), encoding='utf-8' ) as file:
+            tree = ast.parse( file.read() )
+
+        for node in tree.body:
+            if isinstance( node, ast.Assign ) and any( getattr( target, 'id', None ) == 'CUBOS' for target in node.targets ):
+                pages[file_name[:-3].split( '_' )[-1].lower()] = ast.literal_eval( node.value )
+
+    return pages
+
+
+def clear_cache():
+    """ Esta função descarta todos os valores em cache. """
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,253 @@
+# Bibliotecas necessárias
+import argparse
+import datetime
+import glob
+import json
+import os
+import resource
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import streamlit.config
+import streamlit.logger
+from streamlit.testing.v1 import AppTest
+
+from breeze import warmup
+
+# -----------------------------------------------------------------
+
+# Páginas exercitadas (cada sessão fica em uma delas)
+PAGES = [ 'Home.py' ] + sorted( glob.glob( 'pages/*.py' ) )
+
+# Sessões simultâneas, reexecuções por sessão e semente padrão
+SESSIONS = 8
+RERUNS = 10
+SEED = 42
+
+# Tempo máximo de uma execução da página, em segundos. Com muitas
+# sessões em poucos núcleos uma execução espera pelas demais.
+TIMEOUT = 600
+
+PERCENTILES = [ 50, 95, 99 ]
+
+# Chance de um filtro da barra lateral ficar vazio: as páginas precisam
+# aguentar seleções sem nenhum pedido
+EMPTY_SUBSET = 0.1
+
+# -----------------------------------------------------------------
+
+# Funções
+@contextmanager
+def shared_runtime():
+    """ Esta função mantém um único Runtime simulado e a opção
+        global.appTest ligada durante o teste de carga. O AppTest cria
+        os dois a cada execução e os desfaz no fim; com várias sessões
+        em paralelo, uma execução terminando desfaria o estado de outra
+        ainda em andamento.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1.util import patch_config_options
+
+    runtime = MagicMock( spec=Runtime )
+    runtime.media_file_mgr = MediaFileManager( MemoryMediaFileStorage( '/mock/media' ) )
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+
+    with patch.object( Runtime, 'instance', classmethod( lambda cls: runtime ) ), \
+         patch.object( Runtime, 'exists', classmethod( lambda cls: True ) ), \
+         patch_config_options( { 'global.appTest': True } ):
+        yield runtime
+
+
+def random_subset( rng, options ):
+    """ Esta função sorteia um subconjunto das opções, vazio com
+        probabilidade EMPTY_SUBSET. """
+    if rng.random() < EMPTY_SUBSET:
+        return []
+
+    chosen = [ option for option in options if rng.random() < 0.7 ]
+    return chosen or [ options[rng.integers( len( options ) )] ]
+
+
+def random_value( rng, slider ):
+    """ Esta função sorteia um valor válido para um slider (de datas ou
+        numérico). """
+    if isinstance( slider.value, datetime.date ):
+        start = pd.Timestamp( slider.min, unit='us' ).date()
+        days = int( ( slider.max - slider.min ) // slider.step )
+        return start + datetime.timedelta( days=int( rng.integers( days + 1 ) ) )
+
+    return type( slider.value )( rng.integers( int( slider.min ), int( slider.max ) + 1 ) )
+
+
+def interact( at, rng ):
+    """ Esta função faz uma interação aleatória na página: muda os
+        filtros da barra lateral e envia o formulário, ou muda um widget
+        da área principal (visão, camada, raio...). Nada é executado
+        aqui; a reexecução fica por conta de quem chama.
+
+            Input: AppTest já executado, gerador aleatório
+            Output: Descrição da interação
+    """
+    main = list( at.main.radio ) + list( at.main.slider )
+    has_form = len( at.sidebar.multiselect ) > 0
+
+    if has_form and ( not main or rng.random() < 0.6 ):
+        for slider in at.sidebar.slider:
+            slider.set_value( random_value( rng, slider ) )
+        for multiselect in at.sidebar.multiselect:
+            multiselect.set_value( random_subset( rng, multiselect.options ) )
+        for checkbox in at.sidebar.checkbox:
+            checkbox.set_value( bool( rng.random() < 0.5 ) )
+        at.sidebar.button[0].click()
+        return 'filtros'
+
+    if main:
+        widget = main[rng.integers( len( main ) )]
+        if widget in at.main.radio:
+            widget.set_value( widget.options[rng.integers( len( widget.options ) )] )
+        else:
+            widget.set_value( random_value( rng, widget ) )
+        return widget.label
+
+    return 'reexecução'
+
+
+def session( page, reruns, seed ):
+    """ Esta função simula uma sessão: abre a página e faz reruns
+        interações aleatórias, medindo cada execução.
+
+            Input: Página, reexecuções, semente
+            Output: Lista de dicionários ( página, interação, segundos,
+                    erro )
+    """
+    rng = np.random.default_rng( seed )
+    at = AppTest.from_file( page, default_timeout=TIMEOUT )
+    records = []
+
+    for i in range( reruns + 1 ):
+        action = 'abertura' if i == 0 else interact( at, rng )
+
+        start = time.perf_counter()
+        error = None
+        try:
+            at.run()
+            if at.exception:
+                error = at.exception[0].message
+        except Exception as exc:
+            error = repr( exc )
+        records.append( { 'page': page, 'action': action, 'seconds': time.perf_counter() - start,
+                          'error': error } )
+
+    return records
+
+
+def summarize( records, wall ):
+    """ Esta função resume as execuções: percentis da latência,
+        vazão e erros.
+
+            Input: Lista de execuções, tempo total em segundos
+            Output: Dicionário com o resumo
+    """
+    latencies = np.array( [ record['seconds'] for record in records ] )
+
+    summary = { 'reruns': len( records ),
+                'errors': sum( record['error'] is not None for record in records ),
+                'throughput': len( records ) / wall if wall else 0.0 }
+    for q, value in zip( PERCENTILES, np.percentile( latencies, PERCENTILES ) if len( latencies ) else [ np.nan ] * 3 ):
+        summary[f'p{q}_ms'] = round( float( value ) * 1000, 2 )
+
+    return summary
+
+
+def peak_rss_mb():
+    """ Esta função devolve o pico de memória residente do processo. """
+    return resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss / 1024
+
+
+def run( sessions=SESSIONS, reruns=RERUNS, pages=PAGES, seed=SEED, warm=True ):
+    """ Esta função executa o teste de carga: sessions sessões
+        simultâneas, distribuídas entre as páginas, no mesmo processo
+        (como no servidor do Streamlit, que atende cada sessão em uma
+        thread e compartilha os caches do processo). Com warm, os caches
+        são aquecidos antes (ver breeze.warmup), como no servidor
+        iniciado por python -m breeze.warmup.
+
+            Input: Sessões, reexecuções por sessão, páginas, semente,
+                   aquecimento
+            Output: Dicionário com os resumos geral, por página e por
+                    tipo de execução (abertura da página ou interação),
+                    o pico de memória e os erros
+    """
+    if warm:
+        warmup.warm_up()
+
+    tasks = [ ( pages[i % len( pages )], reruns, [ seed, i ] ) for i in range( sessions ) ]
+
+    with shared_runtime():
+        start = time.perf_counter()
+        with ThreadPoolExecutor( max_workers=sessions, thread_name_prefix='sessao' ) as executor:
+            records = [ record for result in executor.map( lambda task: session( *task ), tasks )
+                        for record in result ]
+        wall = time.perf_counter() - start
+
+    return {
+        'sessions': sessions,
+        'reruns_per_session': reruns,
+        'seed': seed,
+        'cpus': os.cpu_count(),
+        'seconds': round( wall, 3 ),
+        'peak_rss_mb': round( peak_rss_mb(), 1 ),
+        'total': summarize( records, wall ),
+        'pages': { page: summarize( [ r for r in records if r['page'] == page ], wall ) for page in pages },
+        'actions': { 'abertura': summarize( [ r for r in records if r['action'] == 'abertura' ], wall ),
+                     'interações': summarize( [ r for r in records if r['action'] != 'abertura' ], wall ) },
+        'errors': sorted( { f'{r["page"]}: {r["error"]}' for r in records if r['error'] } ),
+    }
+
+
+def report( result ):
+    """ Esta função imprime o resumo do teste de carga. """
+    print( f'{result["sessions"]} sessões x {result["reruns_per_session"]} reexecuções em '
+           f'{result["seconds"]:.1f}s ({result["cpus"]} CPUs), pico de memória {result["peak_rss_mb"]:.0f} MB' )
+    print( f'  {"":<34} {"execuções":>9} {"erros":>6} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"por s":>7}' )
+    rows = [ ( 'total', result['total'] ) ] + list( result['actions'].items() ) + list( result['pages'].items() )
+    for name, summary in rows:
+        print( f'  {name:<34} {summary["reruns"]:>9} {summary["errors"]:>6} {summary["p50_ms"]:>9.1f} '
+               f'{summary["p95_ms"]:>9.1f} {summary["p99_ms"]:>9.1f} {summary["throughput"]:>7.2f}' )
+    for error in result['errors']:
+        print( f'  erro: {error}' )
+
+
+if __name__ == '__main__':
+    # Uso: python -m breeze.loadtest [sessões] [reexecuções] [--paginas ...] [--semente N] [--frio]
+    #      [--saida arquivo.json]
+    parser = argparse.ArgumentParser( prog='python -m breeze.loadtest',
+                                      description='Teste de carga com sessões simultâneas do AppTest.' )
+    parser.add_argument( 'sessoes', nargs='?', type=int, default=SESSIONS )
+    parser.add_argument( 'reexecucoes', nargs='?', type=int, default=RERUNS )
+    parser.add_argument( '--paginas', nargs='+', default=PAGES )
+    parser.add_argument( '--semente', type=int, default=SEED )
+    parser.add_argument( '--frio', action='store_true', help='não aquece os caches antes das sessões' )
+    parser.add_argument( '--saida', help='grava o resultado em JSON' )
+    args = parser.parse_args()
+
+    # Avisos do Streamlit e do pandas repetidos a cada execução
+    streamlit.config.set_option( 'logger.level', 'error' )
+    streamlit.logger.set_log_level( 'error' )
+    warnings.filterwarnings( 'ignore' )
+
+    result = run( args.sessoes, args.reexecucoes, args.paginas, args.semente, not args.frio )
+    report( result )
+
+    if args.saida:
+        with open( args.saida, 'w' ) as file:
+            json.dump( result, file, indent=2 )
+            file.write( '\n' )
@@ -0,0 +1,157 @@
+# Bibliotecas necessárias
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from breeze import instrument
+from breeze.cleaning import clean_code, csv_columns
+from breeze.cube import build_cells, merge_cells
+from breeze.schema import apply_schema
+
+# -----------------------------------------------------------------
+
+# Quantidade de processos usados na limpeza e na agregação. Com 1 (o
+# padrão) tudo roda no próprio processo.
+WORKERS = int( os.environ.get( 'BREEZE_WORKERS', '1' ) )
+
+# Linhas por partição. A divisão em partições não depende da quantidade
+# de processos: o resultado é sempre idêntico ao da execução serial.
+PARTITION_ROWS = 100_000
+
+# Linhas usadas para estimar o tamanho médio de uma linha do CSV
+SAMPLE_ROWS = 1_000
+
+# -----------------------------------------------------------------
+
+# Funções
+def map_partitions( fn, tasks, workers=None ):
+    """ Esta função aplica fn a cada tarefa, em um pool de processos
+        quando workers > 1. Os resultados saem na ordem das tarefas,
+        para que a combinação seja a mesma da execução serial.
+
+        O pool usa o método spawn: os processos não herdam as threads
+        do servidor do Streamlit.
+
+            Input: Função, lista de tuplas de argumentos, quantidade de
+                   processos (None para WORKERS)
+            Output: Iterador com os resultados, na ordem das tarefas
+    """
+    workers = WORKERS if workers is None else workers
+
+    if workers <= 1 or len( tasks ) <= 1:
+        for args in tasks:
+            yield fn( *args )
+        return
+
+    context = multiprocessing.get_context( 'spawn' )
+    with ProcessPoolExecutor( max_workers=min( workers, len( tasks ) ), mp_context=context ) as executor:
+        yield from executor.map( fn, *zip( *tasks ) )
+
+
+def csv_partitions( csv_path, rows=PARTITION_ROWS ):
+    """ Esta função divide o CSV em faixas de bytes com cerca de rows
+        linhas cada, sempre terminando no fim de um registro. Campos
+        entre aspas podem ter quebras de linha: a paridade das aspas
+        lidas desde o início da faixa diz se uma quebra de linha está
+        dentro de um campo. Cada faixa pode ser lida e limpa por um
+        processo diferente.
+
+            Input: Caminho do CSV, linhas por partição
+            Output: Lista de tuplas (início, fim) em bytes
+    """
+    size = os.path.getsize( csv_path )
+
+    with open( csv_path, 'rb' ) as file:
+        file.readline()
+        start = file.tell()
+
+        sample = [ len( file.readline() ) for _ in range( SAMPLE_ROWS ) ]
+        sample = [ length for length in sample if length ] or [ 1 ]
+        target = max( 1, rows * sum( sample ) // len( sample ) )
+
+        partitions = []
+        while start < size:
+            file.seek( start )
+            quoted = file.read( target ).count( b'"' ) % 2 == 1
+
+            # Completa a linha atual e as seguintes até sair das aspas
+            # ( aspas escapadas "" não mudam a paridade )
+            line = file.readline()
+            quoted ^= line.count( b'"' ) % 2 == 1
+            while quoted and line:
+                line = file.readline()
+                quoted ^= line.count( b'"' ) % 2 == 1
+
+            end = min( file.tell(), size )
+            partitions.append( ( start, end ) )
+            start = end
+
+    return partitions
+
+
+def read_csv_partition( csv_path, start, end, usecols=None ):
+    """ Esta função lê uma faixa de bytes do CSV (ver csv_partitions)
+        com o cabeçalho do arquivo.
+
+            Input: Caminho do CSV, início e fim da faixa em bytes,
+                   colunas lidas (None para todas)
+            Output: Dataframe com as linhas da faixa
+    """
+    with open( csv_path, 'rb' ) as file:
+        header = file.readline()
+        file.seek( start )
+        data = file.read( end - start )
+
+    return pd.read_csv( io.BytesIO( header + data ), usecols=usecols )
+
+
+def clean_partition( csv_path, start, end, usecols=None ):
+    """ Esta função lê e limpa uma faixa de bytes do CSV. """
+    with instrument.stage( 'limpeza.read_csv' ):
+        df_raw = read_csv_partition( csv_path, start, end, usecols )
+
+    with instrument.stage( 'limpeza.clean_code' ):
+        return clean_code( df_raw )
+
+
+def clean_csv( csv_path, workers=None, rows=PARTITION_ROWS, columns=None ):
+    """ Esta função limpa o CSV partição por partição, em paralelo
+        quando workers > 1, e junta o resultado. Com columns, apenas as
+        colunas do CSV necessárias para elas são lidas e limpas (ver
+        breeze.cleaning.csv_columns).
+
+            Input: Caminho do CSV, quantidade de processos, linhas por
+                   partição, colunas do dataframe limpo (None para todas)
+            Output: Dataframe limpo
+    """
+    usecols = None if columns is None else csv_columns( columns )
+
+    tasks = [ ( csv_path, start, end, usecols ) for start, end in csv_partitions( csv_path, rows ) ]
+    frames = list( map_partitions( clean_partition, tasks, workers ) )
+
+    if not frames:
+        df1 = clean_code( pd.read_csv( csv_path, usecols=usecols ) )
+    else:
+        # Partições com categorias diferentes viram texto na concatenação
+        df1 = apply_schema( pd.concat( frames, ignore_index=True ) )
+
+    return df1 if columns is None else df1[list( columns )]
+
+
+def build_cells_partitioned( df1, spec, workers=None, rows=PARTITION_ROWS ):
+    """ Esta função agrega o dataframe limpo nas células de um cubo,
+        partição por partição (em paralelo quando workers > 1), e junta
+        as células na ordem das partições.
+
+            Input: Dataframe limpo, especificação do cubo, quantidade de
+                   processos, linhas por partição
+            Output: Dataframe de células
+    """
+    tasks = [ ( df1.iloc[start:start + rows], spec ) for start in range( 0, len( df1 ), rows ) ]
+    if not tasks:
+        return build_cells( df1, spec )
+
+    return merge_cells( list( map_partitions( build_cells, tasks, workers ) ), spec )
@@ -0,0 +1,53 @@
+# Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------
+
+# Quantidade padrão de entregadores listados por cidade
+TOP_K = 10
+
+# Ordem em que as cidades aparecem no ranking da página
+CITY_ORDER = [ 'Metropolitian', 'Urban', 'Semi-Urban' ]
+
+# -----------------------------------------------------------------
+
+# Funções
+def top_k_per_group( df1, group, column, k=TOP_K, largest=False, order=None ):
+    """ Esta função seleciona as k linhas com os menores (ou maiores)
+        valores de column em cada grupo.
+
+        As linhas válidas são ordenadas uma única vez por ( grupo, valor )
+        com um sort estável e cada grupo é cortado nas k primeiras linhas
+        com groupby.head, tudo de forma vetorizada. Empates ficam com a
+        linha que aparece primeiro. Valores nulos são ignorados.
+
+            Input: Dataframe, coluna de agrupamento, coluna ordenada,
+                   quantidade por grupo, True para os maiores valores,
+                   lista com a ordem dos grupos ( opcional )
+            Output: Dataframe com até k linhas por grupo e linhas do
+                    melhor para o pior. Com order, só os grupos da lista,
+                    nessa ordem; sem order, os grupos na ordem em que
+                    aparecem
+    """
+    if k <= 0:
+        return df1.iloc[:0].reset_index( drop=True )
+
+    keys = df1[group]
+    valid = df1[column].notna().to_numpy()
+    if order is not None:
+        valid &= keys.isin( order ).to_numpy()
+
+    # Código de cada grupo: posição em order ou ordem de aparição
+    keys = keys[valid]
+    if order is None:
+        codes, _ = pd.factorize( keys, use_na_sentinel=False )
+    else:
+        codes = pd.Index( order ).get_indexer( keys )
+
+    ranked = pd.DataFrame( { 'code': codes, 'value': df1[column].to_numpy()[valid] },
+                           index=np.flatnonzero( valid ) )
+    ranked = ranked.sort_values( ['code', 'value'], ascending=[True, not largest], kind='stable' )
+    positions = ranked.groupby( 'code', sort=False ).head( k ).index
+
+    return df1.iloc[positions].reset_index( drop=True )
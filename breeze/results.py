@@ -0,0 +1,229 @@
+# Bibliotecas necessárias
+import os
+import pickle
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------
+
+# Orçamento de memória do cache de resultados, em MB
+CACHE_MB = float( os.environ.get( 'BREEZE_CACHE_MB', '256' ) )
+
+# -----------------------------------------------------------------
+
+# Funções
+def filter_key( filtros ):
+    """ Esta função normaliza o estado dos filtros da barra lateral: a
+        ordem das opções escolhidas não muda o resultado e não deve
+        criar uma nova entrada no cache.
+
+            Input: Filtros ( data de corte, cidades, climas, condições
+                   de trânsito )
+            Output: Tupla usada como chave
+    """
+    date_cutoff, cities, weathers, traffics = filtros
+
+    return ( pd.Timestamp( date_cutoff ), tuple( sorted( cities ) ), tuple( sorted( weathers ) ),
+             tuple( sorted( traffics ) ) )
+
+
+def sizeof( value ):
+    """ Esta função estima a memória ocupada por um resultado em cache.
+
+            Input: Valor
+            Output: Tamanho em bytes
+    """
+    if isinstance( value, ( pd.DataFrame, pd.Series, pd.Index ) ):
+        usage = value.memory_usage( deep=True )
+        return int( usage.sum() if isinstance( usage, pd.Series ) else usage )
+    if isinstance( value, np.ndarray ):
+        return value.nbytes
+    if isinstance( value, ( str, bytes ) ):
+        return len( value )
+    if hasattr( value, 'cells' ):
+        return sizeof( value.cells )
+
+    try:
+        return len( pickle.dumps( value, protocol=pickle.HIGHEST_PROTOCOL ) )
+    except Exception:
+        return 0
+
+
+class ResultCache:
+    """ Cache LRU de resultados com orçamento de memória.
+
+        Guarda recortes dos cubos, agregações e figuras já montadas,
+        compartilhados por todas as sessões do processo. Quando o total
+        passa do orçamento, os resultados usados há mais tempo saem
+        primeiro. Cada resultado pertence a um cubo: quando o dataset
+        muda e os cubos são refeitos, os resultados antigos saem junto.
+    """
+
+    def __init__( self, budget_mb=CACHE_MB ):
+        self.budget = int( budget_mb * 2 ** 20 )
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.owners = set()
+        self.lock = threading.RLock()
+
+    def get( self, owner, key, build ):
+        """ Esta função devolve o resultado em cache ou o constrói com
+            build() e o guarda.
+
+                Input: Dono do resultado (um cubo), chave, função de
+                       construção
+                Output: Resultado
+        """
+        token = id( owner )
+        full_key = ( token, key )
+
+        with self.lock:
+            entry = self.entries.get( full_key )
+            if entry is not None:
+                self.entries.move_to_end( full_key )
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = build()
+        size = sizeof( value )
+
+        with self.lock:
+            if token not in self.owners:
+                self.owners.add( token )
+                weakref.finalize( owner, self.forget, token )
+
+            # Um resultado maior que o orçamento inteiro não é guardado
+            if size > self.budget:
+                return value
+
+            previous = self.entries.pop( full_key, None )
+            if previous is not None:
+                self.bytes -= previous[1]
+            self.entries[full_key] = ( value, size )
+            self.bytes += size
+
+            while self.bytes > self.budget:
+                _, ( _, evicted ) = self.entries.popitem( last=False )
+                self.bytes -= evicted
+                self.evictions += 1
+
+        return value
+
+    def forget( self, token ):
+        """ Esta função descarta os resultados de um cubo que deixou de
+            existir. """
+        with self.lock:
+            self.owners.discard( token )
+            for full_key in [ k for k in self.entries if k[0] == token ]:
+                self.bytes -= self.entries.pop( full_key )[1]
+
+    def clear( self ):
+        """ Esta função descarta todos os resultados e zera os contadores. """
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats( self ):
+        """ Esta função devolve os contadores do cache.
+
+                Input: -
+                Output: Dicionário com acertos, faltas, remoções,
+                        entradas, bytes usados e orçamento
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len( self.entries ),
+                'bytes': self.bytes,
+                'budget': self.budget,
+            }
+
+
+# Cache compartilhado pelas páginas
+RESULTS = ResultCache()
+
+
+class CachedCube:
+    """ Recorte de um cubo pelos filtros da barra lateral, com as
+        agregações em cache.
+
+        O recorte e cada rollup são calculados uma única vez por estado
+        dos filtros, para todas as sessões. rollup devolve uma cópia,
+        então a página pode renomear colunas sem alterar o cache.
+    """
+
+    def __init__( self, cube, name, filtros, cache=RESULTS ):
+        self.source = cube
+        self.name = name
+        self.filtros = filtros
+        self.key = filter_key( filtros )
+        self.cache = cache
+
+    @property
+    def cube( self ):
+        """ Esta função devolve o cubo recortado pelos filtros. """
+        return self.cache.get( self.source, ( 'select', self.name, self.key ),
+                               lambda: self.source.select( *self.filtros ) )
+
+    @property
+    def cells( self ):
+        """ Esta função devolve as células do recorte. """
+        return self.cube.cells
+
+    def rollup( self, by, column, stats ):
+        """ Esta função agrega o recorte (ver Cube.rollup), com cache.
+
+                Input: Coluna(s) de agrupamento, coluna agregada,
+                       estatística ou lista de estatísticas
+                Output: Series ou Dataframe (cópia do resultado em cache)
+        """
+        by_key = by if isinstance( by, str ) else tuple( by )
+        stats_key = stats if isinstance( stats, str ) else tuple( stats )
+
+        result = self.cache.get( self.source, ( 'rollup', self.name, self.key, by_key, column, stats_key ),
+                                 lambda: self.cube.rollup( by, column, stats ) )
+        return result.copy()
+
+
+def select( cubes, name, filtros ):
+    """ Esta função recorta um cubo pelos filtros da barra lateral, com
+        o recorte e as agregações em cache (ver CachedCube). O recorte é
+        feito (ou lido do cache) já aqui, para que o custo dos filtros
+        apareça na etapa em que a página os aplica.
+
+            Input: Dicionário de cubos, nome do cubo, filtros
+            Output: CachedCube
+    """
+    cube = CachedCube( cubes[name], name, filtros )
+    cube.cube
+
+    return cube
+
+
+def cached( cubes, filtros, key, build ):
+    """ Esta função guarda em cache um resultado montado pela página
+        (por exemplo, uma figura do Plotly) para o estado dos filtros.
+        O resultado é compartilhado entre as sessões e não deve ser
+        alterado no lugar.
+
+            Input: Dicionário de cubos, filtros, nome do resultado
+                   (página e seção), função de construção
+            Output: Resultado
+    """
+    return RESULTS.get( cubes['orders'], ( 'result', key, filter_key( filtros ) ), build )
+
+
+def stats():
+    """ Esta função devolve os contadores do cache de resultados. """
+    return RESULTS.stats()
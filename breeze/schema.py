@@ -0,0 +1,56 @@
+# -----------------------------------------------------------------
+
+# Schema compacto do dataframe limpo
+#   - Textos com poucos valores distintos viram categorias: os filtros
+#     (isin) e agrupamentos (groupby) passam a operar nos códigos.
+#   - O ID do pedido é único por linha; categoria não economiza nada,
+#     então ele é guardado como string do Arrow.
+#   - Números inteiros e reais são reduzidos ao menor tipo que comporta
+#     os valores do dataset sem perda relevante de precisão.
+SCHEMA = {
+    'ID': 'string[pyarrow]',
+    'Delivery_person_ID': 'category',
+    'Delivery_person_Age': 'int8',
+    'Delivery_person_Ratings': 'float32',
+    'Restaurant_latitude': 'float32',
+    'Restaurant_longitude': 'float32',
+    'Delivery_location_latitude': 'float32',
+    'Delivery_location_longitude': 'float32',
+    'Time_Orderd': 'category',
+    'Time_Order_picked': 'category',
+    'Weatherconditions': 'category',
+    'Road_traffic_density': 'category',
+    'Vehicle_condition': 'int8',
+    'Type_of_order': 'category',
+    'Type_of_vehicle': 'category',
+    'multiple_deliveries': 'int8',
+    'Festival': 'category',
+    'City': 'category',
+    'Time_taken(min)': 'int16',
+    'distance': 'float32',
+}
+
+# -----------------------------------------------------------------
+
+# Funções
+def apply_schema( df1 ):
+    """ Esta função converte as colunas do dataframe limpo para os tipos
+        compactos definidos em SCHEMA. Colunas ausentes no dataframe são
+        ignoradas e colunas fora do SCHEMA mantêm o tipo original.
+
+            Input: Dataframe limpo
+            Output: Dataframe com o schema compacto
+    """
+    dtypes = { col: dtype for col, dtype in SCHEMA.items() if col in df1.columns }
+
+    return df1.astype( dtypes )
+
+
+def memory_usage_mb( df1 ):
+    """ Esta função mede a memória ocupada pelo dataframe, incluindo o
+        conteúdo das colunas de texto.
+
+            Input: Dataframe
+            Output: Memória em MB
+    """
+    return df1.memory_usage( deep=True ).sum() / 1024 ** 2
@@ -0,0 +1,143 @@
+# Bibliotecas necessárias
+import json
+import os
+import sys
+
+import pyarrow as pa
+
+from breeze import parallel
+
+# -----------------------------------------------------------------
+
+# Versão do formato do snapshot. Deve ser incrementada sempre que a
+# limpeza mudar o conteúdo ou os tipos do dataframe limpo.
+SNAPSHOT_VERSION = 5
+
+METADATA_KEY = b'breeze.snapshot'
+
+# -----------------------------------------------------------------
+
+# Funções
+def snapshot_path_for( csv_path ):
+    """ Esta função devolve o caminho padrão do snapshot de um CSV:
+        o mesmo nome do arquivo com a extensão .arrow.
+
+        Input: Caminho do CSV
+        Output: Caminho do snapshot Arrow
+    """
+    return os.path.splitext( csv_path )[0] + '.arrow'
+
+
+def source_fingerprint( csv_path ):
+    """ Esta função descreve a versão do CSV de origem que gerou o
+        snapshot: versão do formato, instante da última modificação
+        e tamanho do arquivo.
+
+        Input: Caminho do CSV
+        Output: Dicionário com a impressão digital da origem
+    """
+    stat = os.stat( csv_path )
+    return {
+        'version': SNAPSHOT_VERSION,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+    }
+
+
+def snapshot_is_fresh( csv_path, snapshot_path ):
+    """ Esta função verifica se o snapshot existe e foi gerado a partir
+        da versão atual do CSV. Apenas o schema do arquivo é lido.
+
+        Input: Caminho do CSV, caminho do snapshot
+        Output: True se o snapshot puder ser usado no lugar do CSV
+    """
+    if not os.path.exists( snapshot_path ):
+        return False
+
+    try:
+        with pa.memory_map( snapshot_path ) as source:
+            metadata = pa.ipc.open_file( source ).schema.metadata or {}
+    except ( OSError, pa.ArrowInvalid ):
+        return False
+
+    stored = metadata.get( METADATA_KEY )
+    if stored is None:
+        return False
+
+    return json.loads( stored ) == source_fingerprint( csv_path )
+
+
+def write_snapshot( df1, csv_path, snapshot_path ):
+    """ Esta função grava o dataframe limpo em Arrow IPC junto com a
+        impressão digital do CSV de origem. O arquivo não é comprimido
+        e tem um único lote de linhas, para que as colunas possam ser
+        usadas direto do mapeamento em memória (ver read_snapshot).
+
+        A gravação é feita em um arquivo temporário e renomeada no
+        final, para que uma leitura concorrente nunca encontre um
+        snapshot pela metade.
+
+        Input: Dataframe limpo, caminho do CSV, caminho do snapshot
+        Output: None
+    """
+    table = pa.Table.from_pandas( df1, preserve_index=False ).combine_chunks()
+    metadata = dict( table.schema.metadata or {} )
+    metadata[METADATA_KEY] = json.dumps( source_fingerprint( csv_path ) ).encode()
+    table = table.replace_schema_metadata( metadata )
+
+    tmp_path = snapshot_path + '.tmp'
+    with pa.OSFile( tmp_path, 'wb' ) as sink:
+        with pa.ipc.new_file( sink, table.schema ) as writer:
+            writer.write_table( table, max_chunksize=max( 1, table.num_rows ) )
+    os.replace( tmp_path, snapshot_path )
+
+
+def read_snapshot( snapshot_path, columns=None ):
+    """ Esta função lê o snapshot mapeando o arquivo em memória, sem
+        copiar os dados: as colunas numéricas e os códigos das
+        categorias do dataframe apontam para as páginas do arquivo.
+        Com columns, apenas essas colunas são convertidas para o
+        dataframe; as páginas das demais nem chegam a ser lidas.
+
+        Essas páginas são compartilhadas por todas as sessões do
+        processo (e pelos demais processos que leem o mesmo snapshot)
+        e são somente leitura: uma escrita no lugar falha em vez de
+        alterar o dataset das outras sessões.
+
+        Input: Caminho do snapshot, colunas (None para todas)
+        Output: Dataframe limpo
+    """
+    table = pa.ipc.open_file( pa.memory_map( snapshot_path ) ).read_all()
+    if columns is not None:
+        table = table.select( list( columns ) )
+
+    return table.to_pandas( split_blocks=True )
+
+
+def build_snapshot( csv_path, snapshot_path=None, workers=None ):
+    """ Esta função lê o CSV, aplica a limpeza e grava o snapshot. A
+        limpeza é feita por partições do CSV, em paralelo quando
+        workers > 1 (ver breeze.parallel).
+
+        Input: Caminho do CSV, caminho do snapshot (opcional),
+               quantidade de processos (None para BREEZE_WORKERS)
+        Output: Dataframe limpo
+    """
+    if snapshot_path is None:
+        snapshot_path = snapshot_path_for( csv_path )
+
+    df1 = parallel.clean_csv( csv_path, workers )
+    write_snapshot( df1, csv_path, snapshot_path )
+
+    return df1
+
+
+if __name__ == '__main__':
+    # Uso: python -m breeze.snapshot [dataset/train.csv] [dataset/train.arrow] [processos]
+    csv_path = sys.argv[1] if len( sys.argv ) > 1 else 'dataset/train.csv'
+    snapshot_path = sys.argv[2] if len( sys.argv ) > 2 else None
+    workers = int( sys.argv[3] ) if len( sys.argv ) > 3 else None
+
+    df1 = build_snapshot( csv_path, snapshot_path, workers )
+    print( f'Snapshot gravado com {len( df1 )} linhas em '
+           f'{snapshot_path or snapshot_path_for( csv_path )}' )
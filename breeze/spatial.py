@@ -0,0 +1,300 @@
+# Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------
+
+# Lado de cada célula da grade, em graus (~11 km de latitude)
+CELL_DEGREES = 0.1
+
+# Lado de cada bloco de células gravado junto no armazenamento (ver
+# breeze.ingest), em células: 50 células de 0.1° formam blocos de 5°,
+# poucos por país e bem maiores que o raio das consultas (até 50 Km)
+TILE_CELLS = 50
+
+# Raio médio da Terra (Km), o mesmo usado pelo haversine
+EARTH_RADIUS = 6371.0088
+
+# Colunas usadas pelas consultas espaciais (o índice não guarda o resto
+# do dataset)
+SPATIAL_COLUMNS = [
+    'Order_Date',
+    'City',
+    'Weatherconditions',
+    'Road_traffic_density',
+    'Restaurant_latitude',
+    'Restaurant_longitude',
+    'Delivery_location_latitude',
+    'Delivery_location_longitude',
+    'Time_taken(min)',
+    'distance',
+]
+
+# Pares de coordenadas indexados: local de entrega e restaurante
+POINTS = {
+    'delivery': ( 'Delivery_location_latitude', 'Delivery_location_longitude' ),
+    'restaurant': ( 'Restaurant_latitude', 'Restaurant_longitude' ),
+}
+
+# -----------------------------------------------------------------
+
+# Funções
+def haversine_km( latitude, longitude, lat, lon ):
+    """ Esta função calcula a distância em Km entre um ponto e um array
+        de coordenadas.
+
+            Input: Arrays de latitudes e longitudes, latitude e longitude
+                   do ponto
+            Output: Array de distâncias
+    """
+    phi1, phi2 = np.radians( latitude ), np.radians( lat )
+    dphi = phi2 - phi1
+    dlambda = np.radians( lon ) - np.radians( longitude )
+
+    a = np.sin( dphi / 2 ) ** 2 + np.cos( phi1 ) * np.cos( phi2 ) * np.sin( dlambda / 2 ) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin( np.sqrt( np.clip( a, 0, 1 ) ) )
+
+
+def grid_columns( cell=CELL_DEGREES ):
+    """ Esta função devolve a quantidade de colunas da grade. """
+    return int( np.ceil( 360 / cell ) ) + 1
+
+
+def col_origin( cell=CELL_DEGREES ):
+    """ Esta função devolve a coluna da grade da longitude -180. """
+    return int( np.floor( -180 / cell ) )
+
+
+def cell_keys( latitude, longitude, cell=CELL_DEGREES ):
+    """ Esta função calcula a chave da célula da grade de cada ponto. As
+        chaves seguem a grade linha a linha, de oeste para leste.
+
+            Input: Arrays de latitudes e longitudes, lado da célula
+            Output: Array de chaves
+    """
+    rows = np.floor( np.asarray( latitude, dtype='float64' ) / cell ).astype( 'int64' )
+    cols = np.floor( np.asarray( longitude, dtype='float64' ) / cell ).astype( 'int64' )
+
+    return rows * grid_columns( cell ) + (cols - col_origin( cell ))
+
+
+def key_ranges( lat, lon, radius_km, cell=CELL_DEGREES ):
+    """ Esta função lista as faixas de chaves das células que cobrem o
+        círculo de raio radius_km em volta do ponto, uma por linha da
+        grade.
+
+            Input: Latitude, longitude, raio em Km, lado da célula
+            Output: Lista de ( chave inicial, chave final ), inclusivas
+    """
+    dlat = np.degrees( radius_km / EARTH_RADIUS )
+    lat_min, lat_max = max( lat - dlat, -90.0 ), min( lat + dlat, 90.0 )
+
+    # Perto dos polos o círculo cobre todas as longitudes
+    widest = max( abs( lat_min ), abs( lat_max ) )
+    if widest >= 89.9:
+        lon_min, lon_max = -180.0, 180.0
+    else:
+        dlon = min( dlat / np.cos( np.radians( widest ) ), 180.0 )
+        lon_min, lon_max = lon - dlon, lon + dlon
+
+    col_min = int( np.floor( max( lon_min, -180.0 ) / cell ) ) - col_origin( cell )
+    col_max = int( np.floor( min( lon_max, 180.0 ) / cell ) ) - col_origin( cell )
+
+    columns = grid_columns( cell )
+    return [ ( row * columns + col_min, row * columns + col_max )
+             for row in range( int( np.floor( lat_min / cell ) ), int( np.floor( lat_max / cell ) ) + 1 ) ]
+
+
+def tile_names( keys ):
+    """ Esta função devolve o nome do bloco (ver TILE_CELLS) da célula
+        de cada chave.
+
+            Input: Array de chaves da grade padrão
+            Output: Array de nomes ( 'linha_coluna' )
+    """
+    rows, cols = np.divmod( np.asarray( keys ), grid_columns() )
+    names = pd.Series( rows // TILE_CELLS ).astype( str ) + '_' + pd.Series( cols // TILE_CELLS ).astype( str )
+
+    return names.to_numpy()
+
+
+def tile_ranges( lat, lon, radius_km ):
+    """ Esta função agrupa por bloco as faixas de chaves das células que
+        cobrem o círculo (ver key_ranges), na grade padrão.
+
+            Input: Latitude, longitude, raio em Km
+            Output: Dicionário nome do bloco -> lista de ( chave
+                    inicial, chave final ), inclusivas
+    """
+    columns = grid_columns()
+
+    ranges = {}
+    for key_min, key_max in key_ranges( lat, lon, radius_km ):
+        row, col_min = divmod( key_min, columns )
+        col_max = key_max - row * columns
+        for tile_col in range( col_min // TILE_CELLS, col_max // TILE_CELLS + 1 ):
+            first = row * columns + max( col_min, tile_col * TILE_CELLS )
+            last = row * columns + min( col_max, tile_col * TILE_CELLS + TILE_CELLS - 1 )
+            ranges.setdefault( f'{row // TILE_CELLS}_{tile_col}', [] ).append( ( first, last ) )
+
+    return ranges
+
+
+def filter_orders( df_aux, filtros ):
+    """ Esta função aplica os filtros da barra lateral aos pedidos de
+        uma consulta espacial.
+
+            Input: Dataframe dos pedidos, filtros ( data de corte,
+                   cidades, climas, condições de trânsito )
+            Output: Dataframe dos pedidos selecionados
+    """
+    date_cutoff, cities, weathers, traffics = filtros
+    linhas_selecionadas = (
+        (df_aux['Order_Date'] < pd.Timestamp( date_cutoff )) &
+        df_aux['City'].isin( cities ) &
+        df_aux['Weatherconditions'].isin( weathers ) &
+        df_aux['Road_traffic_density'].isin( traffics )
+    )
+
+    return df_aux.loc[linhas_selecionadas]
+
+
+class GridIndex:
+    """ Índice espacial em grade sobre um conjunto de coordenadas.
+
+        Os pontos ficam ordenados pela célula da grade. Uma consulta por
+        raio só lê as células que cobrem o círculo (uma busca binária
+        por linha da grade) e calcula o haversine apenas para esses
+        candidatos, em vez de percorrer todos os pontos.
+    """
+
+    def __init__( self, latitude, longitude, cell=CELL_DEGREES ):
+        self.latitude = np.asarray( latitude, dtype='float64' )
+        self.longitude = np.asarray( longitude, dtype='float64' )
+        self.cell = cell
+
+        keys = cell_keys( self.latitude, self.longitude, cell )
+        self.order = np.argsort( keys, kind='stable' )
+        self.keys = keys[self.order]
+
+    def candidates( self, lat, lon, radius_km ):
+        """ Esta função devolve as posições dos pontos nas células que
+            cobrem o círculo de raio radius_km em volta do ponto.
+
+                Input: Latitude, longitude, raio em Km
+                Output: Array de posições
+        """
+        slices = []
+        for key_min, key_max in key_ranges( lat, lon, radius_km, self.cell ):
+            start = np.searchsorted( self.keys, key_min, side='left' )
+            end = np.searchsorted( self.keys, key_max, side='right' )
+            slices.append( self.order[start:end] )
+
+        return np.concatenate( slices ) if slices else np.empty( 0, dtype='int64' )
+
+    def within( self, lat, lon, radius_km ):
+        """ Esta função encontra os pontos a até radius_km do ponto.
+
+                Input: Latitude, longitude, raio em Km
+                Output: Array de posições, array de distâncias em Km
+        """
+        positions = self.candidates( lat, lon, radius_km )
+        distances = haversine_km( self.latitude[positions], self.longitude[positions], lat, lon )
+
+        inside = distances <= radius_km
+        return positions[inside], distances[inside]
+
+    def nearest( self, lat, lon, k ):
+        """ Esta função encontra os k pontos mais próximos do ponto. O raio
+            de busca dobra até conter k pontos: todos os pontos fora dele
+            estão mais longe que os encontrados.
+
+                Input: Latitude, longitude, quantidade de pontos
+                Output: Array de posições e array de distâncias em Km,
+                        do mais próximo para o mais distante
+        """
+        k = min( k, len( self.keys ) )
+        radius = self.cell * 111.0
+        positions, distances = self.within( lat, lon, radius )
+
+        # Meia volta da Terra cobre todos os pontos
+        while len( positions ) < k and radius < np.pi * EARTH_RADIUS:
+            radius *= 2
+            positions, distances = self.within( lat, lon, radius )
+
+        nearest = np.argsort( distances, kind='stable' )[:k]
+        return positions[nearest], distances[nearest]
+
+
+class SpatialIndex:
+    """ Índice espacial dos pedidos.
+
+        Guarda as colunas de SPATIAL_COLUMNS e uma grade para cada par
+        de coordenadas (entrega e restaurante), mais uma grade dos
+        restaurantes distintos para a busca dos mais próximos.
+    """
+
+    def __init__( self, df1 ):
+        self.df = df1[SPATIAL_COLUMNS].reset_index( drop=True )
+
+        self.grids = {
+            points: GridIndex( self.df[latitude], self.df[longitude] )
+            for points, ( latitude, longitude ) in POINTS.items()
+        }
+
+        latitude, longitude = POINTS['restaurant']
+        self.index_restaurants( self.df.groupby( [latitude, longitude], observed=True )
+                                       .size()
+                                       .rename( 'pedidos' )
+                                       .reset_index() )
+
+    def index_restaurants( self, restaurants ):
+        """ Esta função guarda os restaurantes distintos e monta a grade
+            usada na busca dos mais próximos.
+
+                Input: Dataframe com as coordenadas e a quantidade de
+                       pedidos de cada restaurante
+                Output: None
+        """
+        latitude, longitude = POINTS['restaurant']
+        self.restaurants = restaurants
+        self.restaurant_grid = GridIndex( restaurants[latitude], restaurants[longitude] )
+
+        # Ponto inicial das consultas: mediana dos restaurantes
+        self.center = ( float( restaurants[latitude].median() ), float( restaurants[longitude].median() ) )
+
+    def within( self, lat, lon, radius_km, points='delivery', filtros=None ):
+        """ Esta função seleciona os pedidos com o local de entrega (ou o
+            restaurante) a até radius_km do ponto. Os filtros da barra
+            lateral são aplicados só aos pedidos dentro do raio.
+
+                Input: Latitude, longitude, raio em Km, coordenadas
+                       usadas ( 'delivery' ou 'restaurant' ), filtros
+                       opcionais ( data de corte, cidades, climas,
+                       condições de trânsito )
+                Output: Dataframe dos pedidos, com a coluna
+                        distance_to_point (Km), do mais próximo para o
+                        mais distante
+        """
+        positions, distances = self.grids[points].within( lat, lon, radius_km )
+        order = np.argsort( distances, kind='stable' )
+
+        df_aux = self.df.iloc[positions[order]].assign( distance_to_point=distances[order] )
+
+        if filtros is not None:
+            df_aux = filter_orders( df_aux, filtros )
+
+        return df_aux.reset_index( drop=True )
+
+    def nearest_restaurants( self, lat, lon, k=5 ):
+        """ Esta função encontra os k restaurantes mais próximos do ponto.
+
+                Input: Latitude, longitude, quantidade de restaurantes
+                Output: Dataframe com as coordenadas, a quantidade de
+                        pedidos e a distância (Km) de cada restaurante
+        """
+        positions, distances = self.restaurant_grid.nearest( lat, lon, k )
+
+        return (self.restaurants.iloc[positions]
+                                .assign( distance_to_point=distances )
+                                .reset_index( drop=True ))
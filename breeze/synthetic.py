@@ -0,0 +1,208 @@
+# Bibliotecas necessárias
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------
+
+# Linhas do train.csv original: a escala 1 tem o mesmo volume
+BASE_ROWS = 45_593
+
+# Escalas usadas pelos benchmarks (ver breeze.bench)
+SCALES = [ 1, 10, 100, 1000 ]
+
+# Semente padrão: a mesma escala e a mesma semente geram sempre o mesmo
+# arquivo, byte a byte
+SEED = 42
+
+# Linhas geradas e gravadas por vez: a memória não depende da escala
+CHUNK_ROWS = 100_000
+
+# Cidades dos entregadores (prefixo do Delivery_person_ID) e o centro
+# aproximado de cada uma
+CITIES = {
+    'INDO': ( 22.72, 75.86 ), 'BANG': ( 12.97, 77.59 ), 'COIMB': ( 11.02, 76.96 ),
+    'CHEN': ( 13.08, 80.27 ), 'HYD': ( 17.39, 78.49 ), 'RANCHI': ( 23.34, 85.31 ),
+    'MYS': ( 12.30, 76.64 ), 'DEH': ( 30.32, 78.03 ), 'KOC': ( 9.93, 76.27 ),
+    'PUNE': ( 18.52, 73.86 ), 'LUDH': ( 30.90, 75.86 ), 'KNP': ( 26.45, 80.33 ),
+    'MUM': ( 19.08, 72.88 ), 'KOL': ( 22.57, 88.36 ), 'JAP': ( 26.91, 75.79 ),
+    'SUR': ( 21.17, 72.83 ), 'GOA': ( 15.50, 73.83 ), 'AURG': ( 19.88, 75.34 ),
+    'AGR': ( 27.18, 78.01 ), 'VAD': ( 22.31, 73.18 ), 'ALH': ( 25.44, 81.85 ),
+    'BHP': ( 23.26, 77.41 ),
+}
+
+# Restaurantes por cidade e entregadores por restaurante na escala 1
+RESTAURANTS = 20
+DELIVERERS = 3
+
+# Valores das colunas de texto, com os espaços e sentinelas 'NaN ' do
+# CSV original, e a frequência de cada um
+CATEGORIES = {
+    'Weatherconditions': {
+        'conditions Fog': 0.17, 'conditions Stormy': 0.167, 'conditions Cloudy': 0.167,
+        'conditions Sandstorms': 0.165, 'conditions Windy': 0.164, 'conditions Sunny': 0.154,
+        'conditions NaN': 0.013,
+    },
+    'Road_traffic_density': { 'Low ': 0.34, 'Jam ': 0.31, 'Medium ': 0.24, 'High ': 0.098, 'NaN ': 0.012 },
+    'Type_of_order': { 'Snack ': 0.255, 'Meal ': 0.25, 'Drinks ': 0.248, 'Buffet ': 0.247 },
+    'Type_of_vehicle': { 'motorcycle ': 0.58, 'scooter ': 0.335, 'electric_scooter ': 0.08, 'bicycle ': 0.005 },
+    'Festival': { 'No ': 0.975, 'Yes ': 0.02, 'NaN ': 0.005 },
+    'City': { 'Metropolitian ': 0.745, 'Urban ': 0.223, 'Semi-Urban ': 0.004, 'NaN ': 0.028 },
+    'multiple_deliveries': { '1': 0.62, '0': 0.31, '2': 0.044, '3': 0.004, 'NaN ': 0.022 },
+}
+
+# Minutos extras no tempo de entrega por condição
+TRAFFIC_MINUTES = { 'Low ': 0, 'Medium ': 6, 'High ': 8, 'Jam ': 12, 'NaN ': 4 }
+CITY_MINUTES = { 'Metropolitian ': 4, 'Urban ': 0, 'Semi-Urban ': 20, 'NaN ': 2 }
+
+# Frações de linhas com idade e avaliação ausentes, e de restaurantes
+# com coordenadas zeradas ou com o sinal trocado (como no original)
+MISSING_PERSON = 0.04
+MISSING_TIME = 0.038
+ZERO_COORDINATES = 0.008
+NEGATIVE_COORDINATES = 0.008
+
+# Período dos pedidos
+FIRST_DATE = pd.Timestamp( 2022, 2, 11 )
+DAYS = 55
+
+# -----------------------------------------------------------------
+
+# Funções
+def deliverer_ids( scale ):
+    """ Esta função devolve os IDs dos entregadores de uma escala. O
+        total cresce com a escala, para que as contagens distintas
+        também cresçam.
+
+            Input: Escala
+            Output: Array com os IDs (com o espaço final do original)
+    """
+    restaurants = RESTAURANTS * max( 1, int( scale ) )
+
+    return np.array( [ f'{city}RES{r:02d}DEL{d:02d} '
+                       for city in CITIES for r in range( 1, restaurants + 1 ) for d in range( 1, DELIVERERS + 1 ) ],
+                     dtype=object )
+
+
+def choice( rng, column, size ):
+    """ Esta função sorteia os valores de uma coluna de CATEGORIES. """
+    values = CATEGORIES[column]
+    p = np.array( list( values.values() ) )
+
+    return rng.choice( np.array( list( values ), dtype=object ), size, p=p / p.sum() )
+
+
+def generate_chunk( rows, seed, chunk, first_id, scale=1 ):
+    """ Esta função gera um pedaço de pedidos no formato bruto do
+        train.csv: textos com espaço no final, sentinelas 'NaN ', datas
+        dd-mm-aaaa e o tempo como '(min) NN'. Cada pedaço tem sua
+        própria semente, então o resultado não depende de quantos
+        pedaços foram gerados antes.
+
+            Input: Linhas, semente, número do pedaço, primeiro ID,
+                   escala
+            Output: Dataframe bruto
+    """
+    rng = np.random.default_rng( [ seed, chunk ] )
+
+    ids = deliverer_ids( scale )
+    person = rng.integers( 0, len( ids ), rows )
+    centers = np.array( list( CITIES.values() ) )
+    city_of_person = np.repeat( np.arange( len( CITIES ) ), len( ids ) // len( CITIES ) )[person]
+
+    # ----- Entregador -----
+    age = rng.integers( 20, 40, rows ).astype( str ).astype( object )
+    ratings = np.round( np.clip( rng.normal( 4.63, 0.33, rows ), 1, 6 ), 1 ).astype( str ).astype( object )
+    missing = rng.random( rows ) < MISSING_PERSON
+    age[missing] = 'NaN '
+    ratings[missing] = 'NaN '
+
+    # ----- Coordenadas -----
+    restaurant = centers[city_of_person] + rng.uniform( -0.1, 0.1, ( rows, 2 ) )
+    delivery = restaurant + rng.choice( [ -1, 1 ], ( rows, 2 ) ) * rng.uniform( 0.01, 0.09, ( rows, 2 ) )
+    restaurant[rng.random( rows ) < ZERO_COORDINATES] = 0.0
+    restaurant[rng.random( rows ) < NEGATIVE_COORDINATES] *= -1
+
+    # ----- Datas e horários -----
+    dates = FIRST_DATE + pd.to_timedelta( rng.integers( 0, DAYS, rows ), unit='D' )
+    ordered = pd.to_timedelta( rng.integers( 8 * 4, 24 * 4, rows ) * 15, unit='min' )
+    picked = ordered + pd.to_timedelta( rng.choice( [ 5, 10, 15 ], rows ), unit='min' )
+    time_ordered = pd.Series( ordered ).astype( str ).str[-8:].to_numpy( dtype=object )
+    time_ordered[rng.random( rows ) < MISSING_TIME] = 'NaN '
+    time_picked = pd.Series( picked ).astype( str ).str[-8:].to_numpy( dtype=object )
+
+    # ----- Condições -----
+    weather = choice( rng, 'Weatherconditions', rows )
+    traffic = choice( rng, 'Road_traffic_density', rows )
+    city = choice( rng, 'City', rows )
+    festival = choice( rng, 'Festival', rows )
+    multiple = choice( rng, 'multiple_deliveries', rows )
+    condition = rng.integers( 0, 4, rows )
+
+    # ----- Tempo de entrega, correlacionado com as condições -----
+    minutes = ( 15 + rng.normal( 0, 4, rows )
+                + pd.Series( traffic ).map( TRAFFIC_MINUTES ).to_numpy()
+                + pd.Series( city ).map( CITY_MINUTES ).to_numpy()
+                + np.where( festival == 'Yes ', 18, 0 )
+                + np.where( multiple == '2', 10, 0 ) + np.where( multiple == '3', 18, 0 )
+                + ( 3 - condition ) * 1.5 )
+    minutes = np.clip( np.round( minutes ), 10, 54 ).astype( int )
+
+    return pd.DataFrame( {
+        'ID': [ f'0x{i:04x} ' for i in range( first_id, first_id + rows ) ],
+        'Delivery_person_ID': ids[person],
+        'Delivery_person_Age': age,
+        'Delivery_person_Ratings': ratings,
+        'Restaurant_latitude': np.round( restaurant[:, 0], 6 ),
+        'Restaurant_longitude': np.round( restaurant[:, 1], 6 ),
+        'Delivery_location_latitude': np.round( delivery[:, 0], 6 ),
+        'Delivery_location_longitude': np.round( delivery[:, 1], 6 ),
+        'Order_Date': dates.strftime( '%d-%m-%Y' ),
+        'Time_Orderd': time_ordered,
+        'Time_Order_picked': time_picked,
+        'Weatherconditions': weather,
+        'Road_traffic_density': traffic,
+        'Vehicle_condition': condition,
+        'Type_of_order': choice( rng, 'Type_of_order', rows ),
+        'Type_of_vehicle': choice( rng, 'Type_of_vehicle', rows ),
+        'multiple_deliveries': multiple,
+        'Festival': festival,
+        'City': city,
+        'Time_taken(min)': [ f'(min) {m}' for m in minutes ],
+    } )
+
+
+def generate( csv_path, scale=1, seed=SEED, rows=None, chunk_rows=CHUNK_ROWS ):
+    """ Esta função grava um CSV sintético com o schema do train.csv,
+        pedaço por pedaço (a memória não depende da escala). A escala
+        multiplica o volume do original.
+
+            Input: Caminho do CSV, escala, semente, linhas (opcional,
+                   no lugar da escala), linhas por pedaço
+            Output: Linhas gravadas
+    """
+    rows = int( BASE_ROWS * scale ) if rows is None else rows
+
+    os.makedirs( os.path.dirname( csv_path ) or '.', exist_ok=True )
+    tmp_path = csv_path + '.tmp'
+
+    with open( tmp_path, 'w', newline='' ) as file:
+        for chunk, start in enumerate( range( 0, rows, chunk_rows ) ):
+            df_chunk = generate_chunk( min( chunk_rows, rows - start ), seed, chunk, start, scale )
+            df_chunk.to_csv( file, index=False, header=( chunk == 0 ) )
+
+    os.replace( tmp_path, csv_path )
+
+    return rows
+
+
+if __name__ == '__main__':
+    # Uso: python -m breeze.synthetic [escala] [benchmarks/data/x<escala>/train.csv] [semente]
+    scale = float( sys.argv[1] ) if len( sys.argv ) > 1 else 1
+    csv_path = sys.argv[2] if len( sys.argv ) > 2 else f'benchmarks/data/x{scale:g}/train.csv'
+    seed = int( sys.argv[3] ) if len( sys.argv ) > 3 else SEED
+
+    rows = generate( csv_path, scale, seed )
+    print( f'{rows} pedidos sintéticos gravados em {csv_path}' )
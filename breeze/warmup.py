@@ -0,0 +1,133 @@
+# Bibliotecas necessárias
+import logging
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from breeze import charts, geo, results
+from breeze.loader import DATASET_PATH, load_cubes, load_spatial_index
+
+# -----------------------------------------------------------------
+
+# Estado padrão da barra lateral das páginas (data de corte, cidades,
+# climas e condições de trânsito)
+DEFAULT_FILTERS = (
+    pd.Timestamp( 2022, 4, 1 ),
+    [ 'Metropolitian', 'Urban', 'Semi-Urban' ],
+    [ 'conditions Cloudy', 'conditions Fog', 'conditions Sandstorms',
+      'conditions Stormy', 'conditions Sunny', 'conditions Windy' ],
+    [ 'Low', 'Medium', 'High', 'Jam' ],
+)
+
+# Gráficos da primeira visita a cada página (ver breeze.charts). A
+# página dos entregadores não tem gráficos, e a visão tática da página
+# da empresa só é desenhada quando escolhida
+DEFAULT_CHARTS = [
+    # pages/1_Visão_Empresa.py: visão gerencial
+    charts.pedidos_por_dia,
+    charts.pedidos_por_trafego,
+    charts.pedidos_por_cidade_e_trafego,
+    # pages/3_Visão_Restaurante.py
+    charts.tempo_por_cidade,
+    charts.distancia_por_cidade,
+    charts.percentis,
+    charts.tempo_por_distancia,
+    charts.desvio_por_cidade_e_trafego,
+]
+
+_thread = None
+_lock = threading.Lock()
+
+logger = logging.getLogger( __name__ )
+
+# -----------------------------------------------------------------
+
+# Funções
+def warm_up( path=DATASET_PATH, filtros=DEFAULT_FILTERS ):
+    """ Esta função aquece os caches do processo para o estado padrão da
+        barra lateral: monta os cubos de CUBES (todos os que as páginas
+        listam em CUBOS) e o índice espacial, recorta cada cubo pelos
+        filtros padrão, desenha os gráficos da primeira visita a cada
+        página (ver DEFAULT_CHARTS) e o mapa do país. As métricas e
+        tabelas das páginas ficam para a primeira visita: são agregações
+        de poucos milissegundos sobre os recortes já em cache.
+
+        As páginas não são executadas aqui: fora de uma sessão o
+        Streamlit altera o estado global da barra lateral.
+
+            Input: Caminho do dataset, filtros
+            Output: Dicionário etapa -> segundos
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    cubes = load_cubes( path )
+    timings['cubos'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_spatial_index( path )
+    timings['indice espacial'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name in cubes:
+        results.select( cubes, name, filtros ).cube
+    timings['recortes'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for chart in DEFAULT_CHARTS:
+        chart( cubes, filtros )
+    timings['graficos'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    geo.map_html( cubes, filtros, geo.LAYERS[0] )
+    timings['mapa'] = time.perf_counter() - start
+
+    logger.info( 'Caches aquecidos em %.1fs', sum( timings.values() ) )
+
+    return timings
+
+
+def start( path=DATASET_PATH ):
+    """ Esta função inicia o aquecimento em segundo plano, uma única vez
+        por processo. Uma sessão que chegar antes do fim espera a leitura
+        do dataset (o cache do loader tem trava) em vez de repeti-la.
+
+            Input: Caminho do dataset
+            Output: Thread do aquecimento
+    """
+    global _thread
+
+    def run():
+        try:
+            warm_up( path )
+        except Exception:
+            # As páginas refazem o que faltar na primeira visita
+            logger.exception( 'Falha no aquecimento dos caches' )
+
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread( target=run, name='breeze-warmup', daemon=True )
+            _thread.start()
+
+    return _thread
+
+
+# Servidor com aquecimento desde a partida:
+#   python -m breeze.warmup [Home.py] [opções do streamlit run]
+if __name__ == '__main__':
+    from streamlit.web import cli
+
+    # Pelo módulo importado: Home.py chama o mesmo start e não inicia um
+    # segundo aquecimento
+    from breeze import warmup
+
+    args = sys.argv[1:] or [ 'Home.py' ]
+    if not args[0].endswith( '.py' ):
+        args.insert( 0, 'Home.py' )
+
+    warmup.start()
+
+    sys.argv = [ 'streamlit', 'run' ] + args
+    sys.exit( cli.main() )
@@ -1,18 +1,12 @@
-# Bibliotecas
-from haversine import haversine
-import plotly.express as px
-import plotly.graph_objects as go
-
-# -----------------------------------------------------------------
-
 # Bibliotecas necessárias
 import pandas as pd
 import streamlit as st
 from datetime import date
-import folium
+import streamlit.components.v1 as components
 from PIL import Image
 
-from streamlit_folium import folium_static
+from breeze import charts, geo, hll, instrument, results
+from breeze.loader import load_cubes
 
 st.set_page_config(
     page_title='Visão Empresa - Breeze Company',
@@ -20,62 +14,20 @@ st.set_page_config(
     layout='wide'
 )
 
+# Etapas desta execução: painel com ?debug=1 e logs em breeze.metrics
+instrument.start_run( 'empresa' )
+
 # -----------------------------------------------------------------
 
-# Funções
-def clean_code( df1 ):
-    """ Esta função tem a responsabilidade de limpar o dataframe
-        Tipos de Limpeza:
-            1. Remoção de dados NaN.
-            2. Mudança do tipo da coluna de dados.
-            3. Remoção dos espaços das variáveis de texto.
-            4. Formatação da coluna de datas
-            5. Limpeza da coluna de tempo ( remoção do texto da variável numérica)
-
-            Input: Dataframe
-            Output: Dataframe
-    """
-    # ---------------------------- Limpeza -----------------------------
-
-    df1 = df1[
-        (df1['Delivery_person_Age'] != 'NaN ') & 
-        (df1['Road_traffic_density'] != 'NaN ') &
-        (df1['City'] != 'NaN ') &
-        (df1['Festival'] != 'NaN ') &
-        (df1['multiple_deliveries'] != 'NaN ')
-    ]
-
-    # ----------------------- Conversões de tipo ------------------------
-
-    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype( int )
-    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype( float )
-    df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format='%d-%m-%Y' )
-    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype( int )
-
-    # ------------------------ Remoção de espaços ------------------------
-    cols_str = [
-        "ID",
-        "Road_traffic_density",
-        "Type_of_order",
-        "Type_of_vehicle",
-        "City",
-        "Festival"
-    ]
-
-    for col in cols_str:
-        df1[col] = df1[col].astype(str).str.strip()
-
-    # ----------------- Limpeza da coluna time_taken(min) -----------------
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].str.split(' ').str[1].astype(int)
-
-    return df1
+# Cubos usados pela página: pedidos, entregadores e mapa (ver
+# breeze.loader.load_cubes)
+CUBOS = [ 'orders', 'deliverers', 'uniques', 'delivery_grid', 'restaurant_grid' ]
 
 # --------------- Inicio da estrutura lógica do código --------------
-# Import dataset
-df = pd.read_csv( 'dataset/train.csv')
-df1 = df.copy()
-# Limpeza dos dados
-df1 = clean_code( df )
+# Import dataset (cada cubo é lido, limpo e agregado uma única vez por
+# processo e compartilhado com as outras páginas)
+with instrument.stage( 'carga' ):
+    cubes = load_cubes( 'dataset', CUBOS )
 
 # ------------------------------------------------------------------
 
@@ -91,63 +43,64 @@ st.sidebar.header( 'Breeze Company')
 st.sidebar.subheader( 'Clique, Peça, Repita ')
 st.sidebar.markdown( """---""" )
 
-st.sidebar.header( 'Filtros')
+# Os filtros são enviados juntos pelo botão do formulário: várias
+# mudanças seguidas custam uma única execução da página
+with st.sidebar.form( 'filtros' ):
+    st.header( 'Filtros')
 
-st.sidebar.subheader('Selecione uma data')
-date_slider = st.sidebar.slider(
-    '',
-    value=date( 2022, 4, 1 ),
-    min_value=date( 2022, 2, 11 ),
-    max_value=date( 2022, 4, 6 ),
-    format='DD/MM/YYYY' )
+    st.subheader('Selecione uma data')
+    date_slider = st.slider(
+        '',
+        value=date( 2022, 4, 1 ),
+        min_value=date( 2022, 2, 11 ),
+        max_value=date( 2022, 4, 6 ),
+        format='DD/MM/YYYY' )
 
-date_slider = pd.to_datetime(date_slider)
+    date_slider = pd.to_datetime(date_slider)
 
-st.sidebar.markdown( """---""" )
+    st.markdown( """---""" )
 
-st.sidebar.subheader('Selecione as cidades')
-city = st.sidebar.multiselect(
-    " ",
-    ['Metropolitian', 'Urban', 'Semi-Urban'],
-    default=['Metropolitian', 'Urban', 'Semi-Urban'])
+    st.subheader('Selecione as cidades')
+    city = st.multiselect(
+        " ",
+        ['Metropolitian', 'Urban', 'Semi-Urban'],
+        default=['Metropolitian', 'Urban', 'Semi-Urban'])
 
-st.sidebar.markdown("""---""")
+    st.markdown("""---""")
 
-st.sidebar.markdown( '### Selecione o clima')
-weatherconditions = st.sidebar.multiselect(
-    " ",
-    ['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms', 
-     'conditions Stormy', 'conditions Sunny', 'conditions Windy'],
-    default=['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms',
-              'conditions Stormy', 'conditions Sunny', 'conditions Windy'])
+    st.markdown( '### Selecione o clima')
+    weatherconditions = st.multiselect(
+        " ",
+        ['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms', 
+         'conditions Stormy', 'conditions Sunny', 'conditions Windy'],
+        default=['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms',
+                  'conditions Stormy', 'conditions Sunny', 'conditions Windy'])
 
-st.sidebar.markdown("""---""")
+    st.markdown("""---""")
 
-st.sidebar.markdown('### Selecione as condições de tráfego')
-traffic_conditions = st.sidebar.multiselect(
-    " ",
-    ['Low', 'Medium', 'High', 'Jam'],
-    default=['Low', 'Medium', 'High', 'Jam'])
+    st.markdown('### Selecione as condições de tráfego')
+    traffic_conditions = st.multiselect(
+        " ",
+        ['Low', 'Medium', 'High', 'Jam'],
+        default=['Low', 'Medium', 'High', 'Jam'])
 
-st.sidebar.markdown( """---""" )
+    st.markdown( """---""" )
 
-st.sidebar.markdown( '### Powered by Gabe')
+    st.markdown( '### Entregadores únicos')
+    aproximado = st.checkbox( 'Contagem aproximada (HyperLogLog)', value=False )
 
-# Filtro de Data
-linhas_selecionadas = df1['Order_Date'] < date_slider
-df1 = df1.loc[linhas_selecionadas, :]
+    st.form_submit_button( 'Aplicar filtros', use_container_width=True )
 
-# Filtro de Cidade
-linhas_selecionadas = df1['City'].isin(city)
-df1 = df1.loc[linhas_selecionadas, :]
+st.sidebar.markdown( """---""" )
 
-# Filtro de Clima
-linhas_selecionadas = df1['Weatherconditions'].isin(weatherconditions)
-df1 = df1.loc[linhas_selecionadas, :]
+st.sidebar.markdown( '### Powered by Gabe')
 
-# Filtro de Trânsito
-linhas_selecionadas = df1['Road_traffic_density'].isin(traffic_conditions)
-df1 = df1.loc[linhas_selecionadas, :]
+# Filtros de data, cidade, clima e trânsito aplicados às células dos
+# cubos. Recortes, agregações e gráficos ficam em cache por filtro.
+filtros = ( date_slider, city, weatherconditions, traffic_conditions )
+with instrument.stage( 'filtros' ):
+    for name in [ 'orders', 'deliverers', 'uniques' ]:
+        results.select( cubes, name, filtros )
 
 # ============================================
 #               Layout no Streamlit
@@ -155,96 +108,67 @@ df1 = df1.loc[linhas_selecionadas, :]
 
 st.header('Marketplace - Visão Empresa')
 
-tab1, tab2, tab3 = st.tabs( ['Visão Gerencial', 'Visão Tatica', 'Visão Geográfica'])
+# Apenas a visão escolhida é calculada e desenhada (com st.tabs o código
+# de todas as abas roda a cada execução)
+visao = st.radio( 'Visão', ['Visão Gerencial', 'Visão Tatica', 'Visão Geográfica'],
+                  horizontal=True, label_visibility='collapsed', key='visao' )
 
-with tab1:
-    with st.container():
+if visao == 'Visão Gerencial':
+    with st.container(), instrument.stage( 'pedidos_por_dia' ):
 
         st.subheader(' Pedidos por dia')
-        # ----- Seleção de Linhas -----
-        df_aux = df1.groupby('Order_Date')['ID'].count().reset_index()
-        
-        # ----- Desenhando o gráfico de barras -----
-        fig = px.bar(df_aux, x='Order_Date', y='ID')
+        # ----- Gráfico de barras (ver breeze.charts) -----
+        fig = charts.pedidos_por_dia( cubes, filtros )
         st.plotly_chart( fig, use_container_width=True )
 
-    with st.container():
+    with st.container(), instrument.stage( 'pedidos_por_trafego' ):
         st.markdown("""---""")
 
         st.subheader(' Pedidos por tipo de tráfego')
-        # ----- Selecionando as Linhas -----
-        df_aux = df1.groupby('Road_traffic_density')['ID'].count().reset_index()
-        df_aux['entregas_percent'] = df_aux['ID'] / df_aux['ID'].sum()
-
-        # ----- Desenhando o gráfico de pizza -----
-        fig = (px.pie(df_aux, values='entregas_percent', 
-                              names='Road_traffic_density'))
+        # ----- Gráfico de pizza (ver breeze.charts) -----
+        fig = charts.pedidos_por_trafego( cubes, filtros )
         st.plotly_chart(fig, use_container_width=False)
 
-    with st.container():
+    with st.container(), instrument.stage( 'pedidos_por_cidade_e_trafego' ):
         st.markdown("""---""")
 
         st.subheader('Volume de pedidos por cidade e tipo de tráfego')
-        # ----- Seleção de Linhas -----
-        df_aux = df1.groupby(['City', 'Road_traffic_density'])['ID'].count().reset_index()
-
-        # ----- Desenhando o gráfico de bolha -----
-        fig = (px.scatter(df_aux, x="City", 
-                                  y="Road_traffic_density", 
-                                  size="ID", color="City"))
-        
+        # ----- Gráfico de bolha (ver breeze.charts) -----
+        fig = charts.pedidos_por_cidade_e_trafego( cubes, filtros )
         st.plotly_chart(fig, use_container_width=False)
 
-with tab2:
-    with st.container():
+elif visao == 'Visão Tatica':
+    with st.container(), instrument.stage( 'pedidos_por_semana' ):
         
         st.subheader('Pedidos por semana')
-        # ------ Criar a coluna Semana -----
-        df1['week_of_year'] = df1['Order_Date'].dt.strftime( '%U' )
-        df_aux = df1.groupby('week_of_year')['ID'].count().reset_index()
-
-        # ----- Desenhando o gráfico de linha -----
-        fig = (px.line(df_aux, 
-                       x='week_of_year', 
-                       y='ID'))
+        # ----- Gráfico de linha (ver breeze.charts) -----
+        fig = charts.pedidos_por_semana( cubes, filtros )
         st.plotly_chart(fig, use_container_width=True)
 
-    with st.container():
+    with st.container(), instrument.stage( 'pedidos_por_entregador' ):
         st.markdown("""---""")
 
         st.subheader('Pedidos por entregador por semana')
-        # ------ Criar a coluna Semana -----
-        df1['week_of_year'] = df1['Order_Date'].dt.strftime( '%U' )
-
-        # ----- Quantidade de pedidos por semana -----
-        # ----- Quantidade de entregadores únicos por semana -----
-        df_aux01 = df1.groupby('week_of_year')['ID'].count().reset_index()
-        df_aux02 = df1.groupby('week_of_year')['Delivery_person_ID'].nunique().reset_index()
 
-        # ----- Junção dos 2 Dataframes -----
-        df_aux = pd.merge(df_aux01, df_aux02, how="inner")
-        df_aux['order_by_deliver'] = df_aux['ID'] / df_aux['Delivery_person_ID']
-
-        # ----- Desenhando o gráfico de linhas -----
-        fig = (px.line(df_aux, x='week_of_year', y='order_by_deliver'))
+        # ----- Pedidos por semana / entregadores únicos por semana -----
+        fig = charts.pedidos_por_entregador( cubes, filtros, aproximado )
         st.plotly_chart(fig, use_container_width=True)
 
-with tab3:
+        if aproximado:
+            st.caption( f'Entregadores únicos estimados por HyperLogLog: erro padrão de ±{hll.standard_error():.1%}' )
+
+elif visao == 'Visão Geográfica':
     st.subheader('Mapa do País')
 
-    # ----- Seleção de linhas -----
-    df_aux = (df1.groupby(['City', 'Road_traffic_density'])
-            [['Delivery_location_latitude', 'Delivery_location_longitude']]
-                 .median()
-                 .reset_index())
+    # Trocar a camada executa só este trecho da página
+    @st.fragment
+    def mapa_do_pais( filtros ):
+        camada = st.radio( 'Camada', geo.LAYERS, horizontal=True )
 
-    # ----- Desenhando o mapa -----
-    map = folium.Map()
+        # ----- Mapa desenhado a partir da grade, em cache por filtro -----
+        components.html( geo.map_html( cubes, filtros, camada ), width=1024, height=610 )
 
-    for index, location_info in df_aux.iterrows():
-        (folium.Marker( [location_info['Delivery_location_latitude'],
-                        location_info['Delivery_location_longitude']],
-                        popup=location_info[['City', 'Road_traffic_density']] )
-                        .add_to( map ))
-        
-    folium_static( map, width=1024 , height=600 )
\ No newline at end of file
+    with instrument.stage( 'mapa' ):
+        mapa_do_pais( filtros )
+
+instrument.panel()
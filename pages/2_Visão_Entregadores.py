@@ -1,18 +1,12 @@
-# Bibliotecas
-from haversine import haversine
-import plotly.express as px
-import plotly.graph_objects as go
-
-# -----------------------------------------------------------------
-
 # Bibliotecas necessárias
 import pandas as pd
 import streamlit as st
 from datetime import date
-import folium
 from PIL import Image
 
-from streamlit_folium import folium_static
+from breeze import instrument, results
+from breeze.loader import load_cubes
+from breeze.ranking import CITY_ORDER, TOP_K, top_k_per_group
 
 st.set_page_config(
     page_title='Visão Entregadores - Breeze Company',
@@ -20,62 +14,19 @@ st.set_page_config(
     layout='wide'
 )
 
+# Etapas desta execução: painel com ?debug=1 e logs em breeze.metrics
+instrument.start_run( 'entregadores' )
+
 # -----------------------------------------------------------------
 
-# Funções
-def clean_code( df1 ):
-    """ Esta função tem a responsabilidade de limpar o dataframe
-        Tipos de Limpeza:
-            1. Remoção de dados NaN.
-            2. Mudança do tipo da coluna de dados.
-            3. Remoção dos espaços das variáveis de texto.
-            4. Formatação da coluna de datas
-            5. Limpeza da coluna de tempo ( remoção do texto da variável numérica)
-
-            Input: Dataframe
-            Output: Dataframe
-    """
-    # ---------------------------- Limpeza -----------------------------
-
-    df1 = df1[
-        (df1['Delivery_person_Age'] != 'NaN ') & 
-        (df1['Road_traffic_density'] != 'NaN ') &
-        (df1['City'] != 'NaN ') &
-        (df1['Festival'] != 'NaN ') &
-        (df1['multiple_deliveries'] != 'NaN ')
-    ]
-
-    # ----------------------- Conversões de tipo ------------------------
-
-    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype( int )
-    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype( float )
-    df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format='%d-%m-%Y' )
-    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype( int )
-
-    # ------------------------ Remoção de espaços ------------------------
-    cols_str = [
-        "ID",
-        "Road_traffic_density",
-        "Type_of_order",
-        "Type_of_vehicle",
-        "City",
-        "Festival"
-    ]
-
-    for col in cols_str:
-        df1[col] = df1[col].astype(str).str.strip()
-
-    # ----------------- Limpeza da coluna time_taken(min) -----------------
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].str.split(' ').str[1].astype(int)
-
-    return df1
+# Cubos usados pela página (ver breeze.loader.load_cubes)
+CUBOS = [ 'deliverers', 'ratings' ]
 
 # --------------- Inicio da estrutura lógica do código --------------
-# Import dataset
-df = pd.read_csv( 'dataset/train.csv')
-df1 = df.copy()
-# Limpeza dos dados
-df1 = clean_code( df )
+# Import dataset (cada cubo é lido, limpo e agregado uma única vez por
+# processo e compartilhado com as outras páginas)
+with instrument.stage( 'carga' ):
+    cubes = load_cubes( 'dataset', CUBOS )
 
 # ------------------------------------------------------------------
 
@@ -91,63 +42,59 @@ st.sidebar.header( 'Breeze Company')
 st.sidebar.subheader( 'Clique, Peça, Repita ')
 st.sidebar.markdown( """---""" )
 
-st.sidebar.header( 'Filtros')
+# Os filtros são enviados juntos pelo botão do formulário: várias
+# mudanças seguidas custam uma única execução da página
+with st.sidebar.form( 'filtros' ):
+    st.header( 'Filtros')
 
-st.sidebar.subheader('Selecione uma data')
-date_slider = st.sidebar.slider(
-    '',
-    value=date( 2022, 4, 1 ),
-    min_value=date( 2022, 2, 11 ),
-    max_value=date( 2022, 4, 6 ),
-    format='DD/MM/YYYY' )
+    st.subheader('Selecione uma data')
+    date_slider = st.slider(
+        '',
+        value=date( 2022, 4, 1 ),
+        min_value=date( 2022, 2, 11 ),
+        max_value=date( 2022, 4, 6 ),
+        format='DD/MM/YYYY' )
 
-date_slider = pd.to_datetime(date_slider)
+    date_slider = pd.to_datetime(date_slider)
 
-st.sidebar.markdown( """---""" )
+    st.markdown( """---""" )
 
-st.sidebar.subheader('Selecione as cidades')
-city = st.sidebar.multiselect(
-    " ",
-    ['Metropolitian', 'Urban', 'Semi-Urban'],
-    default=['Metropolitian', 'Urban', 'Semi-Urban'])
+    st.subheader('Selecione as cidades')
+    city = st.multiselect(
+        " ",
+        ['Metropolitian', 'Urban', 'Semi-Urban'],
+        default=['Metropolitian', 'Urban', 'Semi-Urban'])
 
-st.sidebar.markdown("""---""")
+    st.markdown("""---""")
 
-st.sidebar.markdown( '### Selecione o clima')
-weatherconditions = st.sidebar.multiselect(
-    " ",
-    ['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms', 
-     'conditions Stormy', 'conditions Sunny', 'conditions Windy'],
-    default=['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms',
-              'conditions Stormy', 'conditions Sunny', 'conditions Windy'])
+    st.markdown( '### Selecione o clima')
+    weatherconditions = st.multiselect(
+        " ",
+        ['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms', 
+         'conditions Stormy', 'conditions Sunny', 'conditions Windy'],
+        default=['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms',
+                  'conditions Stormy', 'conditions Sunny', 'conditions Windy'])
 
-st.sidebar.markdown("""---""")
+    st.markdown("""---""")
 
-st.sidebar.markdown('### Selecione as condições de tráfego')
-traffic_conditions = st.sidebar.multiselect(
-    " ",
-    ['Low', 'Medium', 'High', 'Jam'],
-    default=['Low', 'Medium', 'High', 'Jam'])
+    st.markdown('### Selecione as condições de tráfego')
+    traffic_conditions = st.multiselect(
+        " ",
+        ['Low', 'Medium', 'High', 'Jam'],
+        default=['Low', 'Medium', 'High', 'Jam'])
+
+    st.form_submit_button( 'Aplicar filtros', use_container_width=True )
 
 st.sidebar.markdown( """---""" )
 
 st.sidebar.markdown( '### Powered by Gabe')
 
-# Filtro de Data
-linhas_selecionadas = df1['Order_Date'] < date_slider
-df1 = df1.loc[linhas_selecionadas, :]
-
-# Filtro de Cidade
-linhas_selecionadas = df1['City'].isin(city)
-df1 = df1.loc[linhas_selecionadas, :]
-
-# Filtro de Clima
-linhas_selecionadas = df1['Weatherconditions'].isin(weatherconditions)
-df1 = df1.loc[linhas_selecionadas, :]
-
-# Filtro de Trânsito
-linhas_selecionadas = df1['Road_traffic_density'].isin(traffic_conditions)
-df1 = df1.loc[linhas_selecionadas, :]
+# Filtros de data, cidade, clima e trânsito aplicados às células dos
+# cubos. Recortes e agregações ficam em cache por filtro.
+filtros = ( date_slider, city, weatherconditions, traffic_conditions )
+with instrument.stage( 'filtros' ):
+    ratings1 = results.select( cubes, 'ratings', filtros )
+    deliverers1 = results.select( cubes, 'deliverers', filtros )
 
 # ============================================
 #               Layout no Streamlit
@@ -158,28 +105,28 @@ st.header('Marketplace - Visão Entregadores')
 tab1, tab2, tab3 = st.tabs( ['Visão Gerencial', '_', '_'] )
 
 with tab1:
-    with st.container():
+    with st.container(), instrument.stage( 'metricas' ):
 
         st.subheader( 'Métricas Gerais' )
         col1, col2, col3, col4 = st.columns( 4, gap='large' )
 
         with col1:
-            maior_idade = df1['Delivery_person_Age'].max()
+            maior_idade = deliverers1.rollup([], 'Delivery_person_Age', 'max').iloc[0]
             col1.metric( 'Maior idade dos entregadores', maior_idade )
 
         with col2:
-            menor_idade = df1['Delivery_person_Age'].min()
+            menor_idade = deliverers1.rollup([], 'Delivery_person_Age', 'min').iloc[0]
             col2.metric( 'Menor idade dos entregadores', menor_idade )
 
         with col3:
-            melhor_condicao = df1['Vehicle_condition'].max()
+            melhor_condicao = deliverers1.rollup([], 'Vehicle_condition', 'max').iloc[0]
             col3.metric( 'Melhor condição de veículo', melhor_condicao )
 
         with  col4:
-            pior_condicao = df1['Vehicle_condition'].min()
+            pior_condicao = deliverers1.rollup([], 'Vehicle_condition', 'min').iloc[0]
             col4.metric( 'Pior condição de veículo', pior_condicao)
 
-    with st.container():
+    with st.container(), instrument.stage( 'avaliacoes' ):
 
         st.markdown("""---""")
         st.subheader( 'Avaliações' )
@@ -188,16 +135,15 @@ with tab1:
 
         with col1:
             st.markdown( '##### Avaliação média por entregador' )
-            df_avg_ratings_by_deliver = (df1.groupby('Delivery_person_ID')['Delivery_person_Ratings']
-                                            .mean()
-                                            .reset_index())
+            df_avg_ratings_by_deliver = (deliverers1.rollup('Delivery_person_ID', 'Delivery_person_Ratings', 'mean')
+                                                    .reset_index())
             st.dataframe( df_avg_ratings_by_deliver, use_container_width=True, height=495 )
 
         with col2:
             st.markdown( '##### Avaliação média por trânsito' )
             # ----- Seleção de Linhas -----
-            df_avg_std_rating_by_traffic = (df1.groupby('Road_traffic_density')['Delivery_person_Ratings']
-                                               .agg(['mean', 'std']))
+            df_avg_std_rating_by_traffic = ratings1.rollup('Road_traffic_density', 'Delivery_person_Ratings',
+                                                        ['mean', 'std'])
 
             # ----- Renomeando as colunas mean e std -----
             df_avg_std_rating_by_traffic.columns=['delivery_mean', 'delivery_std']
@@ -208,8 +154,8 @@ with tab1:
 
             st.markdown( '##### Avaliação média por clima' )
             # ----- Seleção de Linhas -----
-            df_avg_std_rating_by_weather = (df1.groupby('Weatherconditions')['Delivery_person_Ratings']
-                                .agg(['mean', 'std']))
+            df_avg_std_rating_by_weather = ratings1.rollup('Weatherconditions', 'Delivery_person_Ratings',
+                                                        ['mean', 'std'])
             # ----- Renomeando as colunas mean e std -----
             df_avg_std_rating_by_weather.columns = ['weather_mean', 'weather_std']
 
@@ -217,42 +163,40 @@ with tab1:
             df_avg_std_rating_by_weather.reset_index()
             st.dataframe( df_avg_std_rating_by_weather, use_container_width=True )
 
-    with st.container():
+    with st.container(), instrument.stage( 'velocidade_de_entrega' ):
 
         st.markdown("""---""")
         st.subheader( 'Velocidade de Entrega' )
 
-        col1, col2 = st.columns(2)
+        # Mudar a quantidade executa só este trecho da página
+        @st.fragment
+        def velocidade_de_entrega( deliverers1 ):
+            quantidade = st.slider( 'Entregadores por cidade', min_value=1, max_value=50, value=TOP_K )
 
-        with col1:
-            st.markdown( '#### Entregadores mais rápidos por cidade' )
-            # ----- Seleção de Linhas -----
-            df2 = (df1.groupby(['City', 'Delivery_person_ID'])['Time_taken(min)']
-                      .min()
-                      .reset_index()
-                      .sort_values(['City', 'Time_taken(min)'],ascending= True))
+            col1, col2 = st.columns(2)
 
-            # ----- Filtrando os 10 por cidade -----
-            df_aux01 = df2.loc[df2['City'] == 'Metropolitian'].head(10)
-            df_aux02 = df2.loc[df2['City'] == 'Urban'].head(10)
-            df_aux03 = df2.loc[df2['City'] == 'Semi-Urban'].head(10)
+            with col1:
+                st.markdown( '#### Entregadores mais rápidos por cidade' )
+                # ----- Seleção de Linhas -----
+                df2 = (deliverers1.rollup(['City', 'Delivery_person_ID'], 'Time_taken(min)', 'min')
+                          .reset_index())
 
-            df3 = pd.concat( [df_aux01, df_aux02, df_aux03] ).reset_index(drop=True)
-            st.dataframe( df3 )
+                # ----- Filtrando os mais rápidos por cidade -----
+                df3 = top_k_per_group( df2, 'City', 'Time_taken(min)', k=quantidade, order=CITY_ORDER )
+                st.dataframe( df3 )
 
-        with col2:
-            
-            st.markdown( '#### Entregadores mais lentos por cidade' )
-            # ----- Seleção de Linhas -----
-            df2 = (df1.groupby(['City', 'Delivery_person_ID'])['Time_taken(min)']
-                      .max()
-                      .reset_index()
-                      .sort_values(['City', 'Time_taken(min)'], ascending= False))
-
-            # ----- Selecionando os 10 por cidade -----
-            df_aux01 = df2.loc[df2['City'] == 'Metropolitian'].head(10)
-            df_aux02 = df2.loc[df2['City'] == 'Urban'].head(10)
-            df_aux03 = df2.loc[df2['City'] == 'Semi-Urban'].head(10)
-
-            df3 = pd.concat([df_aux01, df_aux02, df_aux03]).reset_index(drop=True)
-            st.dataframe( df3 )
\ No newline at end of file
+            with col2:
+
+                st.markdown( '#### Entregadores mais lentos por cidade' )
+                # ----- Seleção de Linhas -----
+                df2 = (deliverers1.rollup(['City', 'Delivery_person_ID'], 'Time_taken(min)', 'max')
+                          .reset_index())
+
+                # ----- Selecionando os mais lentos por cidade -----
+                df3 = top_k_per_group( df2, 'City', 'Time_taken(min)', k=quantidade, largest=True,
+                                       order=CITY_ORDER )
+                st.dataframe( df3 )
+
+        velocidade_de_entrega( deliverers1 )
+
+instrument.panel()
@@ -1,19 +1,12 @@
-# Bibliotecas
-from haversine import haversine
-import plotly.express as px
-import plotly.graph_objects as go
-
-# -----------------------------------------------------------------
-
 # Bibliotecas necessárias
 import pandas as pd
 import numpy as np
 import streamlit as st
 from datetime import date
-import folium
 from PIL import Image
 
-from streamlit_folium import folium_static
+from breeze import charts, hll, instrument, results
+from breeze.loader import load_cubes, load_spatial_index
 
 st.set_page_config(
     page_title='Visão Restaurante - Breeze Company',
@@ -21,62 +14,21 @@ st.set_page_config(
     layout='wide'
 )
 
+# Etapas desta execução: painel com ?debug=1 e logs em breeze.metrics
+instrument.start_run( 'restaurante' )
+
 # -----------------------------------------------------------------
 
-# Funções
-def clean_code( df1 ):
-    """ Esta função tem a responsabilidade de limpar o dataframe
-        Tipos de Limpeza:
-            1. Remoção de dados NaN.
-            2. Mudança do tipo da coluna de dados.
-            3. Remoção dos espaços das variáveis de texto.
-            4. Formatação da coluna de datas
-            5. Limpeza da coluna de tempo ( remoção do texto da variável numérica)
-
-            Input: Dataframe
-            Output: Dataframe
-    """
-    # ---------------------------- Limpeza -----------------------------
-
-    df1 = df1[
-        (df1['Delivery_person_Age'] != 'NaN ') & 
-        (df1['Road_traffic_density'] != 'NaN ') &
-        (df1['City'] != 'NaN ') &
-        (df1['Festival'] != 'NaN ') &
-        (df1['multiple_deliveries'] != 'NaN ')
-    ]
-
-    # ----------------------- Conversões de tipo ------------------------
-
-    df1['Delivery_person_Age'] = df1['Delivery_person_Age'].astype( int )
-    df1['Delivery_person_Ratings'] = df1['Delivery_person_Ratings'].astype( float )
-    df1['Order_Date'] = pd.to_datetime(df1['Order_Date'], format='%d-%m-%Y' )
-    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype( int )
-
-    # ------------------------ Remoção de espaços ------------------------
-    cols_str = [
-        "ID",
-        "Road_traffic_density",
-        "Type_of_order",
-        "Type_of_vehicle",
-        "City",
-        "Festival"
-    ]
-
-    for col in cols_str:
-        df1[col] = df1[col].astype(str).str.strip()
-
-    # ----------------- Limpeza da coluna time_taken(min) -----------------
-    df1['Time_taken(min)'] = df1['Time_taken(min)'].str.split(' ').str[1].astype(int)
-
-    return df1
+# Cubos usados pela página: as coordenadas ficam no índice espacial
+# (ver breeze.loader.load_cubes)
+CUBOS = [ 'orders', 'deliverers', 'times', 'uniques', 'distances' ]
 
 # --------------- Inicio da estrutura lógica do código --------------
-# Import dataset
-df = pd.read_csv( 'dataset/train.csv')
-df1 = df.copy()
-# Limpeza dos dados
-df1 = clean_code( df )
+# Import dataset (cada cubo é lido, limpo e agregado uma única vez por
+# processo e compartilhado com as outras páginas)
+with instrument.stage( 'carga' ):
+    cubes = load_cubes( 'dataset', CUBOS )
+    spatial = load_spatial_index( 'dataset' )
 
 # ------------------------------------------------------------------
 
@@ -92,63 +44,67 @@ st.sidebar.header( 'Breeze Company')
 st.sidebar.subheader( 'Clique, Peça, Repita ')
 st.sidebar.markdown( """---""" )
 
-st.sidebar.header( 'Filtros')
+# Os filtros são enviados juntos pelo botão do formulário: várias
+# mudanças seguidas custam uma única execução da página
+with st.sidebar.form( 'filtros' ):
+    st.header( 'Filtros')
 
-st.sidebar.subheader('Selecione uma data')
-date_slider = st.sidebar.slider(
-    '',
-    value=date( 2022, 4, 1 ),
-    min_value=date( 2022, 2, 11 ),
-    max_value=date( 2022, 4, 6 ),
-    format='DD/MM/YYYY' )
+    st.subheader('Selecione uma data')
+    date_slider = st.slider(
+        '',
+        value=date( 2022, 4, 1 ),
+        min_value=date( 2022, 2, 11 ),
+        max_value=date( 2022, 4, 6 ),
+        format='DD/MM/YYYY' )
 
-date_slider = pd.to_datetime(date_slider)
+    date_slider = pd.to_datetime(date_slider)
 
-st.sidebar.markdown( """---""" )
+    st.markdown( """---""" )
 
-st.sidebar.subheader('Selecione as cidades')
-city = st.sidebar.multiselect(
-    " ",
-    ['Metropolitian', 'Urban', 'Semi-Urban'],
-    default=['Metropolitian', 'Urban', 'Semi-Urban'])
+    st.subheader('Selecione as cidades')
+    city = st.multiselect(
+        " ",
+        ['Metropolitian', 'Urban', 'Semi-Urban'],
+        default=['Metropolitian', 'Urban', 'Semi-Urban'])
 
-st.sidebar.markdown("""---""")
+    st.markdown("""---""")
 
-st.sidebar.markdown( '### Selecione o clima')
-weatherconditions = st.sidebar.multiselect(
-    " ",
-    ['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms', 
-     'conditions Stormy', 'conditions Sunny', 'conditions Windy'],
-    default=['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms',
-              'conditions Stormy', 'conditions Sunny', 'conditions Windy'])
+    st.markdown( '### Selecione o clima')
+    weatherconditions = st.multiselect(
+        " ",
+        ['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms', 
+         'conditions Stormy', 'conditions Sunny', 'conditions Windy'],
+        default=['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms',
+                  'conditions Stormy', 'conditions Sunny', 'conditions Windy'])
 
-st.sidebar.markdown("""---""")
+    st.markdown("""---""")
 
-st.sidebar.markdown('### Selecione as condições de tráfego')
-traffic_conditions = st.sidebar.multiselect(
-    " ",
-    ['Low', 'Medium', 'High', 'Jam'],
-    default=['Low', 'Medium', 'High', 'Jam'])
+    st.markdown('### Selecione as condições de tráfego')
+    traffic_conditions = st.multiselect(
+        " ",
+        ['Low', 'Medium', 'High', 'Jam'],
+        default=['Low', 'Medium', 'High', 'Jam'])
 
-st.sidebar.markdown( """---""" )
+    st.markdown( """---""" )
 
-st.sidebar.markdown( '### Powered by Gabe')
+    st.markdown( '### Entregadores únicos')
+    aproximado = st.checkbox( 'Contagem aproximada (HyperLogLog)', value=False )
 
-# Filtro de Data
-linhas_selecionadas = df1['Order_Date'] < date_slider
-df1 = df1.loc[linhas_selecionadas, :]
+    st.form_submit_button( 'Aplicar filtros', use_container_width=True )
 
-# Filtro de Cidade
-linhas_selecionadas = df1['City'].isin(city)
-df1 = df1.loc[linhas_selecionadas, :]
+st.sidebar.markdown( """---""" )
 
-# Filtro de Clima
-linhas_selecionadas = df1['Weatherconditions'].isin(weatherconditions)
-df1 = df1.loc[linhas_selecionadas, :]
+st.sidebar.markdown( '### Powered by Gabe')
 
-# Filtro de Trânsito
-linhas_selecionadas = df1['Road_traffic_density'].isin(traffic_conditions)
-df1 = df1.loc[linhas_selecionadas, :]
+# Filtros de data, cidade, clima e trânsito aplicados às células dos
+# cubos. Recortes, agregações e gráficos ficam em cache por filtro.
+filtros = ( date_slider, city, weatherconditions, traffic_conditions )
+with instrument.stage( 'filtros' ):
+    cube1 = results.select( cubes, 'orders', filtros )
+    deliverers1 = results.select( cubes, 'deliverers', filtros )
+    times1 = results.select( cubes, 'times', filtros )
+    uniques1 = results.select( cubes, 'uniques', filtros )
+    results.select( cubes, 'distances', filtros )
 
 # ============================================
 #               Layout no Streamlit
@@ -160,15 +116,19 @@ tab1, tab2, tab3 = st.tabs( ['Visão Gerencial', '_', '_'] )
 
 with tab1:
     st.subheader( 'Métricas Gerais' )
-    with st.container():
+    with st.container(), instrument.stage( 'metricas' ):
 
         col1, col2, col3 = st.columns(3)
         with col1:
-            deliver_unique = df1['Delivery_person_ID'].nunique()
-            col1.metric( 'Entregadores Únicos', deliver_unique)
+            if aproximado:
+                deliver_unique = int( round( uniques1.rollup([], 'Delivery_person_ID', 'approx_nunique').iloc[0] ) )
+                col1.metric( 'Entregadores Únicos', deliver_unique)
+                col1.caption( f'Estimativa HyperLogLog: erro padrão de ±{hll.standard_error():.1%}' )
+            else:
+                deliver_unique = deliverers1.rollup([], 'Delivery_person_ID', 'nunique').iloc[0]
+                col1.metric( 'Entregadores Únicos', deliver_unique)
         with col2:
-            df_aux = (df1.groupby('Festival')['Time_taken(min)']
-                         .agg(['mean', 'std']))
+            df_aux = cube1.rollup('Festival', 'Time_taken(min)', ['mean', 'std'])
             
             df_aux.columns= ['avg_time', 'std_time']
 
@@ -176,10 +136,9 @@ with tab1:
             
             linhas_selecionadas = df_aux['Festival'] == 'Yes'
             df_aux = np.round(df_aux.loc[linhas_selecionadas, 'avg_time'], 2)
-            col2.metric( 'Tempo Médio de Entrega c/ Festival', df_aux)
+            col2.metric( 'Tempo Médio de Entrega c/ Festival', df_aux.iloc[0] if len( df_aux ) else None )
         with col3:
-            df_aux = (df1.groupby('Festival')['Time_taken(min)']
-                         .agg(['mean', 'std']))
+            df_aux = cube1.rollup('Festival', 'Time_taken(min)', ['mean', 'std'])
             
             df_aux.columns= ['avg_time', 'std_time']
 
@@ -187,25 +146,17 @@ with tab1:
             
             linhas_selecionadas = df_aux['Festival'] == 'Yes'
             df_aux = np.round(df_aux.loc[linhas_selecionadas, 'std_time'], 2)
-            col3.metric( 'Desvio Padrão de Entrega c/ Festival', df_aux)
+            col3.metric( 'Desvio Padrão de Entrega c/ Festival', df_aux.iloc[0] if len( df_aux ) else None )
 
         col4, col5, col6 = st.columns(3)
                                     
         with col4:
-            cols = ['Restaurant_latitude', 'Restaurant_longitude',
-         'Delivery_location_latitude', 'Delivery_location_longitude']
-
-            df1['distance'] = df1.loc[:, cols].apply( lambda x:
-                                               haversine( (x['Restaurant_latitude'], x['Restaurant_longitude']),
-                                               (x['Delivery_location_latitude'], x['Delivery_location_longitude'])), 
-                                               axis=1)
-            
-            avg_distance = np.round( df1['distance'].mean(), 2 )
+            # ----- Distância calculada na limpeza (coluna distance) -----
+            avg_distance = np.round( float( cube1.rollup([], 'distance', 'mean').iloc[0] ), 2 )
             col1.metric('Distância Média das Entregas (Km)', avg_distance)
         
         with col5:
-            df_aux = (df1.groupby('Festival')['Time_taken(min)']
-                         .agg(['mean', 'std']))
+            df_aux = cube1.rollup('Festival', 'Time_taken(min)', ['mean', 'std'])
             
             df_aux.columns= ['avg_time', 'std_time']
 
@@ -213,11 +164,10 @@ with tab1:
             
             linhas_selecionadas = df_aux['Festival'] == 'No'
             df_aux = np.round(df_aux.loc[linhas_selecionadas, 'avg_time'], 2)
-            col2.metric( 'Tempo Médio de Entrega s/ Festival', df_aux)
+            col2.metric( 'Tempo Médio de Entrega s/ Festival', df_aux.iloc[0] if len( df_aux ) else None )
 
         with col6:
-            df_aux = (df1.groupby('Festival')['Time_taken(min)']
-                         .agg(['mean', 'std']))
+            df_aux = cube1.rollup('Festival', 'Time_taken(min)', ['mean', 'std'])
             
             df_aux.columns= ['avg_time', 'std_time']
 
@@ -225,31 +175,21 @@ with tab1:
             
             linhas_selecionadas = df_aux['Festival'] == 'No'
             df_aux = np.round(df_aux.loc[linhas_selecionadas, 'std_time'], 2)
-            col3.metric( 'Desvio Padrão de Entrega s/ Festival', df_aux)
+            col3.metric( 'Desvio Padrão de Entrega s/ Festival', df_aux.iloc[0] if len( df_aux ) else None )
 
-    with st.container():
+    with st.container(), instrument.stage( 'tempo_por_cidade' ):
         st.markdown("""---""")
         st.subheader( 'Tempo médio de entrega por cidade e tipo de pedido' )
 
         col1, col2 = st.columns(2)
 
         with col1:
-            cols = ['City', 'Time_taken(min)']
-            df_aux = df1.loc[:, cols].groupby( 'City' ).agg( {'Time_taken(min)': ['mean', 'std']} )
-            df_aux.columns = ['avg_time', 'std_time']
-            df_aux = df_aux.reset_index()
-
-            fig = go.Figure()
-            fig.add_trace( go.Bar( name='Control',
-                        x=df_aux['City'],
-                        y=df_aux['avg_time'],
-                        error_y=dict( type='data', array=df_aux['std_time'])))
-            fig.update_layout(barmode='group')
+            # ----- Barras com o desvio padrão (ver breeze.charts) -----
+            fig = charts.tempo_por_cidade( cubes, filtros )
             st.plotly_chart(fig)
 
         with col2:
-            df_aux = (df1.groupby(['City', 'Type_of_order'])['Time_taken(min)']
-                         .agg(['mean', 'std']))
+            df_aux = cube1.rollup(['City', 'Type_of_order'], 'Time_taken(min)', ['mean', 'std'])
             df_aux.columns = ['avg_time', 'std_time']
             df_aux.reset_index()
             st.dataframe(df_aux)
@@ -259,31 +199,75 @@ with tab1:
         st.subheader( 'Distribuição do tempo por cidade e tipo de tráfego' )
         st.markdown( "#### Distancia média das entregas por cidade")
 
-    with st.container():
-                    
-            cols = ['Restaurant_latitude', 'Restaurant_longitude',
-            'Delivery_location_latitude', 'Delivery_location_longitude']
+    with st.container(), instrument.stage( 'distancia_por_cidade' ):
+            # ----- Distância calculada na limpeza (coluna distance) -----
+            fig = charts.distancia_por_cidade( cubes, filtros )
+            st.plotly_chart(fig, use_container_width=True)
 
-            df1['distance'] = df1.loc[:, cols].apply( lambda x:
-                                    haversine( (x['Restaurant_latitude'], x['Restaurant_longitude']),
-                                               (x['Delivery_location_latitude'], x['Delivery_location_longitude'])), 
-                                               axis=1 )
+    with st.container(), instrument.stage( 'percentis' ):
+        st.markdown("""---""")
+        st.subheader( 'Percentis do tempo de entrega' )
 
-            avg_distance = df1.loc[:, ['City', 'distance']].groupby('City').mean().reset_index()
+        col1, col2 = st.columns(2)
 
-            fig = go.Figure( data=[ go.Pie( labels=avg_distance['City'], values=avg_distance['distance'], pull=[0, 0.1, 0])])
+        with col1:
+            st.markdown( '##### Por cidade e densidade de tráfego' )
+            fig = charts.percentis( cubes, filtros )
             st.plotly_chart(fig, use_container_width=True)
+
+        with col2:
+            st.markdown( '##### Por festival e tipo de pedido' )
+            df_aux = times1.rollup(['Festival', 'Type_of_order'], 'Time_taken(min)', ['p50', 'p90', 'p99'])
+            st.dataframe(df_aux, use_container_width=True)
+
+    with st.container(), instrument.stage( 'tempo_por_distancia' ):
+        st.markdown("""---""")
+        st.subheader( 'Tempo de entrega por faixa de distância' )
+
+        # ----- Faixas calculadas na agregação (cubo distances) -----
+        fig = charts.tempo_por_distancia( cubes, filtros )
+        st.plotly_chart(fig, use_container_width=True)
+
+    with st.container(), instrument.stage( 'pedidos_no_raio' ):
+        st.markdown("""---""")
+        st.subheader( 'Pedidos em um raio' )
+
+        # Mudar o ponto, o raio ou as coordenadas executa só este trecho da
+        # página
+        @st.fragment
+        def pedidos_no_raio( filtros ):
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                latitude = st.number_input( 'Latitude', value=spatial.center[0], format='%.4f' )
+            with col2:
+                longitude = st.number_input( 'Longitude', value=spatial.center[1], format='%.4f' )
+            with col3:
+                raio = st.slider( 'Raio (Km)', min_value=1, max_value=50, value=10 )
+            with col4:
+                pontos = st.radio( 'Coordenadas', ['Local de entrega', 'Restaurante'] )
+
+            # ----- Consulta no índice espacial (só as células do raio) -----
+            df_aux = spatial.within( latitude, longitude, raio,
+                                     'delivery' if pontos == 'Local de entrega' else 'restaurant', filtros )
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                col1.metric( 'Pedidos no raio', len( df_aux ) )
+            with col2:
+                tempo_medio = np.round( float( df_aux['Time_taken(min)'].mean() ), 2 ) if len( df_aux ) else '-'
+                col2.metric( 'Tempo médio de entrega', tempo_medio )
+            with col3:
+                distancia_media = np.round( float( df_aux['distance'].mean() ), 2 ) if len( df_aux ) else '-'
+                col3.metric( 'Distância média das entregas (Km)', distancia_media )
+
+            st.markdown( '##### Restaurantes mais próximos' )
+            st.dataframe( spatial.nearest_restaurants( latitude, longitude, 5 ), use_container_width=True )
+
+        pedidos_no_raio( filtros )
     
-    with st.container():
+    with st.container(), instrument.stage( 'desvio_por_cidade_e_trafego' ):
             st.markdown("#### Desvio padrão por tipo de cidade e densidade de tráfego")       
-            cols = ['City', 'Time_taken(min)', 'Road_traffic_density']
-            df_aux = (df1.loc[:, cols]
-                         .groupby( ['City', 'Road_traffic_density'])
-                         .agg({'Time_taken(min)': ['mean', 'std']}))
-            df_aux.columns = ['avg_time', 'std_time']
-            df_aux = df_aux.reset_index()
-
-            fig = px.sunburst(df_aux, path=['City', 'Road_traffic_density'], values='avg_time',
-                  color='std_time', color_continuous_scale='RdBu',
-                  color_continuous_midpoint=np.average(df_aux['std_time']))
+            fig = charts.desvio_por_cidade_e_trafego( cubes, filtros )
             st.plotly_chart(fig)
+
+instrument.panel()
@@ -0,0 +1,78 @@
+# Bibliotecas necessárias
+import numpy as np
+import pandas as pd
+import pytest
+
+from breeze import backend
+from breeze.bench import NARROW_FILTERS, PAGE_AGGREGATIONS
+from breeze.cleaning import clean_code
+from breeze.cube import CUBES, Cube, build_cells
+from breeze.warmup import DEFAULT_FILTERS
+
+pytest.importorskip( 'duckdb' )
+
+# -----------------------------------------------------------------
+
+TRAIN_PATH = 'dataset/train.csv'
+
+# Filtros comparados: o padrão, um recorte estreito e uma seleção vazia
+FILTERS = {
+    'padrao': DEFAULT_FILTERS,
+    'restrito': NARROW_FILTERS,
+    'vazio': ( DEFAULT_FILTERS[0], [], DEFAULT_FILTERS[2], DEFAULT_FILTERS[3] ),
+}
+
+# -----------------------------------------------------------------
+
+# Funções
+@pytest.fixture( scope='module' )
+def cubes():
+    """ Cubos de CUBES montados sobre o dataset limpo. """
+    df1 = clean_code( pd.read_csv( TRAIN_PATH ) )
+    return { name: Cube( build_cells( df1, spec ), spec ) for name, spec in CUBES.items() }
+
+
+def rollup( cube, by, column, stats, motor, monkeypatch ):
+    """ Esta função agrega o cubo com o motor pedido. """
+    monkeypatch.setattr( backend, 'BACKEND', motor )
+    return cube.rollup( by, column, stats )
+
+
+@pytest.mark.parametrize( 'filtros', list( FILTERS ) )
+@pytest.mark.parametrize( 'stage', list( PAGE_AGGREGATIONS ) )
+def test_page_rollups_match( cubes, stage, filtros, monkeypatch ):
+    name, by, column, stats = PAGE_AGGREGATIONS[stage]
+    cube = cubes[name].select( *FILTERS[filtros] )
+
+    expected = rollup( cube, by, column, stats, 'pandas', monkeypatch )
+    result = rollup( cube, by, column, stats, 'duckdb', monkeypatch )
+
+    if isinstance( expected, pd.Series ):
+        pd.testing.assert_series_equal( result, expected )
+    else:
+        pd.testing.assert_frame_equal( result, expected )
+
+
+@pytest.mark.parametrize( 'keys', [ [ 'City' ], [ 'Vehicle' ], [ 'City', 'week_of_year' ] ] )
+def test_null_groups_match( keys ):
+    rng = np.random.default_rng( 0 )
+    size = 500
+
+    cities = rng.choice( [ 'Urban', 'Metropolitian', None ], size )
+    dates = pd.Series( pd.Timestamp( 2022, 2, 11 ) + pd.to_timedelta( rng.integers( 0, 50, size ), unit='D' ) )
+    dates[::9] = pd.NaT
+    cells = pd.DataFrame( {
+        'City': pd.Categorical( cities, categories=[ 'Metropolitian', 'Semi-Urban', 'Urban' ] ),
+        'Vehicle': pd.Series( rng.choice( [ 'bicycle', 'scooter', None ], size ), dtype=object ),
+        'Order_Date': dates,
+        'count': rng.integers( 1, 5, size ),
+        'total': np.where( rng.random( size ) < 0.1, np.nan, rng.normal( size=size ) ),
+        'low': rng.integers( 0, 60, size ),
+        'ID': rng.integers( 0, 40, size ),
+    } )
+    operations = { 'count': 'sum', 'total': 'sum', 'low': 'min', 'ID': 'nunique' }
+
+    expected = backend.aggregate( cells, keys, operations, backend='pandas' )
+    result = backend.aggregate( cells, keys, operations, backend='duckdb' )
+
+    pd.testing.assert_frame_equal( result, expected )
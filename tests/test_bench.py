@@ -0,0 +1,32 @@
+# Bibliotecas necessárias
+import os
+
+from breeze import bench, synthetic
+
+# -----------------------------------------------------------------
+
+# Funções
+def test_run_on_store_only_scale( tmp_path, monkeypatch ):
+    """ Acima de IN_MEMORY_ROWS as consultas rodam nos cubos gravados,
+        que são lidos sob demanda: o armazenamento precisa existir até a
+        última agregação e ser apagado no fim. """
+    csv_path = str( tmp_path / 'train.csv' )
+    synthetic.generate( csv_path, rows=3000 )
+
+    store_dirs = []
+
+    def mkdtemp( prefix ):
+        store_dirs.append( str( tmp_path / f'{prefix}store' ) )
+        os.makedirs( store_dirs[-1] )
+        return store_dirs[-1]
+
+    monkeypatch.setattr( bench, 'IN_MEMORY_ROWS', 0 )
+    monkeypatch.setattr( bench, 'dataset_path', lambda scale: csv_path )
+    monkeypatch.setattr( bench.tempfile, 'mkdtemp', mkdtemp )
+
+    result = bench.run( 1, repeat=1 )
+
+    assert 'carga.read_csv' not in result['stages']
+    assert set( bench.PAGE_AGGREGATIONS ) <= set( result['stages'] )
+    assert { 'carga.ingest', 'carga.read_cubes', 'cubos.recorte', 'cubos.recorte_restrito' } <= set( result['stages'] )
+    assert not os.path.exists( store_dirs[0] )
@@ -0,0 +1,14 @@
+# Bibliotecas necessárias
+from breeze.cube import CUBES
+from breeze.loader import page_cubes
+
+# -----------------------------------------------------------------
+
+# Funções
+def test_page_cubes_cover_every_cube():
+    """ O aquecimento monta todos os cubos de CUBES: cada um precisa ser
+        usado por alguma página, e cada página só pede cubos que existem. """
+    pages = page_cubes()
+
+    assert set( pages ) == { 'empresa', 'entregadores', 'restaurante' }
+    assert set().union( *pages.values() ) == set( CUBES )
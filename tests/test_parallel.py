@@ -0,0 +1,51 @@
+# Bibliotecas necessárias
+import pandas as pd
+import pytest
+
+from breeze import parallel, synthetic
+from breeze.cleaning import clean_code
+from breeze.cube import CUBES, build_cells
+
+# -----------------------------------------------------------------
+
+# Funções
+@pytest.fixture( scope='module' )
+def csv_path( tmp_path_factory ):
+    """ CSV sintético pequeno em que parte dos pedidos tem um tipo com
+        quebras de linha, vírgulas e aspas dentro do campo: cada linha
+        desses pedidos ocupa várias linhas do arquivo. """
+    path = tmp_path_factory.mktemp( 'parallel' ) / 'train.csv'
+    synthetic.generate( str( path ), rows=300 )
+
+    df_raw = pd.read_csv( path, dtype=str, keep_default_na=False )
+    multiline = df_raw.index % 3 == 0
+    df_raw.loc[multiline, 'Type_of_order'] = df_raw.loc[multiline, 'Type_of_order'].str.strip() + '\n(com "molho",\nextra) '
+    df_raw.to_csv( path, index=False )
+
+    return str( path )
+
+
+@pytest.mark.parametrize( 'rows', [ 1, 2, 7 ] )
+def test_partitions_keep_quoted_rows_whole( csv_path, rows ):
+    partitions = parallel.csv_partitions( csv_path, rows )
+    assert len( partitions ) > 1
+
+    lengths = [ len( parallel.read_csv_partition( csv_path, start, end ) ) for start, end in partitions ]
+    assert sum( lengths ) == len( pd.read_csv( csv_path ) )
+
+
+@pytest.mark.parametrize( 'rows', [ 1, 7 ] )
+def test_clean_csv_matches_serial( csv_path, rows ):
+    expected = clean_code( pd.read_csv( csv_path ) ).reset_index( drop=True )
+
+    for workers in ( 1, 2 ):
+        pd.testing.assert_frame_equal( parallel.clean_csv( csv_path, workers, rows ), expected )
+
+
+@pytest.mark.parametrize( 'name', list( CUBES ) )
+def test_build_cells_matches_serial( csv_path, name ):
+    df1 = parallel.clean_csv( csv_path, workers=1 )
+    expected = build_cells( df1, CUBES[name] )
+
+    result = parallel.build_cells_partitioned( df1, CUBES[name], workers=2, rows=40 )
+    pd.testing.assert_frame_equal( result, expected )
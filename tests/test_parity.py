@@ -0,0 +1,296 @@
+# Bibliotecas necessárias
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from breeze import hll, ingest
+from breeze.cleaning import clean_code
+from breeze.cube import CUBES, Cube, build_cells, weighted_quantile
+from breeze.ranking import CITY_ORDER, TOP_K, top_k_per_group
+from breeze.warmup import DEFAULT_FILTERS
+
+# -----------------------------------------------------------------
+
+# Paridade dos cubos, dos sketches e do armazenamento com o código
+# pandas original das páginas (groupby sobre o dataset limpo)
+TRAIN_PATH = os.path.join( 'dataset', 'train.csv' )
+
+# Mesmos filtros padrão, sem nenhuma cidade: seleção vazia
+EMPTY_FILTERS = ( DEFAULT_FILTERS[0], [], DEFAULT_FILTERS[2], DEFAULT_FILTERS[3] )
+
+# Agregações das páginas: ( cubo, agrupamento, coluna, estatísticas )
+ROLLUPS = [
+    ( 'orders', [ 'City', 'Road_traffic_density' ], 'ID', 'count' ),
+    ( 'orders', [ 'week_of_year' ], 'ID', 'count' ),
+    ( 'orders', [ 'City' ], 'Time_taken(min)', [ 'mean', 'std' ] ),
+    ( 'orders', [ 'Festival' ], 'Delivery_person_Ratings', [ 'mean', 'std' ] ),
+    ( 'orders', [], 'distance', 'mean' ),
+    ( 'orders', [], 'ID', 'count' ),
+    ( 'deliverers', [ 'City', 'Delivery_person_ID' ], 'Time_taken(min)', [ 'min', 'max' ] ),
+    ( 'deliverers', [], 'Delivery_person_Age', [ 'min', 'max' ] ),
+    ( 'deliverers', [ 'City' ], 'Delivery_person_ID', 'nunique' ),
+    ( 'times', [ 'City', 'Type_of_order' ], 'Time_taken(min)', 'median' ),
+    ( 'times', [ 'Festival' ], 'Time_taken(min)', 'p90' ),
+    ( 'times', [], 'Time_taken(min)', 'p99' ),
+    ( 'ratings', [ 'Road_traffic_density' ], 'Delivery_person_Ratings', [ 'mean', 'std' ] ),
+    ( 'ratings', [ 'Weatherconditions' ], 'Delivery_person_Ratings', [ 'mean', 'std' ] ),
+]
+
+pytestmark = pytest.mark.skipif( not os.path.exists( TRAIN_PATH ), reason=f'{TRAIN_PATH} não encontrado' )
+
+# -----------------------------------------------------------------
+
+# Funções
+@pytest.fixture( scope='module' )
+def df1():
+    """ Dataset limpo, como nas páginas originais. """
+    return clean_code( pd.read_csv( TRAIN_PATH ) )
+
+
+@pytest.fixture( scope='module' )
+def cubes( df1 ):
+    """ Cubos de CUBES montados sobre o dataset limpo. """
+    return { name: Cube( build_cells( df1, spec ), spec ) for name, spec in CUBES.items() }
+
+
+def select_orders( df1, filtros ):
+    """ Esta função aplica os filtros da barra lateral aos pedidos, como
+        as páginas originais.
+
+            Input: Dataset limpo, filtros
+            Output: Dataframe dos pedidos selecionados
+    """
+    date_cutoff, cities, weathers, traffics = filtros
+    linhas_selecionadas = (
+        (df1['Order_Date'] < date_cutoff) &
+        df1['City'].isin( cities ) &
+        df1['Weatherconditions'].isin( weathers ) &
+        df1['Road_traffic_density'].isin( traffics )
+    )
+
+    return df1.loc[linhas_selecionadas]
+
+
+def reference( df1, filtros, by, column, stats ):
+    """ Esta função calcula uma agregação das páginas direto sobre os
+        pedidos, com groupby do pandas.
+
+            Input: Dataset limpo, filtros, agrupamento, coluna,
+                   estatísticas
+            Output: Series ou Dataframe, ou escalar / Series por
+                    estatística quando by é vazio
+    """
+    df_aux = select_orders( df1, filtros ).assign( week_of_year=lambda df: df['Order_Date'].dt.strftime( '%U' ) )
+    stats = [ stats ] if isinstance( stats, str ) else stats
+
+    def agg( values ):
+        return [ values.quantile( int( stat[1:] ) / 100 ) if stat.startswith( 'p' ) else values.agg( stat )
+                 for stat in stats ]
+
+    if not by:
+        return agg( df_aux[column] )
+
+    # As colunas de texto do código original não tinham categorias sem
+    # pedidos: observed=True equivale a isso
+    grouped = df_aux.groupby( by, observed=True )[column]
+    result = pd.DataFrame( { stat: values for stat, values in zip( stats, agg( grouped ) ) } )
+
+    return result.reset_index()
+
+
+def as_frame( result, by, stats ):
+    """ Esta função deixa o resultado de um rollup no formato de
+        reference.
+
+            Input: Resultado de Cube.rollup, agrupamento, estatísticas
+            Output: Dataframe ou lista de valores ( by vazio )
+    """
+    if not by:
+        return list( result.iloc[0] ) if isinstance( result, pd.DataFrame ) else [ result.iloc[0] ]
+
+    frame = result.to_frame() if isinstance( result, pd.Series ) else result
+    frame.columns = [ stats ] if isinstance( stats, str ) else stats
+
+    return frame.reset_index()
+
+
+def assert_rollup( cube, df1, filtros, by, column, stats ):
+    """ Esta função confere um rollup do cubo com a agregação sobre os
+        pedidos. """
+    result = as_frame( cube.select( *filtros ).rollup( by, column, stats ), by, stats )
+    expected = reference( df1, filtros, by, column, stats )
+
+    if not by:
+        np.testing.assert_allclose( np.asarray( result, dtype='float64' ), np.asarray( expected, dtype='float64' ),
+                                    rtol=1e-5 )
+        return
+
+    pd.testing.assert_frame_equal( result.sort_values( by, ignore_index=True ),
+                                   expected.sort_values( by, ignore_index=True ),
+                                   check_dtype=False, check_categorical=False, rtol=1e-5 )
+
+
+@pytest.mark.parametrize( 'name, by, column, stats', ROLLUPS )
+def test_rollup_matches_groupby( cubes, df1, name, by, column, stats ):
+    assert_rollup( cubes[name], df1, DEFAULT_FILTERS, by, column, stats )
+
+
+@pytest.mark.parametrize( 'name, by, column, stats', ROLLUPS )
+def test_rollup_on_empty_selection( cubes, df1, name, by, column, stats ):
+    assert_rollup( cubes[name], df1, EMPTY_FILTERS, by, column, stats )
+
+
+@pytest.mark.parametrize( 'name', list( CUBES ) )
+@pytest.mark.parametrize( 'filtros', [ DEFAULT_FILTERS, EMPTY_FILTERS,
+                                       ( DEFAULT_FILTERS[0], [ 'Urban', 'Desconhecida' ], [ 'conditions Fog' ], [ 'Jam' ] ) ] )
+def test_indexed_select_matches_scan( cubes, name, filtros ):
+    indexed = Cube( cubes[name].cells, CUBES[name], indexed=True )
+
+    for date_start in ( None, pd.Timestamp( 2022, 3, 1 ) ):
+        pd.testing.assert_frame_equal( indexed.select( *filtros, date_start=date_start ).cells,
+                                       cubes[name].select( *filtros, date_start=date_start ).cells )
+
+
+@pytest.mark.parametrize( 'q', [ 0, 0.1, 0.5, 0.9, 0.99, 1 ] )
+def test_weighted_quantile_matches_series_quantile( q ):
+    rng = np.random.default_rng( 0 )
+    values = rng.normal( size=200 ).round( 1 )
+    weights = rng.integers( 1, 5, size=200 )
+
+    expected = pd.Series( np.repeat( values, weights ) ).quantile( q )
+    assert weighted_quantile( values, weights, q ) == pytest.approx( expected )
+
+
+def test_hll_merge_matches_union( df1 ):
+    values = df1['Delivery_person_ID'].astype( object ).to_numpy()
+    groups = np.zeros( len( values ), dtype='int64' )
+    half = len( values ) // 2
+
+    parts = np.vstack( [ hll.build( groups[:half], values[:half], 1 ), hll.build( groups[half:], values[half:], 1 ) ] )
+    merged = hll.merge( parts, np.array( [ 0, 0 ] ), 1 )
+
+    np.testing.assert_array_equal( merged, hll.build( groups, values, 1 ) )
+
+
+def test_approx_nunique_within_error( cubes, df1 ):
+    result = cubes['uniques'].select( *DEFAULT_FILTERS ).rollup( [ 'City' ], 'Delivery_person_ID', 'approx_nunique' )
+    expected = select_orders( df1, DEFAULT_FILTERS ).groupby( 'City', observed=True )['Delivery_person_ID'].nunique()
+
+    error = (result / expected - 1).abs()
+    assert (error < 4 * hll.standard_error()).all()
+
+
+@pytest.mark.parametrize( 'stat, largest', [ ( 'min', False ), ( 'max', True ) ] )
+def test_ranking_matches_baseline( cubes, df1, stat, largest ):
+    by = [ 'City', 'Delivery_person_ID' ]
+    df2 = cubes['deliverers'].select( *DEFAULT_FILTERS ).rollup( by, 'Time_taken(min)', stat ).reset_index()
+    result = top_k_per_group( df2, 'City', 'Time_taken(min)', largest=largest, order=CITY_ORDER )
+
+    # Página original: ordena tudo e junta as 10 primeiras linhas de cada cidade
+    baseline = (select_orders( df1, DEFAULT_FILTERS ).groupby( by, observed=True )['Time_taken(min)'].agg( stat )
+                    .reset_index().sort_values( by[:1] + [ 'Time_taken(min)' ], ascending=not largest ))
+    expected = pd.concat( [ baseline.loc[baseline['City'] == city].head( TOP_K ) for city in CITY_ORDER ] )
+
+    pd.testing.assert_frame_equal( result.astype( object ), expected.reset_index( drop=True ).astype( object ) )
+
+
+# ----- Armazenamento: acréscimo de arquivos x ingestão completa -----
+def split_csv( source_dir ):
+    """ Esta função divide o train.csv em dois CSVs, a.csv e b.csv,
+        cada um com metade das linhas.
+
+            Input: Diretório dos CSVs
+            Output: Caminhos de a.csv e b.csv
+    """
+    with open( TRAIN_PATH, newline='' ) as file:
+        lines = file.readlines()
+
+    half = 1 + (len( lines ) - 1) // 2
+    paths = []
+    for name, body in ( ( 'a.csv', lines[1:half] ), ( 'b.csv', lines[half:] ) ):
+        paths.append( os.path.join( source_dir, name ) )
+        with open( paths[-1], 'w', newline='' ) as file:
+            file.writelines( [ lines[0] ] + body )
+
+    return paths
+
+
+@pytest.fixture( scope='module' )
+def stores( tmp_path_factory ):
+    """ Diretório com a.csv e b.csv e o armazenamento completo dos dois. """
+    root = tmp_path_factory.mktemp( 'stores' )
+    source_dir = root / 'dataset'
+    source_dir.mkdir()
+    split_csv( str( source_dir ) )
+
+    ingest.ingest( str( source_dir ), str( root / 'full' ), chunksize=10000 )
+
+    return root
+
+
+def store_with_a( stores, name ):
+    """ Esta função grava um armazenamento só com a.csv, em um diretório
+        de origem próprio.
+
+            Input: Diretório dos armazenamentos, nome do armazenamento
+            Output: Diretório de origem, diretório do armazenamento
+    """
+    source_dir = stores / f'{name}-dataset'
+    source_dir.mkdir()
+    os.link( stores / 'dataset' / 'a.csv', source_dir / 'a.csv' )
+
+    store_dir = str( stores / name )
+    ingest.ensure_store( str( source_dir ), store_dir, chunksize=10000 )
+
+    return source_dir, store_dir
+
+
+def assert_same_store( store_dir, full_dir, df1 ):
+    """ Esta função confere os cubos de um armazenamento com os do
+        armazenamento completo e com os pedidos. """
+    stored, full = ingest.read_cubes( store_dir ), ingest.read_cubes( full_dir )
+
+    for name, by, column, stats in ROLLUPS:
+        result = as_frame( stored[name].select( *DEFAULT_FILTERS ).rollup( by, column, stats ), by, stats )
+        expected = as_frame( full[name].select( *DEFAULT_FILTERS ).rollup( by, column, stats ), by, stats )
+        if by:
+            pd.testing.assert_frame_equal( result, expected, check_dtype=False, check_categorical=False, rtol=1e-9 )
+        else:
+            np.testing.assert_allclose( np.asarray( result, dtype='float64' ), np.asarray( expected, dtype='float64' ) )
+
+    count = stored['orders'].select( *DEFAULT_FILTERS ).rollup( [], 'ID', 'count' ).iloc[0]
+    assert count == len( select_orders( df1, DEFAULT_FILTERS ) )
+
+
+def test_append_matches_rebuild( stores, df1 ):
+    source_dir, store_dir = store_with_a( stores, 'append' )
+    os.link( stores / 'dataset' / 'b.csv', source_dir / 'b.csv' )
+
+    ingest.ensure_store( str( source_dir ), store_dir, chunksize=10000 )
+
+    assert_same_store( store_dir, str( stores / 'full' ), df1 )
+
+
+def test_interrupted_append_is_not_counted_twice( stores, df1, monkeypatch ):
+    source_dir, store_dir = store_with_a( stores, 'interrupted' )
+    before = ingest.read_cubes( store_dir )['orders'].select( *DEFAULT_FILTERS ).rollup( [], 'ID', 'count' ).iloc[0]
+    os.link( stores / 'dataset' / 'b.csv', source_dir / 'b.csv' )
+
+    # Interrompe o acréscimo depois de gravar e combinar os arquivos, antes
+    # do manifesto
+    def interrupt( manifest, store_dir ):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as patch:
+        patch.setattr( ingest, 'write_manifest', interrupt )
+        with pytest.raises( KeyboardInterrupt ):
+            ingest.ensure_store( str( source_dir ), store_dir, chunksize=10000 )
+
+    after = ingest.read_cubes( store_dir )['orders'].select( *DEFAULT_FILTERS ).rollup( [], 'ID', 'count' ).iloc[0]
+    assert after == before
+
+    ingest.ensure_store( str( source_dir ), store_dir, chunksize=10000 )
+
+    assert_same_store( store_dir, str( stores / 'full' ), df1 )
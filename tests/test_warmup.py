@@ -0,0 +1,26 @@
+# Bibliotecas necessárias
+import os
+
+import pytest
+
+from breeze import results, warmup
+from breeze.loader import DATASET_PATH, load_cubes
+
+# -----------------------------------------------------------------
+
+pytestmark = pytest.mark.skipif( not os.path.exists( DATASET_PATH ), reason=f'{DATASET_PATH} não encontrado' )
+
+# -----------------------------------------------------------------
+
+# Funções
+def test_warm_up_draws_first_view_charts():
+    """ Depois do aquecimento, os gráficos da primeira visita saem do
+        cache de resultados. """
+    warmup.warm_up()
+
+    misses = results.stats()['misses']
+    cubes = load_cubes()
+    for chart in warmup.DEFAULT_CHARTS:
+        chart( cubes, warmup.DEFAULT_FILTERS )
+
+    assert results.stats()['misses'] == misses